@@ -16,6 +16,14 @@ def _env(name: str, default: str | None = None) -> str | None:
     # TDB_ 접두 환경변수 우선 사용
     return os.getenv(f"TDB_{name}", default)
 
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+def project_path(path: str | None) -> str:
+    # 상대 경로는 프로젝트 루트 기준 (작업 디렉터리와 무관), 절대 경로는 그대로, 빈 값은 ""(끔)
+    if not path:
+        return ""
+    return str(PROJECT_ROOT / path)
+
 # 서버/QR
 SERVER_BASE_URL = _env("SERVER_BASE_URL", "http://127.0.0.1:8000")  # 예: http://ec2-xx:3000
 QR_BASE_URL     = _env("QR_BASE_URL", SERVER_BASE_URL)
@@ -31,7 +39,86 @@ SERIAL_PORT  = os.getenv("TDB_SERIAL_PORT", None) # /dev/serial/by-id/... 권장
 BAUDRATE     = int(_env("BAUDRATE", "9600"))
 READ_TIMEOUT = float(_env("READ_TIMEOUT", "1.0"))
 
+# 적응형 명령 타임아웃 (hwserial/timing_model.py, data/timing_model.json)
+TIMING_ADAPTIVE    = _env("TIMING_ADAPTIVE", "1") == "1"
+TIMING_MIN_SAMPLES = int(_env("TIMING_MIN_SAMPLES", "20"))      # 이만큼 쌓이기 전에는 기존 고정 타임아웃
+TIMING_MARGIN      = float(_env("TIMING_MARGIN", "1.5"))        # p99 × 여유배수
+TIMING_FLOOR_SEC   = float(_env("TIMING_FLOOR_SEC", "1.0"))     # 학습값 하한
+TIMING_MAX_FACTOR  = float(_env("TIMING_MAX_FACTOR", "2.0"))    # 상한 = 기존 고정값 × 배수 (마모된 기구 대비)
+PROG_ACK_SEC       = float(_env("PROG_ACK_SEC", "1.0"))         # 진행 줄 지원 펌웨어: 명령 수신 줄 대기 한도
+DISPENSE_CONCURRENCY = int(_env("DISPENSE_CONCURRENCY", "2"))  # 한 시간대 동시 배출 슬롯 수 (1이면 순차, 펌웨어 최대 3)
+
 # 동작 옵션
 DRY_RUN = False
 UID_COOLDOWN_SEC = float(_env("UID_COOLDOWN_SEC", "2.0"))
 HEARTBEAT_SEC    = int(_env("HEARTBEAT_SEC", "300"))
+
+# 세션 대기열 (배출 중 찍힌 태그 보관 → 회전판 비면 바로 다음 세션)
+TAG_QUEUE_MAX        = int(_env("TAG_QUEUE_MAX", "5"))             # 대기 가능 인원
+TAG_PREFETCH_MAX_SEC = float(_env("TAG_PREFETCH_MAX_SEC", "60"))   # 미리 준비한 큐 유효 시간 (넘으면 다시 조회)
+STATUS_HOLD_SEC      = float(_env("STATUS_HOLD_SEC", "3"))         # 결과 문구 표시 시간 (대기열 있으면 즉시 다음 세션)
+
+# 가족 모드: 보호자(parent) 태그 시 오늘 아직 안 먹은 구성원 전체를 한 번의 회전으로 배출
+GROUP_DISPENSE = _env("GROUP_DISPENSE", "0") == "1"
+
+# 재고 기준값 유효 시간 (넘으면 세션 준비 시 슬롯 정보 다시 조회, GUI 폴링 중에는 보통 해당 없음)
+INVENTORY_MAX_AGE_SEC = float(_env("INVENTORY_MAX_AGE_SEC", "120"))
+
+# HTTP 연결 관리 (keep-alive / pre-warm)
+HTTP_POOL_CONNECTIONS = int(_env("HTTP_POOL_CONNECTIONS", "4"))   # 호스트별 풀 개수
+HTTP_POOL_MAXSIZE     = int(_env("HTTP_POOL_MAXSIZE", "4"))       # 풀당 최대 연결 수
+HTTP_POOL_SIZES       = _env("HTTP_POOL_SIZES", "")               # 예: "api.example.com=8,10.0.0.5:3000=2"
+# 유휴 연결 probe 주기 (0=끔). 서버의 keep-alive 유지 시간보다 짧아야 연결이 살아있음
+# 서버가 Keep-Alive: timeout=N 헤더를 보내면 N의 60%로 자동 단축 (Node.js 기본 5초 → 3초)
+HTTP_KEEPALIVE_SEC    = float(_env("HTTP_KEEPALIVE_SEC", "25"))
+HTTP_PREWARM_IDLE_SEC = float(_env("HTTP_PREWARM_IDLE_SEC", "5")) # 이 시간 이상 유휴면 pre-warm 수행
+
+# 메트릭 (Prometheus text format, GET /metrics)
+METRICS_PORT = int(_env("METRICS_PORT", "9108"))        # 0이면 비활성
+METRICS_ADDR = _env("METRICS_ADDR", "127.0.0.1")        # 플릿 수집 시 0.0.0.0
+
+# 세션 트레이스 (data/traces.jsonl 링 버퍼)
+TRACE_ENABLED      = _env("TRACE_ENABLED", "1") == "1"
+TRACE_MAX_SESSIONS = int(_env("TRACE_MAX_SESSIONS", "500"))
+
+# 로깅 (QueueHandler → QueueListener 비동기 파이프라인)
+LOG_LEVEL         = _env("LOG_LEVEL", "INFO")          # DEBUG로 바꾸면 [DEBUG] 상세 로그 기록
+LOG_CONSOLE_LEVEL = _env("LOG_CONSOLE_LEVEL", "INFO")
+LOG_FILE_LEVEL    = _env("LOG_FILE_LEVEL", "INFO")
+LOG_JSON          = _env("LOG_JSON", "0") == "1"       # logs/tdb.jsonl 압축 JSON-lines 기록
+
+# 상태 버스 (GUI 외부 프로세스용 UNIX 소켓 + 합쳐진 디스크 스냅샷)
+STATE_SOCKET_PATH      = _env("STATE_SOCKET_PATH", "data/state.sock")
+STATE_SNAPSHOT_MIN_SEC = float(_env("STATE_SNAPSHOT_MIN_SEC", "1.0"))
+
+# 하드웨어 제어 소켓 (진단 스크립트가 실행 중인 키오스크의 시리얼을 공유, 비우면 끔, 상대 경로는 프로젝트 루트 기준)
+CONTROL_SOCKET_PATH = _env("CONTROL_SOCKET_PATH", "data/control.sock")
+CONTROL_WAIT_SEC    = float(_env("CONTROL_WAIT_SEC", "10"))   # 배출 세션 중이면 이만큼 기다린 뒤 BUSY
+
+# 서버가 보고의 report_id(Idempotency-Key)로 중복을 걸러내는지 (서버 지원 확인 전에는 0)
+# 1: 전송 중 중단된 보고를 복구 시 같은 키로 재전송 / 0: 재전송 안 함 (이중 반영 방지, 서버 기록이 빠질 수 있음)
+REPORT_DEDUP_BY_ID = _env("REPORT_DEDUP_BY_ID", "0") == "1"
+
+# 배출 중 폴링 정책 (실험): 0=세션 내내 전부 중지, 1=모터 이동 중에만 중지하고 충돌 없는 조회는 계속
+POLL_DURING_DISPENSE = _env("POLL_DURING_DISPENSE", "0") == "1"
+
+# UI 업데이트 적용 최대 프레임 수 (초당). 워커 스레드 업데이트는 프레임 단위로 합쳐짐
+UI_MAX_FPS = float(_env("UI_MAX_FPS", "20"))
+
+# 리스트 타일 페이지 (고정 개수 위젯만 만들고 넘치면 자동 페이지 전환)
+UI_USERS_PER_PAGE          = int(_env("UI_USERS_PER_PAGE", "6"))
+UI_SCHEDULE_ROWS_PER_PAGE  = int(_env("UI_SCHEDULE_ROWS_PER_PAGE", "8"))
+UI_SLOTS_PER_PAGE          = int(_env("UI_SLOTS_PER_PAGE", "3"))
+UI_PAGE_INTERVAL_SEC       = int(_env("UI_PAGE_INTERVAL_SEC", "6"))
+
+# 이벤트 루프 지연 측정 주기 / 이 이상 늦으면 멈춤(stall)으로 기록 (ms)
+UI_LAG_SAMPLE_MS = int(_env("UI_LAG_SAMPLE_MS", "50"))
+UI_STALL_MS      = int(_env("UI_STALL_MS", "250"))
+
+# F12 스크린샷 저장 위치 / 보관 개수 (오래된 것부터 삭제)
+SCREENSHOT_DIR  = _env("SCREENSHOT_DIR", "~/screenshots")
+SCREENSHOT_KEEP = int(_env("SCREENSHOT_KEEP", "50"))
+
+# 웜 스타트 스냅샷 (data/warm_start.json, 부팅 직후 이전 데이터로 첫 화면 표시)
+WARM_START_ENABLED     = _env("WARM_START_ENABLED", "1") == "1"
+WARM_SNAPSHOT_MIN_SEC  = float(_env("WARM_SNAPSHOT_MIN_SEC", "30"))
@@ -12,7 +12,8 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parent
 sys.path.insert(0, str(project_root))
 
-from hwserial.arduino_link import open_serial, send_raw
+# 키오스크 실행 중이면 제어 소켓으로 (서비스 중지/아두이노 리셋 없음), 아니면 시리얼 직접
+from hwserial.control_client import open_link, send_raw
 
 
 def test_pin_output(ser, slot: int, pin_type: str):
@@ -66,7 +67,7 @@ def main():
 
     # 시리얼 연결
     try:
-        ser = open_serial(baud_rate=9600)
+        ser = open_link(baud_rate=9600)
         print(f"✓ Arduino 연결: {ser.port}\n")
     except Exception as e:
         print(f"✗ Arduino 연결 실패: {e}")
@@ -8,8 +8,33 @@
 
 // 점심후 -> HOME 은 2000+2500=4500ms
 
+// 진행 상황 줄 (최종 OK,/ERR, 응답 전에 출력, 파이 쪽은 모르는 줄이면 무시 → 하위 호환)
+//   PROG,DISPENSE,<slot>,<done>,<count>   배출 시작(done=0) + 약 1개 끝날 때마다
+//   PROG,STEP,START,<stage> / PROG,STEP,END,<stage>
+//   PROG,HOME,START,<stage> / PROG,HOME,END,<stage>
+static void printProgress(const __FlashStringHelper* cmd, int a, int b, int c) {
+  Serial.print(F("PROG,")); Serial.print(cmd);
+  Serial.print(','); Serial.print(a);
+  Serial.print(','); Serial.print(b);
+  Serial.print(','); Serial.println(c);
+}
+
+static void printStepEdge(const __FlashStringHelper* cmd, const __FlashStringHelper* edge) {
+  Serial.print(F("PROG,")); Serial.print(cmd);
+  Serial.print(','); Serial.print(edge);
+  Serial.print(','); Serial.println(servoGetStage());
+}
+
 static void handleSerialCommand();
 static bool dispenseSlot(int slot, int count); // TODO: 실제 동작은 내 로직으로
+static void handleDispenseMulti(const String& cmd);
+
+// 배출 1개 = 로딩 ON → OFF 대기 → 배출 ON → OFF 대기 (dispenseSlot과 같은 시간)
+static const unsigned long kLOAD_ON_MS  = 1000;
+static const unsigned long kLOAD_OFF_MS = 300;
+static const unsigned long kDISP_ON_MS  = 1000;
+static const unsigned long kDISP_OFF_MS = 300;
+static const int kMAX_MULTI_JOBS = 3;
 
 
 
@@ -58,10 +83,18 @@ static void handleSerialCommand() {
         continue;
       }
 
+      // -----------------------------
+      // 0) MULTI,<동시슬롯수>,<slot>:<count>[,<slot>:<count>...]  (여러 슬롯 동시 배출)
+      //    DISPENSE로 시작하지 않게 이름 지음 → 구 펌웨어는 DISPENSE로 오인하지 않고 ERR,UNKNOWN
+      // -----------------------------
+      if (buf.startsWith("MULTI,")) {
+        handleDispenseMulti(buf);
+      }
+
       // -----------------------------
       // 1) DISPENSE,<slot>,<count>
       // -----------------------------
-      if (buf.startsWith("DISPENSE")) {
+      else if (buf.startsWith("DISPENSE")) {
         int first  = buf.indexOf(',');
         int second = buf.indexOf(',', first + 1);
         if (first < 0 || second < 0) {
@@ -91,12 +124,16 @@ static void handleSerialCommand() {
       // 2) HOME
       // -----------------------------
       else if (buf.equals("HOME") || buf.equals("STEP,HOME")) {
+        printStepEdge(F("HOME"), F("START"));
         servoReturnHome();
+        printStepEdge(F("HOME"), F("END"));
         Serial.println("OK,HOME");
       }
       // 3) STEP,NEXT : 한 칸 전진
       else if (buf.equals("STEP,NEXT")) {
+        printStepEdge(F("STEP"), F("START"));
         servoStepNext();
+        printStepEdge(F("STEP"), F("END"));
         Serial.println("OK,STEP,NEXT");
       }
       // -----------------------------
@@ -204,6 +241,7 @@ static bool dispenseSlot(int slot, int count) {
   // Active-Low: HIGH=OFF, LOW=ON
   int idx = slot - 1;
   if (idx < 0 || idx >= 3) return false;
+  printProgress(F("DISPENSE"), slot, 0, count);
   for (int i=0; i<count; i++) {
         digitalWrite(LOADING_SOLENOID_PINS[idx], LOW);   // ON
         delay(1000);
@@ -213,9 +251,107 @@ static bool dispenseSlot(int slot, int count) {
         delay(1000);
         digitalWrite(DISPENSING_SOLENOID_PINS[idx], HIGH);  // OFF
         delay(300);
+        printProgress(F("DISPENSE"), slot, i + 1, count);
   }
   return true;
 }
 
 
+// ===== MULTI (동시 배출): 슬롯별 상태 머신 (millis 기반, delay 없이 여러 슬롯 겹쳐서 진행) =====
+// 상태: 0 대기 → 1 로딩 ON → 2 로딩 OFF 대기 → 3 배출 ON → 4 배출 OFF 대기 → (다음 1개 또는 5 완료)
+// 동시에 진행하는 슬롯 수는 <동시슬롯수>로 제한 (솔레노이드 전원 한도)
+struct SlotJob {
+  int slot;
+  int count;
+  int done;
+  uint8_t state;
+  unsigned long t;
+};
+
+static void handleDispenseMulti(const String& cmd) {
+  SlotJob jobs[kMAX_MULTI_JOBS];
+  int n = 0;
+
+  int c1 = cmd.indexOf(',');
+  int c2 = (c1 >= 0) ? cmd.indexOf(',', c1 + 1) : -1;
+  if (c1 < 0 || c2 < 0) { Serial.println("ERR,BAD_ARGS,MULTI"); return; }
+  int maxParallel = constrain(cmd.substring(c1 + 1, c2).toInt(), 1, kMAX_MULTI_JOBS);
 
+  int start = c2 + 1;
+  while (start < (int)cmd.length()) {
+    int end = cmd.indexOf(',', start);
+    if (end < 0) end = cmd.length();
+    String pair = cmd.substring(start, end);
+    int colon = pair.indexOf(':');
+    int slot  = (colon > 0) ? pair.substring(0, colon).toInt() : 0;
+    int count = (colon > 0) ? pair.substring(colon + 1).toInt() : 0;
+    if (slot < 1 || slot > 3 || count <= 0 || n >= kMAX_MULTI_JOBS) {
+      Serial.print("ERR,OUT_OF_RANGE,"); Serial.println(pair);
+      return;
+    }
+    for (int i = 0; i < n; i++) {
+      if (jobs[i].slot == slot) { Serial.println("ERR,BAD_ARGS,DUP_SLOT"); return; }
+    }
+    jobs[n++] = {slot, count, 0, 0, 0};
+    start = end + 1;
+  }
+  if (n == 0) { Serial.println("ERR,BAD_ARGS,MULTI"); return; }
+
+  int active = 0;
+  int finished = 0;
+  while (finished < n) {
+    unsigned long now = millis();
+    for (int i = 0; i < n; i++) {
+      SlotJob& j = jobs[i];
+      int idx = j.slot - 1;
+      switch (j.state) {
+        case 0:
+          if (active < maxParallel) {
+            printProgress(F("DISPENSE"), j.slot, 0, j.count);
+            digitalWrite(LOADING_SOLENOID_PINS[idx], LOW);   // ON
+            j.state = 1; j.t = now; active++;
+          }
+          break;
+        case 1:
+          if (now - j.t >= kLOAD_ON_MS) {
+            digitalWrite(LOADING_SOLENOID_PINS[idx], HIGH);  // OFF
+            j.state = 2; j.t = now;
+          }
+          break;
+        case 2:
+          if (now - j.t >= kLOAD_OFF_MS) {
+            digitalWrite(DISPENSING_SOLENOID_PINS[idx], LOW);   // ON
+            j.state = 3; j.t = now;
+          }
+          break;
+        case 3:
+          if (now - j.t >= kDISP_ON_MS) {
+            digitalWrite(DISPENSING_SOLENOID_PINS[idx], HIGH);  // OFF
+            j.state = 4; j.t = now;
+          }
+          break;
+        case 4:
+          if (now - j.t >= kDISP_OFF_MS) {
+            j.done++;
+            printProgress(F("DISPENSE"), j.slot, j.done, j.count);
+            if (j.done < j.count) {
+              digitalWrite(LOADING_SOLENOID_PINS[idx], LOW);   // 다음 1개
+              j.state = 1; j.t = now;
+            } else {
+              j.state = 5; active--; finished++;
+            }
+          }
+          break;
+        default:
+          break;
+      }
+    }
+  }
+
+  Serial.print("OK,MULTI");
+  for (int i = 0; i < n; i++) {
+    Serial.print(','); Serial.print(jobs[i].slot);
+    Serial.print(':'); Serial.print(jobs[i].done);
+  }
+  Serial.println();
+}
@@ -2,21 +2,31 @@ import tkinter as tk
 from tkinter import ttk
 from datetime import datetime
 import platform
-import qrcode
-from PIL import Image, ImageTk
 import time
 import sys
-import subprocess
-import os
+from hwserial import events
+from gui.image_cache import ImageCache, slot_image_path
+from gui import qr_cache
+from gui import tile_diff
+from gui import view_models
+from gui.virtual_list import PagedList
+from gui.lag_monitor import LagMonitor
+from gui.screenshot import ScreenshotService
+from services import metrics
+from gui.ui_dispatcher import UiDispatcher
+from config import settings
 
 class DashboardApp(tk.Tk):
-    def __init__(self, fullscreen=True):
+    def __init__(self, fullscreen=True, warm_start=None):
         super().__init__()
         self.title("TDB 약 배출 시스템")
 
         # ✅ 초기화 중에는 윈도우 숨기기 (깜박임 방지)
         self.withdraw()
 
+        # ✅ 워커 스레드 → UI 업데이트는 프레임 단위로 합쳐서 적용
+        self.dispatcher = UiDispatcher(self, max_fps=settings.UI_MAX_FPS)
+
         self.BG_COLOR = '#1e1e1e'
         self.CARD_COLOR = '#2c2c2c'
         self.ACCENT_COLOR = '#76d7c4'
@@ -44,41 +54,58 @@ class DashboardApp(tk.Tk):
         self._popup_qr_label = None
         self._popup_message_label = None
         self._qr_photo_image = None
-        self._inventory_images = []
-
-        # ✅ 깜박임 방지를 위한 캐시 (모든 타일)
-        self._cached_users = None
-        self._cached_slots = None
-        self._cached_schedules = None
-        self._cached_history = None
+        self._qr_payload = None
+
+        # ✅ 기기 등록 QR은 미리 렌더 (팝업 즉시 표시)
+        qr_cache.prerender([(settings.DEVICE_UID, 300)])
+
+        # ✅ 인벤토리 이미지 캐시 (디코딩/리사이즈는 워커에서 1회)
+        self._image_cache = ImageCache(size=(80, 80))
+        self._image_cache.preload([slot_image_path(n) for n in range(1, 4)])
+
+        # ✅ 깜박임 방지: 타일별 마지막 렌더 상태 (바뀐 행만 다시 그림)
+        self._users_state = tile_diff.TileState()
+        self._slots_state = tile_diff.TileState()
+        self._schedules_state = tile_diff.TileState()
+        self._history_state = tile_diff.TileState()
+        self._stale_titles = {}   # tile_index -> 원래 제목 (이전 데이터 표시 중인 타일)
+        self._status_text = ""    # 배출 상태 타일(3) 본문 (대기열 안내 줄 제외)
+        self._queue_line = None   # "대기 n명 (다음: 이름)"
         self._popup_geometry_set = False
 
-        # ✅ 위젯 재사용을 위한 프레임 캐시
-        self._user_frames = []
-
         # ✅ Watchdog 변수 (GUI 자가 진단용)
         self._last_heartbeat = time.time()
         self._last_watchdog_log = 0  # 마지막 로그 시간 (0으로 초기화 → 첫 체크에서 즉시 로그)
         self._watchdog_enabled = True
 
         self._create_dashboard()
+        # ✅ 첫 폴링 전 표시: 웜 스타트 스냅샷이 있으면 이전 데이터(stale), 없으면 기본값
+        self._render_warm_start(warm_start or {})
         self.update_time()
 
         # ✅ 레이아웃 계산 완료 후 윈도우 표시
         self.update_idletasks()  # 모든 pending 작업 완료
         self.deiconify()  # 윈도우 표시
 
-        # ✅ F12 키로 스크린샷 기능 바인딩
+        # ✅ F12 키로 스크린샷 기능 바인딩 (캡처는 워커 스레드, 최근 N장만 보관)
+        self._screenshots = ScreenshotService(self, self.ui_call, settings.SCREENSHOT_DIR,
+                                              keep=settings.SCREENSHOT_KEEP)
         self.bind('<F12>', self.take_screenshot)
 
         # ✅ Watchdog 시작 (GUI 자가 진단)
         self._start_watchdog()
 
+        # ✅ 이벤트 루프 지연 측정 (멈춤을 watchdog 재시작 전에 메트릭으로 확인)
+        self.lag_monitor = LagMonitor(self, self.dispatcher,
+                                      interval_ms=settings.UI_LAG_SAMPLE_MS, stall_ms=settings.UI_STALL_MS)
+        self.lag_monitor.start()
+
     def _create_dashboard(self):
         main_frame = ttk.Frame(self, style='TFrame')
         main_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
 
         self.tiles = []
+        self.tile_titles = []
         titles = ["현재 시간", "약품 재고 현황", "오늘의 전체 스케줄", "약 배출 상태", "최근 배출 기록", "등록된 유저"]
         for i in range(6):
             row, col = divmod(i, 3)
@@ -96,6 +123,7 @@ class DashboardApp(tk.Tk):
             card.pack(fill=tk.BOTH, expand=True, padx=1, pady=1)
             title_label = ttk.Label(card, text=titles[i], style='CardTitle.TLabel', anchor="center")
             title_label.pack(pady=(15, 10))
+            self.tile_titles.append(title_label)
             if i == 0:
                 self.date_label = ttk.Label(card, text="", font=self.FONT_DATE, background=self.CARD_COLOR, foreground=self.TEXT_COLOR)
                 self.date_label.pack(pady=5)
@@ -105,42 +133,74 @@ class DashboardApp(tk.Tk):
             elif i == 1:
                 inventory_container = ttk.Frame(card, style='Card.TFrame')
                 inventory_container.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-                inventory_container.grid_columnconfigure([0, 1, 2], weight=1)
+                per_page = settings.UI_SLOTS_PER_PAGE
+                inventory_container.grid_columnconfigure(list(range(per_page)), weight=1, uniform="slot")
                 inventory_container.grid_rowconfigure(0, weight=1)
-                self.inventory_labels = []
-                for slot_num in range(1, 4):
-                    slot_frame = ttk.Frame(inventory_container, style='Card.TFrame')
-                    slot_frame.grid(row=0, column=slot_num - 1, sticky="nsew", padx=0)
-                    ttk.Label(slot_frame, text=f"Slot {slot_num}", font=('Helvetica', 24, 'bold'), background=self.CARD_COLOR, foreground=self.ACCENT_COLOR, anchor="center").pack(pady=(5, 10), side=tk.TOP)
-                    stock_label = ttk.Label(slot_frame, text="- / -", font=('Helvetica', 28, 'bold'), background=self.CARD_COLOR, foreground=self.TEXT_COLOR, anchor="center")
-                    stock_label.pack(pady=(10, 5), side=tk.BOTTOM)
-                    name_label = ttk.Label(slot_frame, text="-", font=('Helvetica', 20), background=self.CARD_COLOR, foreground=self.TEXT_COLOR, anchor="center", wraplength=150, justify=tk.CENTER)
-                    name_label.pack(pady=0, side=tk.BOTTOM)
-                    img_label = ttk.Label(slot_frame, background=self.CARD_COLOR)
-                    img_label.pack(pady=5, expand=True)
-                    self.inventory_labels.append({'name': name_label, 'stock': stock_label, 'img': img_label})
+                # ✅ 슬롯 위젯은 한 페이지 분량만 만들고 재사용 (슬롯이 많으면 자동 페이지 넘김)
+                self._inventory_list = PagedList(
+                    inventory_container, per_page,
+                    make_row=self._make_slot_row, bind_row=self._bind_slot_row,
+                    show_row=lambda row, col: row['frame'].grid(row=0, column=col, sticky="nsew", padx=0),
+                    hide_row=lambda row: row['frame'].grid_remove(),
+                    interval_ms=settings.UI_PAGE_INTERVAL_SEC * 1000,
+                    indicator=self._make_page_indicator(card))
                 self.tiles.append(inventory_container)
             elif i == 2:
                 schedule_frame = ttk.Frame(card, style='Card.TFrame')
                 schedule_frame.pack(pady=5, padx=15, fill=tk.BOTH, expand=True)
-                self.schedule_labels = {}
-                for slot, name in {"morning": "아침", "afternoon": "점심", "evening": "저녁"}.items():
-                    slot_frame_inner = ttk.Frame(schedule_frame, style='Card.TFrame')
-                    slot_frame_inner.pack(fill=tk.BOTH, expand=True)
-                    ttk.Label(slot_frame_inner, text=name, font=('Helvetica', 22, 'bold'), background=self.CARD_COLOR, foreground=self.ACCENT_COLOR).pack(anchor='w', padx=10)
-                    content_label = ttk.Label(slot_frame_inner, text="스케줄 없음", font=('Helvetica', 22), background=self.CARD_COLOR, foreground=self.TEXT_COLOR, justify=tk.LEFT)
-                    content_label.pack(anchor='w', padx=10, pady=(0, 5))
-                    self.schedule_labels[slot] = content_label
+                self._schedule_list = PagedList(
+                    schedule_frame, settings.UI_SCHEDULE_ROWS_PER_PAGE,
+                    make_row=lambda parent, idx: ttk.Label(parent, background=self.CARD_COLOR, justify=tk.LEFT),
+                    bind_row=self._bind_schedule_row,
+                    show_row=lambda row, idx: row.pack(anchor='w', padx=10, pady=(0, 2)),
+                    hide_row=lambda row: row.pack_forget(),
+                    interval_ms=settings.UI_PAGE_INTERVAL_SEC * 1000,
+                    indicator=self._make_page_indicator(card))
                 self.tiles.append(schedule_frame)
             elif i == 5:
                 user_list_frame = ttk.Frame(card, style='Card.TFrame')
                 user_list_frame.pack(pady=5, padx=15, fill=tk.BOTH, expand=True)
+                self._user_list = PagedList(
+                    user_list_frame, settings.UI_USERS_PER_PAGE,
+                    make_row=self._make_user_row, bind_row=self._bind_user_row,
+                    show_row=lambda row, idx: row['frame'].place(x=0, y=idx * 45, relwidth=1.0, height=45),
+                    hide_row=lambda row: row['frame'].place_forget(),
+                    interval_ms=settings.UI_PAGE_INTERVAL_SEC * 1000,
+                    indicator=self._make_page_indicator(card))
                 self.tiles.append(user_list_frame)
             else:
                 content_label = ttk.Label(card, text="-", style='CardContent.TLabel', anchor="center")
                 content_label.pack(pady=10, padx=15, fill=tk.BOTH, expand=True)
                 self.tiles.append(content_label)
 
+    # --- 웜 스타트 (이전 데이터 표시) ---
+    WARM_TILES = {"slots": 1, "schedules": 2, "history": 4, "users": 5}
+
+    def _render_warm_start(self, warm):
+        self.update_inventory_tile(warm.get("slots") or [])
+        self.update_schedule_tile(warm.get("schedules") or [])
+        if warm.get("history") is not None:
+            self.update_history_tile(warm["history"])
+        if warm.get("users") is not None:
+            self.update_user_tile(warm["users"])
+        saved_at = warm.get("saved_at")
+        if saved_at:
+            since = datetime.fromtimestamp(saved_at).strftime('%m/%d %H:%M')
+            for kind, idx in self.WARM_TILES.items():
+                if warm.get(kind) is not None:
+                    self.mark_stale(idx, since)
+
+    def mark_stale(self, tile_index, since):
+        """이전 데이터 표시 중: 제목에 마지막 갱신 시각 + 흐린 색"""
+        label = self.tile_titles[tile_index]
+        base = self._stale_titles.setdefault(tile_index, label.cget('text'))
+        label.config(text=f"{base} ({since} 기준)", foreground=self.BORDER_COLOR)
+
+    def clear_stale(self, tile_index):
+        base = self._stale_titles.pop(tile_index, None)
+        if base is not None:
+            self.tile_titles[tile_index].config(text=base, foreground=self.ACCENT_COLOR)
+
     def _create_popup_if_needed(self):
         if self._popup is None:
             self._popup = tk.Toplevel(self)
@@ -182,15 +242,25 @@ class DashboardApp(tk.Tk):
         self._create_popup_if_needed()
         if self._popup_message_label.winfo_ismapped():
             self._popup_message_label.grid_remove()
-        qr_img = qrcode.make(qr_data).resize((300, 300), Image.Resampling.LANCZOS)
-        self._qr_photo_image = ImageTk.PhotoImage(qr_img)
+        # ✅ QR 렌더 캐시: 캐시 hit면 즉시, 아니면 워커에서 렌더 후 표시
+        payload = str(qr_data)
+        if self._qr_payload != payload:
+            self._qr_payload = payload
+            self._qr_photo_image = None
+            self._popup_qr_label.config(image='')
+            qr_cache.render_async(self, payload, 300, lambda photo: self._apply_qr_photo(payload, photo))
         self._popup_qr_label.grid(row=1, column=0, pady=(10, 0))
-        self._popup_qr_label.config(image=self._qr_photo_image)
         self._popup_message_label.grid(row=2, column=0, sticky='s', padx=20, pady=(10, 20))
         self._popup_message_label.config(text=message)
         self._popup_title.config(text=title)
         self._popup.deiconify()
 
+    def _apply_qr_photo(self, payload, photo):
+        if self._qr_payload != payload:
+            return  # 그 사이 다른 QR로 바뀜
+        self._qr_photo_image = photo
+        self._popup_qr_label.config(image=photo)
+
     def hide_popup(self):
         if self._popup:
             self._popup.withdraw()
@@ -198,154 +268,142 @@ class DashboardApp(tk.Tk):
     def is_popup_visible(self):
         return self._popup and self._popup.winfo_viewable()
 
+    # ✅ 같은 위젯/필드를 덮어쓰는 업데이트는 자동으로 key 부여 (프레임 안에서 최신 값만 적용)
+    _COALESCE_KEYS = {
+        'update_tile_content': lambda args: ('tile', args[0], 'text') if args else None,
+        'update_user_tile': lambda args: ('users', 'rows'),
+        'update_inventory_tile': lambda args: ('inventory', 'rows'),
+        'update_schedule_tile': lambda args: ('schedules', 'rows'),
+        'update_history_tile': lambda args: ('history', 'rows'),
+    }
+
     def ui_call(self, func, *args, **kwargs):
-        self.after(0, lambda: func(*args, **kwargs))
+        """어느 스레드에서나 호출 가능. 다음 프레임에 Tk 스레드에서 실행"""
+        key_fn = self._COALESCE_KEYS.get(getattr(func, '__name__', ''))
+        key = key_fn(args) if key_fn and getattr(func, '__self__', None) is self else None
+        self.dispatcher.post(func, *args, key=key, **kwargs)
+
+    def ui_post(self, key, func, *args, **kwargs):
+        """명시적 key로 등록: 같은 key의 아직 적용 안 된 업데이트는 버려짐"""
+        self.dispatcher.post(func, *args, key=key, **kwargs)
 
     def update_tile_content(self, tile_index, content):
         if tile_index > 0 and tile_index < len(self.tiles):
+            if tile_index == 3:
+                # ✅ 배출 상태 타일: 대기열 안내 줄은 상태 문구가 바뀌어도 유지
+                self._status_text = str(content)
+                if self._queue_line:
+                    content = f"{self._status_text}\n{self._queue_line}"
             if tile_index != 2:
                 self.tiles[tile_index].config(text=str(content))
 
-    def update_schedule_tile(self, schedules: list):
-        # ✅ 캐싱: 데이터 동일 시 렌더링 스킵
-        import json
-        schedules_json = json.dumps(schedules, sort_keys=True)
-        if self._cached_schedules == schedules_json:
+    def on_dispense_event(self, event):
+        """배출 세션 타입 이벤트 → 배출 상태 타일(3) 갱신"""
+        if isinstance(event, events.QueueChanged):
+            self._queue_line = events.describe_queue(event)
+            self.update_tile_content(3, self._status_text)
             return
-        self._cached_schedules = schedules_json
-
-        schedules_by_time = {"morning": [], "afternoon": [], "evening": []}
-        for s in schedules:
-            time_of_day = s.get("time_of_day")
-            if time_of_day in schedules_by_time:
-                dose = s.get('dose', '?')
-                schedules_by_time[time_of_day].append(f"{s.get('user_name')} ({s.get('medicine_name')}) - {dose}정")
-        for slot, schedule_list in schedules_by_time.items():
-            content = "\n".join(schedule_list) if schedule_list else "스케줄 없음"
-            if slot in self.schedule_labels:
-                self.schedule_labels[slot].config(text=content)
-
-    def update_inventory_tile(self, slots: list):
-        # ✅ 캐싱: 데이터 동일 시 렌더링 스킵
-        import json
-        slots_json = json.dumps(slots, sort_keys=True)
-        if self._cached_slots == slots_json:
+        text = events.describe(event)
+        if text:
+            self.update_tile_content(3, text)
+
+    # ✅ 가공/해시 계산은 폴링 스레드(view_models)에서, 여기서는 지문 비교 + 텍스트 대입만
+    STOCK_COLORS = {'ok': '#388E3C', 'low': '#FFA000', 'critical': '#D32F2F'}
+
+    @staticmethod
+    def _as_model(data, build):
+        return data if isinstance(data, tile_diff.Snapshot) else build(data)
+
+    def update_history_tile(self, history):
+        snap = self._as_model(history, view_models.history)
+        if not self._history_state.changed(snap):
             return
-        self._cached_slots = slots_json
-
-        slot_data_map = {s.get('slot_number'): s for s in slots}
-        self._inventory_images.clear()
-        for i in range(3):
-            slot_num = i + 1
-            labels = self.inventory_labels[i]
-            data = slot_data_map.get(slot_num)
-            if data and data.get('name') != '(약 미등록)':
-                name = data.get('name', '미지정')
-                remain = data.get('remain', 0)
-                total = data.get('total', 0)
-                stock_color = self.TEXT_COLOR
-                if total > 0:
-                    percentage = (remain / total) * 100
-                    if percentage >= 50: stock_color = '#388E3C'
-                    elif 20 <= percentage < 50: stock_color = '#FFA000'
-                    else: stock_color = '#D32F2F'
-                else: stock_color = '#D32F2F'
-                labels['name'].config(text=name)
-                labels['stock'].config(text=f"{remain} / {total}", foreground=stock_color)
-                try:
-                    img_path = f"gui/assets/images/slot_{slot_num}.png"
-                    img = Image.open(img_path).resize((80, 80), Image.Resampling.LANCZOS)
-                    photo_img = ImageTk.PhotoImage(img)
-                    labels['img'].config(image=photo_img)
-                    self._inventory_images.append(photo_img)
-                except FileNotFoundError:
-                    labels['img'].config(image='')
-            else:
-                labels['name'].config(text="비어있음")
-                labels['stock'].config(text="- / -", foreground=self.TEXT_COLOR)
-                labels['img'].config(image='')
-
-    def update_user_tile(self, users: list):
-        # ✅ 데이터 변경 감지: 이전과 동일하면 업데이트하지 않음
-        import json
-        users_json = json.dumps(users, sort_keys=True)
-        if self._cached_users == users_json:
+        self.update_tile_content(4, snap.row("text")[1])
+
+    def update_schedule_tile(self, schedules):
+        snap = self._as_model(schedules, view_models.schedules)
+        if not self._schedules_state.changed(snap):
+            return  # 변경 없음
+        self._schedule_list.set_rows(snap.rows, snap.hashes)
+
+    def update_inventory_tile(self, slots):
+        snap = self._as_model(slots, view_models.slots)
+        if not self._slots_state.changed(snap):
+            return  # 변경 없음
+        self._inventory_list.set_rows(snap.rows, snap.hashes)
+
+    def update_user_tile(self, users):
+        snap = self._as_model(users, view_models.users)
+        if not self._users_state.changed(snap):
             return  # 변경 없음, 다시 그리지 않음
 
-        self._cached_users = users_json
-        container = self.tiles[5]
-
         # 빈 상태 처리
-        if not users:
-            # 모든 프레임 숨기기
-            for frame in self._user_frames:
-                frame.place_forget()
-            # 빈 상태 라벨 표시
-            if not hasattr(self, '_empty_user_label'):
-                self._empty_user_label = ttk.Label(container, text="등록된 사용자 없음",
-                                                   style='CardContent.TLabel', anchor="center")
+        container = self.tiles[5]
+        if not hasattr(self, '_empty_user_label'):
+            self._empty_user_label = ttk.Label(container, text="등록된 사용자 없음",
+                                               style='CardContent.TLabel', anchor="center")
+        if snap.rows:
+            self._empty_user_label.place_forget()
+        else:
             self._empty_user_label.place(relx=0.5, rely=0.5, anchor='center')
-            return
+        self._user_list.set_rows(snap.rows, snap.hashes)
 
-        # 빈 상태 라벨 숨기기
-        if hasattr(self, '_empty_user_label'):
-            self._empty_user_label.place_forget()
+    # --- 페이지 리스트 행 위젯 (풀 생성 / 데이터 대입) ---
+    def _make_page_indicator(self, card):
+        label = ttk.Label(card, text="", font=('Helvetica', 14), background=self.CARD_COLOR, foreground=self.BORDER_COLOR)
+        label.pack(side=tk.BOTTOM, anchor='e', padx=10)
+        return label
 
-        users.sort(key=lambda u: u.get('role') != 'parent')
-
-        # ✅ 유저 수만큼 프레임 생성/재사용 (destroy 제거)
-        for i, user in enumerate(users):
-            if i < len(self._user_frames):
-                # ✅ 기존 프레임 재사용 - 라벨만 업데이트 (destroy 제거!)
-                user_frame = self._user_frames[i]
-                labels = [w for w in user_frame.winfo_children() if isinstance(w, ttk.Label)]
-
-                user_name = user.get('name', '이름없음')
-                is_parent = user.get('role') == 'parent'
-
-                # 기존 라벨 업데이트
-                if labels:
-                    # 기존 구조와 다르면 재생성
-                    if (is_parent and len(labels) != 2) or (not is_parent and len(labels) != 1):
-                        for child in user_frame.winfo_children():
-                            child.destroy()
-                        self._create_user_labels(user_frame, user_name, is_parent)
-                    else:
-                        # 라벨 텍스트만 업데이트
-                        labels[0].config(text=user_name)
-                        if is_parent and len(labels) > 1:
-                            labels[1].config(text="(보호자)")
-                else:
-                    # 라벨이 없으면 생성
-                    self._create_user_labels(user_frame, user_name, is_parent)
-            else:
-                # ✅ 새 프레임 생성 (최초 1회만)
-                user_frame = ttk.Frame(container, style='Card.TFrame')
-                self._user_frames.append(user_frame)
-                user_name = user.get('name', '이름없음')
-                is_parent = user.get('role') == 'parent'
-                self._create_user_labels(user_frame, user_name, is_parent)
-
-            # 프레임 위치 설정
-            user_frame.place(x=0, y=i * 45, relwidth=1.0, height=45)
-
-        # 사용하지 않는 프레임 숨기기
-        for i in range(len(users), len(self._user_frames)):
-            self._user_frames[i].place_forget()
-
-    def _create_user_labels(self, parent_frame, user_name, is_parent):
-        """✅ 유저 라벨 생성 헬퍼 함수"""
-        if is_parent:
-            ttk.Label(parent_frame, text=user_name, font=('Helvetica', 22, 'bold'),
-                     background=self.CARD_COLOR, foreground=self.TEXT_COLOR).pack(
-                side=tk.LEFT, anchor='w', padx=(10, 5), pady=5)
-            ttk.Label(parent_frame, text="(보호자)", font=('Helvetica', 22, 'bold'),
-                     background=self.CARD_COLOR, foreground=self.ACCENT_COLOR).pack(
-                side=tk.LEFT, anchor='w', padx=(0, 10), pady=5)
+    def _bind_schedule_row(self, label, row):
+        if row.kind == "header":
+            label.config(text=row.text, font=('Helvetica', 22, 'bold'), foreground=self.ACCENT_COLOR)
         else:
-            ttk.Label(parent_frame, text=user_name, font=('Helvetica', 22),
-                     background=self.CARD_COLOR, foreground=self.TEXT_COLOR).pack(
-                anchor='w', padx=(25, 0), pady=5)
+            label.config(text=row.text, font=('Helvetica', 22), foreground=self.TEXT_COLOR)
+
+    def _make_slot_row(self, parent, col):
+        slot_frame = ttk.Frame(parent, style='Card.TFrame')
+        title_label = ttk.Label(slot_frame, text="", font=('Helvetica', 24, 'bold'), background=self.CARD_COLOR, foreground=self.ACCENT_COLOR, anchor="center")
+        title_label.pack(pady=(5, 10), side=tk.TOP)
+        stock_label = ttk.Label(slot_frame, text="- / -", font=('Helvetica', 28, 'bold'), background=self.CARD_COLOR, foreground=self.TEXT_COLOR, anchor="center")
+        stock_label.pack(pady=(10, 5), side=tk.BOTTOM)
+        name_label = ttk.Label(slot_frame, text="-", font=('Helvetica', 20), background=self.CARD_COLOR, foreground=self.TEXT_COLOR, anchor="center", wraplength=150, justify=tk.CENTER)
+        name_label.pack(pady=0, side=tk.BOTTOM)
+        img_label = ttk.Label(slot_frame, background=self.CARD_COLOR)
+        img_label.pack(pady=5, expand=True)
+        return {'frame': slot_frame, 'title': title_label, 'name': name_label, 'stock': stock_label, 'img': img_label, 'photo': None}
+
+    def _bind_slot_row(self, labels, row):
+        labels['title'].config(text=f"Slot {row.slot_number}")
+        labels['name'].config(text=row.name)
+        labels['stock'].config(text=row.stock_text, foreground=self.STOCK_COLORS.get(row.level, self.TEXT_COLOR))
+        photo = self._image_cache.get_photo(slot_image_path(row.slot_number)) if row.has_medicine else None
+        self._set_slot_image(labels, photo)
+
+    def _set_slot_image(self, labels, photo):
+        """같은 이미지면 재설정하지 않음 (참조는 labels['photo']로 유지)"""
+        if labels['photo'] is photo:
+            return
+        labels['photo'] = photo
+        labels['img'].config(image=photo if photo is not None else '')
+
+    def _make_user_row(self, parent, idx):
+        """✅ 유저 행: 이름 + (보호자) 라벨, 역할에 따라 배치만 바꿔서 재사용"""
+        user_frame = ttk.Frame(parent, style='Card.TFrame')
+        name_label = ttk.Label(user_frame, text="", background=self.CARD_COLOR, foreground=self.TEXT_COLOR)
+        role_label = ttk.Label(user_frame, text="(보호자)", font=('Helvetica', 22, 'bold'),
+                               background=self.CARD_COLOR, foreground=self.ACCENT_COLOR)
+        return {'frame': user_frame, 'name': name_label, 'role': role_label}
+
+    def _bind_user_row(self, labels, row):
+        labels['name'].pack_forget()
+        labels['role'].pack_forget()
+        if row.is_parent:
+            labels['name'].config(text=row.name, font=('Helvetica', 22, 'bold'))
+            labels['name'].pack(side=tk.LEFT, anchor='w', padx=(10, 5), pady=5)
+            labels['role'].pack(side=tk.LEFT, anchor='w', padx=(0, 10), pady=5)
+        else:
+            labels['name'].config(text=row.name, font=('Helvetica', 22))
+            labels['name'].pack(anchor='w', padx=(25, 0), pady=5)
 
     def _start_watchdog(self):
         """
@@ -386,7 +444,9 @@ class DashboardApp(tk.Tk):
             # 체크 4: 정상 상태 로깅 (5분마다)
             time_since_last_log = current_time - self._last_watchdog_log
             if time_since_last_log >= 300:  # 5분(300초) 경과 시
-                print(f"[WATCHDOG] ✅ GUI 정상 작동 중 (heartbeat: {elapsed:.1f}초 전)")
+                p99 = metrics.quantile("tdb_ui_loop_lag_seconds", 0.99)
+                lag_info = f", 루프 지연 p99: {p99 * 1000:.0f}ms" if p99 is not None else ""
+                print(f"[WATCHDOG] ✅ GUI 정상 작동 중 (heartbeat: {elapsed:.1f}초 전{lag_info})")
                 self._last_watchdog_log = current_time
 
         except Exception as e:
@@ -408,41 +468,17 @@ class DashboardApp(tk.Tk):
         self.after(1000, self.update_time)
 
     def take_screenshot(self, event=None):
-        """F12 키로 스크린샷 저장 (grim 사용)"""
-        try:
-            # 스크린샷 저장 디렉토리
-            screenshot_dir = os.path.expanduser("~/screenshots")
-            os.makedirs(screenshot_dir, exist_ok=True)
-
-            # 타임스탬프 파일명
-            timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-            filename = os.path.join(screenshot_dir, f"{timestamp}_tdb_gui.png")
-
-            # grim으로 스크린샷 캡처 (Wayland)
-            result = subprocess.run(['grim', filename],
-                                  capture_output=True,
-                                  text=True,
-                                  timeout=5)
-
-            if result.returncode == 0:
-                print(f"✅ 스크린샷 저장: {filename}")
-                self.show_popup("스크린샷 저장 완료",
-                              f"저장 위치:\n{filename}")
-                # 3초 후 팝업 자동 닫기
-                self.after(3000, self.hide_popup)
-            else:
-                raise Exception(f"grim 실행 실패: {result.stderr}")
-
-        except FileNotFoundError:
-            print("❌ grim이 설치되어 있지 않습니다")
-            self.show_popup("스크린샷 실패",
-                          "grim이 설치되어 있지 않습니다.\nsudo apt install grim")
-        except subprocess.TimeoutExpired:
-            print("❌ 스크린샷 타임아웃")
-            self.show_popup("스크린샷 실패", "스크린샷 캡처 시간 초과")
-        except Exception as e:
-            print(f"❌ 스크린샷 실패: {e}")
-            self.show_popup("스크린샷 실패", f"오류 발생:\n{str(e)}")
+        """F12 키로 스크린샷 저장 (캡처는 워커에서, 결과만 팝업으로 표시)"""
+        if not self._screenshots.capture(self._on_screenshot_done):
+            print("[SCREENSHOT] 이전 캡처 진행 중... 무시")
+
+    def _on_screenshot_done(self, ok, detail):
+        if ok:
+            self.show_popup("스크린샷 저장 완료", f"저장 위치:\n{detail}")
+            # 3초 후 팝업 자동 닫기
+            self.after(3000, self.hide_popup)
+        else:
+            self.show_popup("스크린샷 실패", f"오류 발생:\n{detail}")
 
 if __name__ == '__main__':
     app = DashboardApp(fullscreen=False)
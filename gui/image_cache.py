@@ -0,0 +1,88 @@
+# gui/image_cache.py
+"""
+인벤토리 타일용 이미지 캐시
+
+- 디코딩 + LANCZOS 리사이즈는 시작 시 워커 스레드에서 1회 (preload)
+- PhotoImage는 Tk 메인 스레드에서만 만들 수 있으므로 첫 사용 시 생성 후 재사용
+- 최대 개수(max_items)를 넘으면 가장 오래 안 쓴 항목부터 제거 (LRU)
+"""
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from services.lazy_import import lazy_import
+
+# ✅ PIL은 첫 preload/렌더 시점에 로드
+Image = lazy_import("PIL.Image")
+ImageTk = lazy_import("PIL.ImageTk")
+
+ASSET_DIR = Path(__file__).resolve().parent / "assets" / "images"
+
+
+def slot_image_path(slot_num: int) -> Path:
+    return ASSET_DIR / f"slot_{slot_num}.png"
+
+
+class ImageCache:
+    def __init__(self, size=(80, 80), max_items: int = 16):
+        self.size = tuple(size)
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._decoded = OrderedDict()   # path -> PIL.Image (리사이즈 완료) | None(파일 없음)
+        self._photos = OrderedDict()    # path -> ImageTk.PhotoImage
+
+    def _decode(self, path: Path):
+        try:
+            with Image.open(path) as img:
+                img.load()
+                return img.resize(self.size, Image.Resampling.LANCZOS)
+        except FileNotFoundError:
+            return None
+
+    def _remember(self, store: OrderedDict, key, value):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self.max_items:
+            store.popitem(last=False)
+
+    def preload(self, paths):
+        """워커 스레드에서 미리 디코딩/리사이즈 (Tk 호출 없음)"""
+        paths = [Path(p) for p in paths]
+
+        def _run():
+            for p in paths:
+                with self._lock:
+                    if p in self._decoded:
+                        continue
+                img = self._decode(p)
+                with self._lock:
+                    self._remember(self._decoded, p, img)
+
+        t = threading.Thread(target=_run, daemon=True)
+        t.start()
+        return t
+
+    def get_photo(self, path):
+        """
+        Tk 메인 스레드 전용. 캐시된 PhotoImage 반환 (파일 없으면 None)
+        preload가 아직 안 끝났으면 그 자리에서 디코딩
+        """
+        path = Path(path)
+        photo = self._photos.get(path)
+        if photo is not None:
+            self._photos.move_to_end(path)
+            return photo
+
+        with self._lock:
+            found = path in self._decoded
+            img = self._decoded.get(path)
+        if not found:
+            img = self._decode(path)
+            with self._lock:
+                self._remember(self._decoded, path, img)
+        if img is None:
+            return None
+
+        photo = ImageTk.PhotoImage(img)
+        self._remember(self._photos, path, photo)
+        return photo
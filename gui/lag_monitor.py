@@ -0,0 +1,115 @@
+# gui/lag_monitor.py
+"""
+Tk 이벤트 루프 지연(lag) 모니터
+
+- Tk 스레드: interval_ms 주기 after() 틱이 예정보다 얼마나 늦었는지 측정 → 히스토그램
+- 감시 스레드: 틱이 stall_ms 이상 안 오면 "지금 메인 스레드에서 실행 중인 것"을 캡처
+  (UiDispatcher 콜백이면 그 이름, 아니면 메인 스레드 스택에서 프로젝트 코드 프레임)
+- 틱이 돌아오면 멈춤 시간 + 원인 라벨로 메트릭 기록
+watchdog(60초 무응답 → 재시작)보다 훨씬 먼저 /metrics 에서 멈춤이 보이도록 함
+"""
+import os
+import sys
+import threading
+import time
+
+from services import metrics
+
+# 루프 지연은 ms 단위가 중요 (LATENCY_BUCKETS보다 촘촘하게)
+LAG_BUCKETS = (0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+metrics.describe("tdb_ui_loop_lag_seconds", "histogram", "Delay of the Tk event-loop sampler tick past its schedule")
+metrics.describe("tdb_ui_stall_seconds", "histogram", "Main-thread stalls longer than the stall threshold, by culprit")
+metrics.describe("tdb_ui_stalls_total", "counter", "Main-thread stalls longer than the stall threshold, by culprit")
+
+
+def _callback_name(func) -> str:
+    func = getattr(func, "func", func)  # functools.partial
+    return getattr(func, "__qualname__", None) or getattr(func, "__name__", None) or repr(func)
+
+
+def _main_thread_frame(ident) -> str:
+    """메인 스레드 스택에서 가장 안쪽의 프로젝트 코드 프레임 (tkinter/표준 라이브러리 제외)"""
+    frame = sys._current_frames().get(ident)
+    while frame is not None:
+        path = os.path.abspath(frame.f_code.co_filename)
+        if path.startswith(_PROJECT_ROOT) and not path.endswith("lag_monitor.py"):
+            return f"{frame.f_code.co_name} ({os.path.relpath(path, _PROJECT_ROOT)}:{frame.f_lineno})"
+        frame = frame.f_back
+    return "unknown"
+
+
+class LagMonitor:
+    def __init__(self, root, dispatcher=None, interval_ms: int = 50, stall_ms: int = 250):
+        self.root = root
+        self.dispatcher = dispatcher
+        self.interval = interval_ms / 1000.0
+        self.stall = stall_ms / 1000.0
+        self._main_ident = threading.get_ident()  # Tk 스레드에서 생성
+        self._lock = threading.Lock()
+        self._last_tick = time.monotonic()
+        self._expected = self._last_tick + self.interval
+        self._culprit = None
+        self._max_lag = 0.0          # 최근 1분 최대값 (게이지)
+        self._max_lag_reset = time.monotonic()
+        self._running = False
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        metrics.register_callback("tdb_ui_max_lag_seconds", self._read_max_lag, "gauge",
+                                  "Largest event-loop lag seen in the last minute")
+        self._last_tick = time.monotonic()
+        self._expected = self._last_tick + self.interval
+        self.root.after(int(self.interval * 1000), self._tick)
+        threading.Thread(target=self._watch_loop, daemon=True).start()
+
+    def stop(self):
+        self._running = False
+
+    def _read_max_lag(self):
+        with self._lock:
+            return self._max_lag
+
+    # --- Tk 스레드 ---
+    def _tick(self):
+        if not self._running:
+            return
+        now = time.monotonic()
+        lag = max(0.0, now - self._expected)
+        metrics.observe("tdb_ui_loop_lag_seconds", lag, buckets=LAG_BUCKETS)
+
+        with self._lock:
+            self._last_tick = now
+            culprit, self._culprit = self._culprit, None
+            if now - self._max_lag_reset >= 60:
+                self._max_lag, self._max_lag_reset = 0.0, now
+            self._max_lag = max(self._max_lag, lag)
+
+        if lag >= self.stall:
+            culprit = culprit or "unknown"
+            metrics.observe("tdb_ui_stall_seconds", lag, buckets=LAG_BUCKETS, callback=culprit)
+            metrics.inc("tdb_ui_stalls_total", callback=culprit)
+            print(f"[UI_LAG] ⚠️ 메인 스레드 {lag * 1000:.0f}ms 멈춤 (원인: {culprit})")
+
+        self._expected = now + self.interval
+        self.root.after(int(self.interval * 1000), self._tick)
+
+    # --- 감시 스레드 ---
+    def _watch_loop(self):
+        """틱이 늦어지는 동안 메인 스레드가 무엇을 실행 중인지 캡처 (멈춤당 최초 1회)"""
+        poll = max(0.01, self.stall / 4)
+        while self._running:
+            time.sleep(poll)
+            with self._lock:
+                overdue = time.monotonic() - self._last_tick - self.interval
+                if overdue < self.stall or self._culprit is not None:
+                    continue
+            current = self.dispatcher.current_callback if self.dispatcher else None
+            culprit = _callback_name(current) if current is not None else _main_thread_frame(self._main_ident)
+            with self._lock:
+                if self._culprit is None:
+                    self._culprit = culprit
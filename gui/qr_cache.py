@@ -0,0 +1,97 @@
+# gui/qr_cache.py
+"""
+QR 렌더 캐시 (gui_app / qr_display 공용)
+
+- (payload, size) 키로 렌더 결과(PIL 이미지)를 LRU 보관
+- render_async(): qrcode 생성 + 리사이즈를 워커 스레드에서 수행 후 Tk 스레드로 콜백
+- get_photo(): Tk 메인 스레드 전용, PhotoImage도 키별로 재사용
+"""
+import threading
+from collections import OrderedDict
+
+from services.lazy_import import lazy_import
+
+# ✅ qrcode / PIL은 첫 렌더 시점에 로드 (첫 화면 표시를 늦추지 않도록)
+qrcode = lazy_import("qrcode")
+Image = lazy_import("PIL.Image")
+ImageTk = lazy_import("PIL.ImageTk")
+
+MAX_ITEMS = 16  # 기기등록/키트 QR은 종류가 적고 반복됨
+
+_lock = threading.Lock()
+_images = OrderedDict()   # (payload, size) -> PIL.Image
+_photos = OrderedDict()   # (payload, size) -> ImageTk.PhotoImage (Tk 스레드 전용)
+_pending = {}             # (payload, size) -> [callback, ...] (렌더 중복 방지)
+
+
+def _remember(store: OrderedDict, key, value):
+    store[key] = value
+    store.move_to_end(key)
+    while len(store) > MAX_ITEMS:
+        store.popitem(last=False)
+
+
+def render(payload: str, size: int = 300):
+    """QR PIL 이미지 (캐시 우선, 없으면 현재 스레드에서 생성)"""
+    key = (payload, size)
+    with _lock:
+        img = _images.get(key)
+        if img is not None:
+            _images.move_to_end(key)
+            return img
+    img = qrcode.make(payload).convert("RGB").resize((size, size), Image.Resampling.LANCZOS)
+    with _lock:
+        _remember(_images, key, img)
+    return img
+
+
+def is_cached(payload: str, size: int = 300) -> bool:
+    with _lock:
+        return (payload, size) in _images
+
+
+def get_photo(payload: str, size: int = 300):
+    """Tk 메인 스레드 전용: 캐시된 PhotoImage 반환 (없으면 렌더 후 생성)"""
+    key = (payload, size)
+    photo = _photos.get(key)
+    if photo is not None:
+        _photos.move_to_end(key)
+        return photo
+    photo = ImageTk.PhotoImage(render(payload, size))
+    _remember(_photos, key, photo)
+    return photo
+
+
+def render_async(root, payload: str, size: int, callback):
+    """
+    워커 스레드에서 렌더 → root.after(0, ...)로 Tk 스레드에서 callback(photo) 호출
+    이미 캐시돼 있으면 즉시(동기) 콜백
+    """
+    key = (payload, size)
+    if key in _photos or is_cached(payload, size):
+        callback(get_photo(payload, size))
+        return
+    with _lock:
+        if key in _pending:
+            _pending[key].append(callback)
+            return
+        _pending[key] = [callback]
+
+    def _run():
+        try:
+            render(payload, size)
+        finally:
+            with _lock:
+                callbacks = _pending.pop(key, [])
+            root.after(0, lambda: [cb(get_photo(payload, size)) for cb in callbacks])
+
+    threading.Thread(target=_run, daemon=True).start()
+
+
+def prerender(items):
+    """[(payload, size), ...] 를 워커 스레드에서 미리 렌더 (Tk 호출 없음)"""
+    def _run():
+        for payload, size in items:
+            if payload:
+                render(payload, size)
+    threading.Thread(target=_run, daemon=True).start()
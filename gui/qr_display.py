@@ -1,13 +1,12 @@
 # gui/qr_display.py
-import json, time, threading
+import json, os, socket, time, threading
 from pathlib import Path
 from dataclasses import dataclass
 from typing import Optional
 from config import settings
 
 import tkinter as tk
-from PIL import Image, ImageTk
-import qrcode
+from gui import qr_cache
 
 STATE_PATH = Path("data/state.json")
 
@@ -15,7 +14,8 @@ REG_MACHINE_PATH = "/register-dispenser"   # 프론트 라우트
 REG_KIT_PATH     = "/register-daily-kit"   # 프론트 라우트
 # 서버 담당과 합의 되면 경로/파라미터 맞춰 수정
 
-POLL_MS = 500  # 상태 폴링 주기(ms)
+POLL_MS = 500  # 소켓을 쓸 수 없을 때만 사용하는 스냅샷 확인 주기(ms)
+RECONNECT_MS = 3000  # 상태 소켓 재연결 시도 주기(ms)
 
 @dataclass
 class ViewState:
@@ -25,24 +25,101 @@ class ViewState:
     progress: dict = None
     error: Optional[str] = None
 
+def _view_state_from_dict(d: dict) -> ViewState:
+    return ViewState(
+        status=d.get("status","waiting_uid"),
+        last_uid=d.get("last_uid"),
+        phase=d.get("phase"),
+        progress=d.get("progress") or {},
+        error=d.get("error"),
+    )
+
 def read_state() -> ViewState:
     try:
-        d = json.loads(STATE_PATH.read_text(encoding="utf-8"))
-        return ViewState(
-            status=d.get("status","waiting_uid"),
-            last_uid=d.get("last_uid"),
-            phase=d.get("phase"),
-            progress=d.get("progress") or {},
-            error=d.get("error"),
-        )
+        return _view_state_from_dict(json.loads(STATE_PATH.read_text(encoding="utf-8")))
     except Exception:
         return ViewState()
 
+class StateFeed:
+    """
+    상태 버스 구독 (hwserial/state_bus.py의 UNIX 소켓)
+    - 소켓이 readable일 때만 Tk 이벤트 루프가 콜백 호출 (createfilehandler, 폴링 없음)
+    - 소켓 연결 불가 시: state.json의 mtime이 바뀐 경우에만 다시 읽음
+    """
+    def __init__(self, root: tk.Tk, on_state):
+        self.root = root
+        self.on_state = on_state
+        self._sock = None
+        self._buf = b""
+        self._last_mtime = None
+        self._polling = False
+        self._connect()
+
+    def _connect(self):
+        path = settings.project_path(settings.STATE_SOCKET_PATH)
+        if path and hasattr(socket, "AF_UNIX") and hasattr(self.root.tk, "createfilehandler"):
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(path)
+                sock.setblocking(False)
+                self._sock = sock
+                self._buf = b""
+                self.root.tk.createfilehandler(sock, tk.READABLE, self._on_readable)
+                return
+            except OSError:
+                self._sock = None
+        # 소켓 없음 → 스냅샷 파일 변경 확인 후 재연결 시도
+        if not self._polling:
+            self._polling = True
+            self._poll_snapshot()
+        self.root.after(RECONNECT_MS, self._retry_connect)
+
+    def _retry_connect(self):
+        if self._sock is None:
+            self._connect()
+
+    def _on_readable(self, *_):
+        try:
+            chunk = self._sock.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b""
+        if not chunk:
+            # 서버 종료 → 파일 모드로 전환 후 재연결
+            self.root.tk.deletefilehandler(self._sock)
+            self._sock.close()
+            self._sock = None
+            self._connect()
+            return
+        self._buf += chunk
+        *lines, self._buf = self._buf.split(b"\n")
+        latest = None
+        for line in lines:
+            if line.strip():
+                latest = line  # 한 번에 여러 건이 오면 마지막 상태만 반영
+        if latest is not None:
+            try:
+                self.on_state(_view_state_from_dict(json.loads(latest)))
+            except ValueError:
+                pass
+
+    def _poll_snapshot(self):
+        if self._sock is not None:
+            self._polling = False
+            return
+        try:
+            mtime = os.stat(STATE_PATH).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._last_mtime:
+            self._last_mtime = mtime
+            self.on_state(read_state())
+        self.root.after(POLL_MS, self._poll_snapshot)
+
 # JSON QR 헬퍼
-def make_qr_from_json(payload: dict, size: int = 320):
-    s = json.dumps(payload, separators=(",", ":"))
-    img = qrcode.make(s).resize((size, size))
-    return ImageTk.PhotoImage(img)
+def qr_json(payload: dict) -> str:
+    return json.dumps(payload, separators=(",", ":"))
 
 def status_text(vs: ViewState) -> str:
     m = {
@@ -78,10 +155,32 @@ class App(tk.Tk):
         self.lbl_sub = tk.Label(self, text="", font=("Arial", 12), bg="white", fg="#555")
         self.lbl_sub.pack(pady=5)
 
-        self.after(POLL_MS, self.tick)
-
-    def tick(self):
-        vs = read_state()
+        self._last_vs = None
+        self._qr_payload = None   # 지금 보여줘야 할 QR (렌더가 끝나기 전에 화면이 바뀌면 무시)
+
+        # ✅ 기기 등록 QR은 미리 렌더
+        device_uid = (getattr(settings, "DEVICE_UID", None) or settings.MACHINE_ID).upper()
+        qr_cache.prerender([(json.dumps({getattr(settings, "QR_MACHINE_KEY", "uid"): device_uid},
+                                        separators=(",", ":")), 320)])
+        self.feed = StateFeed(self, self.tick)
+
+    def _show_qr(self, payload: dict, size: int = 320):
+        """✅ QR 렌더는 워커 스레드에서 (Tk 스레드 블로킹 없음), 같은 payload면 캐시 재사용"""
+        s = qr_json(payload)
+        self._qr_payload = s
+        qr_cache.render_async(self, s, size, lambda photo: self._apply_qr(s, photo))
+
+    def _apply_qr(self, payload: str, photo):
+        if self._qr_payload != payload:
+            return  # 그 사이 다른 화면으로 바뀜
+        self.canvas.config(image=photo); self.canvas.image = photo
+
+    def tick(self, vs: ViewState):
+        # ✅ 상태가 바뀐 경우에만 다시 그림
+        if vs == self._last_vs:
+            return
+        self._last_vs = vs
+        self._qr_payload = None
         self.lbl_status.config(text=status_text(vs))
 
         # 어떤 화면을 띄울지 결정
@@ -91,17 +190,15 @@ class App(tk.Tk):
 
         # kit_not_registered → 키트등록 QR(JSON)
         if vs.status == "kit_not_registered" and vs.last_uid:
-            payload = {"uid": vs.last_uid.upper()}
-            img = make_qr_from_json(payload, size=320)
-            self.canvas.config(image=img); self.canvas.image = img
+            self.canvas.config(image=""); self.canvas.image = None
+            self._show_qr({"uid": vs.last_uid.upper()}, size=320)
             self.lbl_title.config(text="키트 등록이 필요합니다")
             self.lbl_sub.config(text=f"K_UID: {vs.last_uid.upper()}")
         # machine_not_registered → 기기등록 QR(JSON)
         elif vs.status == "machine_not_registered":
             device_uid = (getattr(settings, "DEVICE_UID", None) or settings.MACHINE_ID).upper()
-            payload = {getattr(settings, "QR_MACHINE_KEY", "uid"): device_uid}
-            img = make_qr_from_json(payload, size=320)
-            self.canvas.config(image=img); self.canvas.image = img
+            self.canvas.config(image=""); self.canvas.image = None
+            self._show_qr({getattr(settings, "QR_MACHINE_KEY", "uid"): device_uid}, size=320)
             self.lbl_title.config(text="기기 등록이 필요합니다")
             self.lbl_sub.config(text=f"UID: {device_uid}")
         elif vs.status == "waiting_uid":
@@ -137,7 +234,6 @@ class App(tk.Tk):
             sub_text = ""
 
         self.lbl_sub.config(text=sub_text)
-        self.after(POLL_MS, self.tick)
 
 if __name__ == "__main__":
     App().mainloop()
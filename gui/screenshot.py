@@ -0,0 +1,111 @@
+# gui/screenshot.py
+"""
+비동기 스크린샷 (F12)
+
+- capture(): Tk 스레드에서는 창 좌표만 읽고 바로 반환
+- 워커 스레드: grim 프로세스로 임시 파일에 캡처 → 완료 후 rename (반쯤 쓴 파일 노출 방지)
+- grim이 없으면 PIL ImageGrab으로 창 영역 캡처 (X11/XWayland 필요)
+  Tk는 자기 위젯을 이미지로 렌더링하는 API가 없음 (postscript는 Canvas 전용)
+  → 프로세스 내 렌더링 대신 화면 캡처. 순수 Wayland(DISPLAY 없음)에서는 grim 필수
+- 디렉토리에는 최근 keep개만 유지 (오래된 것부터 삭제)
+- 결과는 post(on_done, ok, path_or_error)로 UI 디스패처를 통해 Tk 스레드에 전달
+"""
+import os
+import subprocess
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from services import metrics
+
+SUFFIX = "_tdb_gui.png"
+
+metrics.describe("tdb_screenshot_seconds", "histogram", "Screenshot capture time by method and result")
+
+
+class ScreenshotService:
+    def __init__(self, root, post, directory, keep: int = 50, timeout: float = 5.0):
+        self.root = root
+        self.post = post                      # post(func, *args) → Tk 스레드에서 실행
+        self.directory = Path(os.path.expanduser(directory))
+        self.keep = max(1, int(keep))
+        self.timeout = timeout
+        self._busy = threading.Lock()
+
+    def capture(self, on_done) -> bool:
+        """캡처 시작 (이미 진행 중이면 False). on_done(ok, path_or_error)"""
+        if not self._busy.acquire(blocking=False):
+            return False
+        try:
+            bbox = (self.root.winfo_rootx(), self.root.winfo_rooty(),
+                    self.root.winfo_rootx() + self.root.winfo_width(),
+                    self.root.winfo_rooty() + self.root.winfo_height())
+        except Exception:
+            bbox = None
+        threading.Thread(target=self._run, args=(bbox, on_done), daemon=True).start()
+        return True
+
+    def recent(self):
+        """보관 중인 스크린샷 (최신순)"""
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob(f"*{SUFFIX}"), reverse=True)
+
+    # --- 워커 스레드 ---
+    def _run(self, bbox, on_done):
+        t0 = time.monotonic()
+        method = "grim"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+            path = self.directory / f"{timestamp}{SUFFIX}"
+            tmp = path.with_suffix(".png.part")
+            try:
+                self._grim(tmp)
+            except FileNotFoundError:
+                method = "imagegrab"
+                self._imagegrab(tmp, bbox)
+            tmp.replace(path)
+            self._prune()
+            metrics.observe("tdb_screenshot_seconds", time.monotonic() - t0, method=method, result="ok")
+            print(f"✅ 스크린샷 저장 ({method}): {path}")
+            self.post(on_done, True, str(path))
+        except Exception as e:
+            metrics.observe("tdb_screenshot_seconds", time.monotonic() - t0, method=method, result="error")
+            print(f"❌ 스크린샷 실패 ({method}): {e}")
+            self.post(on_done, False, str(e))
+        finally:
+            self._busy.release()
+
+    def _grim(self, out: Path):
+        """Wayland: grim 별도 프로세스로 캡처"""
+        try:
+            result = subprocess.run(['grim', '-t', 'png', str(out)],
+                                    capture_output=True, text=True, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            raise Exception("스크린샷 캡처 시간 초과")
+        if result.returncode != 0:
+            raise Exception(f"grim 실행 실패: {result.stderr.strip()}")
+
+    @staticmethod
+    def _imagegrab(out: Path, bbox):
+        """grim 없음: 현재 창 영역을 PIL로 캡처"""
+        try:
+            from PIL import ImageGrab
+        except ImportError:
+            raise Exception("grim / PIL ImageGrab 모두 사용할 수 없습니다")
+        if not os.environ.get("DISPLAY"):
+            raise Exception("grim이 없고 X 디스플레이도 없습니다 (순수 Wayland)\nsudo apt install grim")
+        try:
+            img = ImageGrab.grab(bbox=bbox)
+        except OSError as e:
+            raise Exception(f"grim이 없고 화면 캡처도 실패했습니다 ({e})\nsudo apt install grim")
+        img.save(out, format="PNG")
+
+    def _prune(self):
+        for old in self.recent()[self.keep:]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
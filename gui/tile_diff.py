@@ -0,0 +1,71 @@
+# gui/tile_diff.py
+"""
+타일 변경 감지 (json.dumps 문자열 비교 대체)
+
+- 행 해시: 서버 버전 스탬프(version/updated_at 등)가 있으면 (키, 스탬프)만 사용,
+  없으면 행 구조를 해시 가능한 튜플로 바꿔 hash()
+- snapshot(): 폴링 스레드에서 행 해시 + 전체 지문(fp)까지 미리 계산
+- TileState.changed(): Tk 스레드에서 지문만 비교 (O(1))
+  행 단위 건너뛰기는 행 해시로 VirtualList(set_rows)가 처리
+"""
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+# 서버가 행마다 내려줄 수 있는 버전 스탬프 필드 (앞에서부터 먼저 찾은 것 사용)
+VERSION_FIELDS = ("version", "rev", "etag", "updated_at")
+
+
+def freeze(obj):
+    """dict/list를 해시 가능한 튜플로 (키 순서 무관)"""
+    if isinstance(obj, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in obj.items()))
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(v) for v in obj)
+    if isinstance(obj, set):
+        return tuple(sorted(freeze(v) for v in obj))
+    return obj
+
+
+def row_hash(row, key=None) -> int:
+    if isinstance(row, dict):
+        for f in VERSION_FIELDS:
+            stamp = row.get(f)
+            if stamp is not None:
+                return hash((key, f, stamp))
+    return hash(freeze(row))
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    rows: tuple        # 원본 행 (렌더링 순서)
+    keys: tuple        # 행 키 (슬롯 번호, 인덱스 등)
+    hashes: tuple      # 행 해시
+    fp: int            # 전체 지문
+
+    def row(self, key):
+        return self.rows[self.keys.index(key)]
+
+
+def snapshot(rows, key: Optional[Callable] = None) -> Snapshot:
+    """폴링 스레드에서 호출. key 미지정 시 행 순서(인덱스)가 키"""
+    rows = tuple(rows or ())
+    keys = tuple(key(r) for r in rows) if key else tuple(range(len(rows)))
+    hashes = tuple(row_hash(r, k) for r, k in zip(rows, keys))
+    return Snapshot(rows=rows, keys=keys, hashes=hashes, fp=hash((keys, hashes)))
+
+
+class TileState:
+    """타일 1개가 마지막으로 그린 상태 (전체 지문만)"""
+
+    def __init__(self):
+        self.fp = None
+
+    def changed(self, snap: Snapshot) -> bool:
+        """지문이 다르면 True (적용된 것으로 간주하고 상태 갱신)"""
+        if snap.fp == self.fp:
+            return False
+        self.fp = snap.fp
+        return True
+
+    def reset(self):
+        self.fp = None
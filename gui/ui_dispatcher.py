@@ -0,0 +1,66 @@
+# gui/ui_dispatcher.py
+"""
+프레임 단위 UI 업데이트 디스패처 (DashboardApp.ui_call 백엔드)
+
+- 워커 스레드는 post()로 업데이트를 등록만 함
+- 같은 key((위젯, 필드) 등)로 다시 들어오면 이전 업데이트는 버림 (최신 값만 적용)
+- 대기 중인 업데이트는 한 프레임에 한 번, 최대 max_fps 속도로 일괄 적용
+- key가 없는 호출은 버리지 않고 등록 순서대로 실행 (팝업 show/hide 등)
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from services import metrics
+
+metrics.describe("tdb_ui_updates_total", "counter", "UI updates posted to the dispatcher")
+metrics.describe("tdb_ui_updates_superseded_total", "counter", "UI updates dropped because a newer one replaced them")
+
+
+class UiDispatcher:
+    def __init__(self, root, max_fps: float = 20.0):
+        self.root = root
+        self.frame_interval = 1.0 / max(1.0, float(max_fps))
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()   # key -> (func, args, kwargs)
+        self._scheduled = False
+        self._last_frame = 0.0
+        self._seq = 0
+        self.current_callback = None    # 지금 실행 중인 콜백 (멈춤 원인 추적용)
+
+    def post(self, func, *args, key=None, **kwargs):
+        """어느 스레드에서나 호출 가능"""
+        with self._lock:
+            if key is None:
+                self._seq += 1
+                key = ("__seq__", self._seq)
+            elif key in self._pending:
+                del self._pending[key]  # 이전 값 폐기, 새 값은 맨 뒤로
+                metrics.inc("tdb_ui_updates_superseded_total")
+            self._pending[key] = (func, args, kwargs)
+            metrics.inc("tdb_ui_updates_total")
+            if self._scheduled:
+                return
+            self._scheduled = True
+            delay = self._last_frame + self.frame_interval - time.monotonic()
+        self.root.after(max(0, int(delay * 1000)), self._drain)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _drain(self):
+        """Tk 메인 스레드: 대기 중인 업데이트를 한 번에 적용"""
+        with self._lock:
+            batch = list(self._pending.values())
+            self._pending.clear()
+            self._scheduled = False
+            self._last_frame = time.monotonic()
+        for func, args, kwargs in batch:
+            self.current_callback = func
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"[UI_DISPATCH_ERR] {getattr(func, '__name__', func)}: {e}")
+            finally:
+                self.current_callback = None
@@ -0,0 +1,165 @@
+# gui/view_models.py
+"""
+타일 뷰모델 (폴링 스레드에서 렌더 직전 형태까지 가공)
+
+- 정렬 / 시간 파싱·시간대 변환 / 문자열 조립 / 재고 단계 계산은 여기서 끝냄
+- Tk 스레드(gui_app.update_*_tile)는 tile_diff 지문 비교 후 바뀐 라벨에 텍스트만 대입
+- 같은 입력(버전)이 다시 오면 이전 결과를 그대로 반환 (메모이즈)
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from gui import tile_diff
+
+SCHEDULE_SLOTS = {"morning": "아침", "afternoon": "점심", "evening": "저녁"}
+INVENTORY_SLOTS = (1, 2, 3)   # 서버가 안 내려줘도 항상 표시하는 기본 슬롯
+LOW_STOCK_DAYS = 3            # 남은 일수가 이 이하면 '부족' 색상
+
+
+@dataclass(frozen=True)
+class SlotRow:
+    slot_number: int
+    name: str
+    stock_text: str
+    level: Optional[str]      # ok | low | critical | None(비어있음)
+    has_medicine: bool
+
+
+@dataclass(frozen=True)
+class ScheduleRow:
+    kind: str                 # header(시간대 제목) | entry
+    text: str
+
+
+@dataclass(frozen=True)
+class UserRow:
+    name: str
+    is_parent: bool
+
+
+class _Memo:
+    """입력 버전(구조 해시)이 같으면 마지막 결과 재사용"""
+
+    def __init__(self, build):
+        self._build = build
+        self._lock = threading.Lock()
+        self._version = None
+        self._result = None
+
+    def __call__(self, rows):
+        version = hash(tile_diff.freeze(rows or []))
+        with self._lock:
+            if version == self._version:
+                return self._result
+        result = self._build(rows or [])
+        with self._lock:
+            self._version, self._result = version, result
+        return result
+
+
+# --- 복용 기록 ---
+_local_dates = OrderedDict()   # dispensed_at 원문 -> (YYYY-MM-DD, 'MM월 DD일') | None
+_LOCAL_DATE_MAX = 2048
+
+
+def _local_date(dispensed_at: str):
+    """ISO(UTC) → 로컬 날짜 (문자열별로 1회만 파싱)"""
+    cached = _local_dates.get(dispensed_at, False)
+    if cached is not False:
+        return cached
+    try:
+        local_dt = datetime.fromisoformat(dispensed_at.replace('Z', '+00:00')).astimezone()
+        value = (local_dt.strftime('%Y-%m-%d'), local_dt.strftime('%m월 %d일'))
+    except (ValueError, TypeError, AttributeError):
+        value = None
+    _local_dates[dispensed_at] = value
+    while len(_local_dates) > _LOCAL_DATE_MAX:
+        _local_dates.popitem(last=False)
+    return value
+
+
+def _build_history(history: list) -> tile_diff.Snapshot:
+    if not history:
+        return tile_diff.snapshot([("text", "최근 기록 없음")], key=lambda r: r[0])
+    processed_entries = set()
+    history_lines = []
+    for item in sorted(history, key=lambda x: x.get('dispensed_at', ''), reverse=True):
+        user_name = item.get('user_name', '알 수 없는 사용자')
+        date = _local_date(item.get('dispensed_at', ''))
+        if date is None:
+            history_lines.append(f"{user_name} - 시간 정보 오류")
+            continue
+        entry_key = (user_name, date[0])
+        if entry_key not in processed_entries:
+            history_lines.append(f"{user_name}님 - {date[1]} 복용 완료")
+            processed_entries.add(entry_key)
+    return tile_diff.snapshot([("text", "\n".join(history_lines))], key=lambda r: r[0])
+
+
+# --- 오늘 스케줄 ---
+def _build_schedules(schedules: list) -> tile_diff.Snapshot:
+    """시간대 제목 + 항목을 한 줄씩 펼친 행 목록 (페이지 리스트용)"""
+    schedules_by_time = {slot: [] for slot in SCHEDULE_SLOTS}
+    for s in schedules:
+        time_of_day = s.get("time_of_day")
+        if time_of_day in schedules_by_time:
+            dose = s.get('dose', '?')
+            schedules_by_time[time_of_day].append(f"{s.get('user_name')} ({s.get('medicine_name')}) - {dose}정")
+    rows = []
+    for slot, lines in schedules_by_time.items():
+        rows.append(ScheduleRow("header", SCHEDULE_SLOTS[slot]))
+        rows.extend(ScheduleRow("entry", line) for line in (lines or ["스케줄 없음"]))
+    return tile_diff.snapshot(rows)
+
+
+# --- 인벤토리 ---
+def stock_level(remain, total, days_left=None) -> str:
+    """재고 비율 기준 단계, 남은 일수를 알면 더 나쁜 쪽 (1일 이하 critical, LOW_STOCK_DAYS 이하 low)"""
+    if not total or total <= 0:
+        return "critical"
+    percentage = (remain / total) * 100
+    if percentage >= 50:
+        level = "ok"
+    elif percentage >= 20:
+        level = "low"
+    else:
+        level = "critical"
+    if days_left is not None:
+        if days_left <= 1:
+            level = "critical"
+        elif days_left <= LOW_STOCK_DAYS and level == "ok":
+            level = "low"
+    return level
+
+
+def _build_slots(slots: list) -> tile_diff.Snapshot:
+    slot_data_map = {s.get('slot_number'): s for s in slots if isinstance(s.get('slot_number'), int)}
+    rows = []
+    for slot_num in sorted(set(INVENTORY_SLOTS) | set(slot_data_map)):
+        data = slot_data_map.get(slot_num)
+        if data and data.get('name') != '(약 미등록)':
+            remain = data.get('remain', 0)
+            total = data.get('total', 0)
+            days_left = data.get('days_left')   # hwserial.inventory.slot_rows() 가 붙여줌
+            stock_text = f"{remain} / {total}" + (f" ({days_left}일분)" if days_left is not None else "")
+            rows.append(SlotRow(slot_num, data.get('name', '미지정'), stock_text,
+                                stock_level(remain, total, days_left), True))
+        else:
+            rows.append(SlotRow(slot_num, "비어있음", "- / -", None, False))
+    return tile_diff.snapshot(rows, key=lambda r: r.slot_number)
+
+
+# --- 사용자 ---
+def _build_users(users: list) -> tile_diff.Snapshot:
+    """보호자 먼저 (표시 순서 = 행 키)"""
+    ordered = sorted(users, key=lambda u: u.get('role') != 'parent')
+    return tile_diff.snapshot([UserRow(u.get('name', '이름없음'), u.get('role') == 'parent') for u in ordered])
+
+
+history = _Memo(_build_history)
+schedules = _Memo(_build_schedules)
+slots = _Memo(_build_slots)
+users = _Memo(_build_users)
@@ -0,0 +1,82 @@
+# gui/virtual_list.py
+"""
+고정 위젯 풀 + 자동 페이지 넘김 리스트 (사용자 / 스케줄 / 재고 타일)
+
+- 행 위젯은 page_size개만 만들어 두고 재사용 (행 수가 늘어도 렌더 비용 일정)
+- 현재 페이지에 보이는 행만 bind_row로 내용 대입, 같은 행(해시)이면 건너뜀
+- 행이 한 페이지를 넘으면 interval_ms마다 다음 페이지로 자동 전환 (터치 조작 없는 키오스크용)
+"""
+
+
+class PagedList:
+    def __init__(self, parent, page_size, make_row, bind_row, show_row, hide_row,
+                 interval_ms=6000, indicator=None):
+        """
+        make_row(parent, i) -> row       : 풀 위젯 생성 (최초 1회)
+        bind_row(row, data)               : 행 데이터 대입
+        show_row(row, i) / hide_row(row)  : 배치 / 숨김
+        indicator                         : 페이지 표시 라벨 (선택, "1 / 3")
+        """
+        self.parent = parent
+        self.page_size = max(1, int(page_size))
+        self._bind_row = bind_row
+        self._show_row = show_row
+        self._hide_row = hide_row
+        self.interval_ms = int(interval_ms)
+        self.indicator = indicator
+
+        self._pool = [make_row(parent, i) for i in range(self.page_size)]
+        self._bound = [None] * self.page_size    # 풀 슬롯별 현재 대입된 행 해시
+        self._shown = [False] * self.page_size
+        self.rows = ()
+        self._hashes = ()
+        self.page = 0
+        self._timer = None
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-len(self.rows) // self.page_size))
+
+    def set_rows(self, rows, hashes=None):
+        """전체 행 교체 (Tk 스레드). hashes 미지정 시 hash(row) 사용"""
+        self.rows = tuple(rows)
+        self._hashes = tuple(hashes) if hashes is not None else tuple(hash(r) for r in self.rows)
+        if self.page >= self.page_count:
+            self.page = 0
+        self._render()
+        self._schedule()
+
+    def show_page(self, page: int):
+        self.page = page % self.page_count
+        self._render()
+
+    def _render(self):
+        start = self.page * self.page_size
+        for i, row in enumerate(self._pool):
+            idx = start + i
+            if idx < len(self.rows):
+                if self._bound[i] != self._hashes[idx]:
+                    self._bind_row(row, self.rows[idx])
+                    self._bound[i] = self._hashes[idx]
+                if not self._shown[i]:
+                    self._show_row(row, i)
+                    self._shown[i] = True
+            elif self._shown[i]:
+                self._hide_row(row)
+                self._shown[i] = False
+        if self.indicator is not None:
+            pages = self.page_count
+            text = f"{self.page + 1} / {pages}" if pages > 1 else ""
+            if self.indicator.cget("text") != text:
+                self.indicator.config(text=text)
+
+    def _schedule(self):
+        """여러 페이지일 때만 타이머 유지"""
+        if self.page_count > 1 and self._timer is None and self.interval_ms > 0:
+            self._timer = self.parent.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        self._timer = None
+        if self.page_count > 1:
+            self.show_page(self.page + 1)
+        self._schedule()
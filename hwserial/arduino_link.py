@@ -1,6 +1,193 @@
 import re, time
+from dataclasses import dataclass
+from typing import Optional
 import serial
 from serial.tools import list_ports
+from config import settings
+from services import metrics
+from hwserial import timing_model
+
+metrics.describe("tdb_serial_command_seconds", "histogram", "Arduino command round-trip latency by command")
+metrics.describe("tdb_serial_commands_total", "counter", "Arduino commands by command and outcome")
+
+def _cmd_name(cmd: str) -> str:
+    """메트릭 라벨용 명령 이름: DISPENSE,1,2 → DISPENSE / STEP,NEXT → STEP,NEXT"""
+    parts = cmd.strip().upper().split(",")
+    if parts[0] == "STEP" and len(parts) > 1:
+        return f"STEP,{parts[1]}"
+    return parts[0]
+
+# 소요 시간을 학습해 타임아웃을 정하는 명령 (JOG는 동작 시간을 직접 지정하므로 제외)
+_TIMED_COMMANDS = ("DISPENSE", "STEP,NEXT", "HOME", "STEP,HOME")
+
+def _record_cmd(cmd: str, t0: float, ok: bool, resp: str, tx_bytes: int, stage=None):
+    """stage: 회전판 이동 명령의 출발 단계 (STEP/HOME 소요 시간은 출발 단계마다 다름)"""
+    name = _cmd_name(cmd)
+    elapsed = time.monotonic() - t0
+    metrics.observe("tdb_serial_command_seconds", elapsed, command=name)
+    timed_out = any(k in (resp or "") for k in ("TIMEOUT", "STALL", "NO_ACK"))
+    if name in _TIMED_COMMANDS:
+        parts = cmd.strip().split(",")
+        slot, count = (parts[1], parts[2]) if name == "DISPENSE" and len(parts) >= 3 else (stage, 1)
+        timing_model.observe(name, elapsed, slot=slot, count=count, ok=ok, timed_out=timed_out)
+    outcome = "ok" if ok else ("timeout" if timed_out else "error")
+    metrics.inc("tdb_serial_commands_total", command=name, status=outcome)
+    if timed_out:
+        metrics.inc("tdb_serial_timeouts_total", command=name)
+    metrics.inc("tdb_serial_tx_bytes_total", tx_bytes, command=name)
+
+# ✅ 명령 응답을 기다리는 동안 들어온 RFID 태그 → 버리지 않고 sink(uid)로 전달 (세션 대기열)
+_UID_RE = re.compile(r"^[0-9A-F]{8,}$")
+_uid_sink = None
+
+def set_uid_sink(fn):
+    """fn(uid) 등록 (None이면 해제). 시리얼 스레드에서 호출되므로 fn은 빨리 반환해야 함"""
+    global _uid_sink
+    _uid_sink = fn
+
+def _forward_uid(line: str) -> bool:
+    """UID 형식이면 sink로 넘기고 True"""
+    uid = line.upper()
+    if not _UID_RE.fullmatch(uid):
+        return False
+    if _uid_sink is not None:
+        try:
+            _uid_sink(uid)
+        except Exception as e:
+            print(f"[UID_SINK_ERR] {e}")
+    return True
+
+def _drain_pending(ser):
+    """reset_input_buffer 전에 이미 들어와 있던 줄 중 태그만 건져냄"""
+    try:
+        while ser.in_waiting:
+            line = ser.readline().decode("ascii", "ignore").strip()
+            if line:
+                _forward_uid(line)
+    except Exception:
+        pass
+
+# ✅ 펌웨어 진행 상황 줄 (PROG,...) → 진행 콜백 + 정지(stall) 조기 감지
+#   PROG,DISPENSE,<slot>,<done>,<count> / PROG,STEP|HOME,START|END,<stage>
+#   진행 줄을 안 보내는 구 펌웨어는 기존처럼 최종 OK/ERR만 기다림
+metrics.describe("tdb_serial_stalls_total", "counter", "Commands aborted because firmware progress stopped")
+
+@dataclass(frozen=True)
+class Progress:
+    command: str                  # DISPENSE | STEP | HOME
+    slot: Optional[int] = None
+    done: Optional[int] = None    # DISPENSE: 지금까지 나온 개수
+    total: Optional[int] = None
+    edge: Optional[str] = None    # STEP/HOME: START | END
+    stage: Optional[int] = None
+
+_progress_seen = False   # 이 펌웨어가 진행 줄을 보낸 적 있음 → 응답 없음도 빨리 판단
+
+def parse_progress(line: str) -> Optional[Progress]:
+    """PROG 줄 → Progress (PROG 줄이 아니면 None, 모르는 형식은 명령 이름만)"""
+    parts = line.strip().split(",")
+    if len(parts) < 2 or parts[0] != "PROG":
+        return None
+    command = parts[1].upper()
+    try:
+        if command == "DISPENSE" and len(parts) >= 5:
+            return Progress(command, slot=int(parts[2]), done=int(parts[3]), total=int(parts[4]))
+        if command in ("STEP", "HOME") and len(parts) >= 4:
+            return Progress(command, edge=parts[2].upper(), stage=int(parts[3]))
+    except ValueError:
+        pass
+    return Progress(command)
+
+# 실패 후 재동기화: 진행 줄 간격 몇 번 분량 조용하면 펌웨어가 멈춘 것으로 봄 (줄이 오는 동안은 계속 읽음)
+_RESYNC_INTERVALS = 2
+
+class _ProgressWatch:
+    """응답 대기 중 진행 줄 처리: 진행이 오면 마감 시각을 stall초 뒤로 미룸"""
+
+    def __init__(self, cmd: str, timeout: float, stall: float = None, on_progress=None):
+        self.cmd = cmd
+        self.stall = stall
+        self.on_progress = on_progress
+        self.last = None
+        now = time.monotonic()
+        self.deadline = now + timeout
+        if stall is not None and _progress_seen:
+            # 진행 줄을 보내는 펌웨어: 명령 수신(START/0개) 줄이 PROG_ACK_SEC 안에 와야 함
+            self.deadline = min(self.deadline, now + settings.PROG_ACK_SEC)
+
+    def feed(self, line: str) -> bool:
+        global _progress_seen
+        prog = parse_progress(line)
+        if prog is None:
+            return False
+        _progress_seen = True
+        self.last = prog
+        if self.stall is not None:
+            self.deadline = time.monotonic() + self.stall
+        if self.on_progress:
+            try:
+                self.on_progress(prog)
+            except Exception as e:
+                print(f"[PROGRESS_CB_ERR] {e}")
+        return True
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+    def resync_quiet(self, timeout: float) -> float:
+        """
+        실패 후 _resync 대기 한도 (마지막 줄 이후 조용한 시간)
+        진행 줄 펌웨어: 진행 간격(stall, 수신 확인 전이면 PROG_ACK_SEC) × _RESYNC_INTERVALS, 명령 시간 이하
+        구 펌웨어: 진행 줄이 없어 끝났는지 알 수 없음 → 명령 시간
+        """
+        if self.stall is None or not _progress_seen:
+            return timeout
+        interval = self.stall if self.last is not None else settings.PROG_ACK_SEC
+        return min(timeout, _RESYNC_INTERVALS * interval)
+
+    def failure(self, default: str) -> str:
+        """마감 초과 시 응답 문자열 (진행이 있었으면 ERR,STALL / 수신 확인 없으면 ERR,NO_ACK)"""
+        if self.stall is None or not _progress_seen:
+            return default
+        metrics.inc("tdb_serial_stalls_total", command=_cmd_name(self.cmd))
+        if self.last is None:
+            return "ERR,NO_ACK"
+        if self.last.command == "DISPENSE":
+            return f"ERR,STALL,{self.last.slot},{self.last.done},{self.last.total}"
+        return f"ERR,STALL,{self.last.command},{self.last.edge}"
+
+def _read_line(ser) -> str:
+    """_send_cmd_wait용: readline (시리얼 timeout 만큼 대기)"""
+    return ser.readline().decode("ascii", "ignore").strip()
+
+def _read_waiting(ser) -> str:
+    """send_raw용: 받은 줄이 있을 때만 읽음"""
+    if ser.in_waiting:
+        return ser.readline().decode("ascii", "ignore").strip()
+    time.sleep(0.01)
+    return ""
+
+def _resync(ser, watch: "_ProgressWatch", quiet: float, read=_read_line) -> Optional[str]:
+    """
+    실패(NO_ACK/STALL/TIMEOUT) 후 펌웨어가 이전 명령을 실제로 끝낼 때까지 계속 읽음
+    - 펌웨어는 중단 명령이 없어 호스트가 포기해도 끝까지 동작함
+      → 여기서 기다리지 않으면 재시도 명령이 겹치고(중복 배출),
+        그 사이 나온 진행 줄은 다음 명령의 reset_input_buffer()에 버려짐
+    - 최종 OK/ERR 줄이 오면 그 줄 반환, quiet초 동안 아무 줄도 없으면 None (펌웨어 멈춤/리셋)
+      quiet는 watch.resync_quiet() — 진행 줄 간격 기준이라 정지 조기 감지 이득을 유지
+    - 진행 줄은 계속 watch로 → 호출 측은 마지막 진행 개수 기준으로 남은 개수 계산
+    """
+    last = time.monotonic()
+    while time.monotonic() - last < quiet:
+        line = read(ser)
+        if not line or line == "READY":
+            continue
+        last = time.monotonic()
+        if line.startswith("OK,") or line.startswith("ERR,"):
+            return line
+        if not watch.feed(line):
+            _forward_uid(line)
+    return None
 
 def autodetect_port():
     for p in list_ports.comports():
@@ -30,78 +217,207 @@ def open_serial(baud_rate=9600, timeout=0.1):
 
 def read_uid_once(ser: serial.Serial):
     line = ser.readline().decode("ascii", "ignore").strip().upper()
-    if re.fullmatch(r"^[0-9A-F]{8,}$", line):
+    if _UID_RE.fullmatch(line):
         return line
     return None
 
-def _send_cmd_wait(ser: serial.Serial, cmd: str, timeout=5.0):
+def _send_cmd_wait(ser: serial.Serial, cmd: str, timeout=5.0, stall: float = None, on_progress=None):
+    """
+    명령 전송 후 OK/ERR 대기
+    stall: 진행 줄 사이 최대 간격 (None이면 진행 줄로 마감을 미루지 않음)
+    on_progress: Progress 수신 시 호출
+    """
     if not cmd.endswith("\n"):
         cmd += "\n"
-    ser.write(cmd.encode("ascii"))
+    raw = cmd.encode("ascii")
+    # 이전 명령의 늦게 온 OK를 이번 응답으로 착각하지 않도록 (태그는 대기열로)
+    _drain_pending(ser)
+    ser.reset_input_buffer()
+    ser.write(raw)
     ser.flush()
-    t0 = time.time()
-    while time.time() - t0 < timeout:
-        line = ser.readline().decode("ascii", "ignore").strip()
+    tm = time.monotonic()
+    watch = _ProgressWatch(cmd, timeout, stall, on_progress)
+    while True:
+        # 받은 줄을 먼저 처리하고 마감 확인 (호스트가 늦게 깨어난 것을 정지로 오인하지 않도록)
+        line = _read_line(ser)
         if not line:
+            if watch.expired():
+                break
             continue
         if line.startswith("OK,"):
+            _record_cmd(cmd, tm, True, line, len(raw))
             return True, line
         if line.startswith("ERR,"):
+            _record_cmd(cmd, tm, False, line, len(raw))
             return False, line
-    return False, "ERR,TIMEOUT"
+        if not watch.feed(line):
+            _forward_uid(line)
+    resp = watch.failure("ERR,TIMEOUT")
+    # 펌웨어가 아직 동작 중일 수 있음 → 끝날 때까지(또는 진행 간격 몇 번만큼 조용할 때까지) 동기화
+    final = _resync(ser, watch, watch.resync_quiet(timeout))
+    if final is not None:
+        resp = final
+    ok = resp.startswith("OK,")
+    _record_cmd(cmd, tm, ok, resp, len(raw))
+    return ok, resp
 
-def dispense(ser, slot: int, count: int):
+def dispense(ser, slot: int, count: int, on_progress=None):
     """
     약 배출 명령 전송
-    타임아웃: 기본 4초 + (count * 1초)로 약 개수에 비례하여 조정
+    타임아웃: 슬롯별 학습값 (hwserial/timing_model.py), 학습 전에는 4초 + (count * 1초)
+    진행 줄을 보내는 펌웨어면 약 1개 분량 시간 안에 다음 진행이 없을 때 바로 ERR,STALL,slot,done,count
+    """
+    # ✅ 기존 고정값 4초 기본 + 약 1개당 1초 → 학습 전 기본값이자 상한 기준
+    timeout = timing_model.deadline("DISPENSE", 4.0 + (int(count) * 1.0), slot=slot, count=count)
+    stall = timing_model.deadline("DISPENSE", 4.0, slot=slot, count=1)
+    return _send_cmd_wait(ser, f"DISPENSE,{int(slot)},{int(count)}", timeout=timeout,
+                          stall=stall, on_progress=on_progress)
+
+# ✅ 여러 슬롯 동시 배출: MULTI,<동시슬롯수>,<slot>:<count>,...
+#   펌웨어가 슬롯별 상태 머신으로 겹쳐 진행 → 가장 느린 슬롯 시간 정도로 끝남
+#   응답: OK,MULTI,<slot>:<done>,... / 구 펌웨어는 ERR,UNKNOWN,... (이후 순차 배출)
+#   (DISPENSE로 시작하면 구 펌웨어가 DISPENSE,<slot>,<count>로 잘못 해석하므로 MULTI로 시작)
+_multi_supported = None   # None 모름 / False 구 펌웨어 확인됨
+
+def multi_supported() -> bool:
+    return _multi_supported is not False
+
+def parse_multi_reply(resp: str) -> dict:
+    """OK,MULTI,1:2,3:1 → {1: 2, 3: 1} (형식이 아니면 빈 dict)"""
+    done = {}
+    parts = (resp or "").strip().split(",")
+    if parts[:2] != ["OK", "MULTI"]:
+        return done
+    for pair in parts[2:]:
+        slot, _, count = pair.partition(":")
+        try:
+            done[int(slot)] = int(count)
+        except ValueError:
+            continue
+    return done
+
+def dispense_multi(ser, items, concurrency: int = 2, on_progress=None):
+    """
+    여러 슬롯 동시 배출 (items: [(slot, count), ...], 슬롯 중복 불가)
+
+    Returns:
+        (ok, resp, done) — done: 슬롯별 실제 배출 개수 (진행 줄/최종 응답 기준)
+        구 펌웨어면 (False, "ERR,UNKNOWN,...", {}) → 호출 측에서 순차 배출
     """
-    # ✅ 타임아웃 증가: 4초 기본 + 약 1개당 1초 (기존: 2초 + 0.5초)
-    timeout = 4.0 + (int(count) * 1.0)
-    return _send_cmd_wait(ser, f"DISPENSE,{int(slot)},{int(count)}", timeout=timeout)
+    global _multi_supported
+    items = [(int(slot), int(count)) for slot, count in items]
+    concurrency = max(1, min(int(concurrency), len(items)))
+    # 타임아웃: 슬롯별 학습 타임아웃 중 가장 긴 것 × 동시에 못 돌고 기다리는 라운드 수
+    per_slot = [timing_model.deadline("DISPENSE", 4.0 + count * 1.0, slot=slot, count=count)
+                for slot, count in items]
+    rounds = -(-len(items) // concurrency)
+    timeout = max(per_slot) * rounds
+    stall = max(timing_model.deadline("DISPENSE", 4.0, slot=slot, count=1) for slot, _ in items)
 
-def send_raw(ser, line: str, timeout: float = 8.0):
-    """명령 전송 후 OK/ERR 응답 수신. 중간 메시지는 무시하고 최종 응답만 반환."""
-    line = (line.strip() + "\n").encode("ascii", "ignore")
+    done = {slot: 0 for slot, _ in items}
+    started = {}
+
+    def track(prog: Progress):
+        if prog.command == "DISPENSE" and prog.slot in done:
+            now = time.monotonic()
+            started.setdefault(prog.slot, now)
+            done[prog.slot] = prog.done or 0
+            # 슬롯별 소요 시간도 단일 DISPENSE와 같은 키로 학습
+            if prog.total and prog.done == prog.total:
+                timing_model.observe("DISPENSE", now - started[prog.slot], slot=prog.slot, count=prog.total)
+        if on_progress:
+            on_progress(prog)
+
+    cmd = f"MULTI,{concurrency}," + ",".join(f"{slot}:{count}" for slot, count in items)
+    ok, resp = _send_cmd_wait(ser, cmd, timeout=timeout, stall=stall, on_progress=track)
+    if resp.startswith("ERR,UNKNOWN"):
+        _multi_supported = False
+        return False, resp, {}
+    if ok:
+        _multi_supported = True
+        done.update(parse_multi_reply(resp))
+    return ok, resp, done
+
+def send_raw(ser, line: str, timeout: float = 8.0, stall: float = None, on_progress=None, stage=None):
+    """
+    명령 전송 후 OK/ERR 응답 수신. 진행 줄(PROG)은 콜백으로, 그 외 중간 메시지는 무시하고 최종 응답만 반환.
+    stage: 이동 명령의 출발 단계 (소요 시간 학습 키, 모르면 None)
+    """
+    cmd = line.strip()
+    line = (cmd + "\n").encode("ascii", "ignore")
+    _drain_pending(ser)       # 버퍼에 있던 태그는 대기열로
     ser.reset_input_buffer()  # 이전 명령의 늦게 온 OK를 싹 비움
     ser.write(line)
     ser.flush()
-    t0 = time.time()
+    tm = time.monotonic()
+    watch = _ProgressWatch(cmd, timeout, stall, on_progress)
     last_response = None
-    while time.time() - t0 < timeout:
-        if ser.in_waiting:
-            resp = ser.readline().decode("ascii", "ignore").strip()
-            if not resp or resp == "READY":
-                continue
-            # OK/ERR 응답이면 즉시 반환
-            if resp.startswith("OK,") or resp.startswith("ERR,"):
-                return True if resp.startswith("OK,") else False, resp
-            # 중간 메시지는 저장만 하고 계속 읽기
-            last_response = resp
-        time.sleep(0.01)
-    # 타임아웃 시 마지막으로 받은 응답 반환 (있으면)
-    if last_response:
-        return False, f"TIMEOUT (last: {last_response})"
-    return False, "TIMEOUT"
-
-def step_next(ser):
-    """회전판을 다음 단계로 이동 (2.0~2.5s 소요)"""
-    return send_raw(ser, "STEP,NEXT", timeout=4.0)
-
-def step_home(ser):
-    """회전판을 HOME 위치로 복귀 (최대 4.5s 소요)"""
-    ok, resp = send_raw(ser, "HOME", timeout=6.0)
+    while True:
+        # 받은 줄을 먼저 처리하고 마감 확인 (호스트가 늦게 깨어난 것을 정지로 오인하지 않도록)
+        if not ser.in_waiting:
+            if watch.expired():
+                break
+            time.sleep(0.01)
+            continue
+        resp = ser.readline().decode("ascii", "ignore").strip()
+        if not resp or resp == "READY":
+            continue
+        # OK/ERR 응답이면 즉시 반환
+        if resp.startswith("OK,") or resp.startswith("ERR,"):
+            ok = resp.startswith("OK,")
+            _record_cmd(cmd, tm, ok, resp, len(line), stage)
+            return ok, resp
+        # 진행 줄은 콜백으로, 태그는 대기열로, 그 외 중간 메시지는 저장만 하고 계속 읽기
+        if watch.feed(resp) or _forward_uid(resp):
+            continue
+        last_response = resp
+    # 진행이 멈췄으면 ERR,STALL / ERR,NO_ACK, 아니면 TIMEOUT (마지막으로 받은 줄 포함)
+    failure = watch.failure(None)
+    if not failure:
+        failure = f"TIMEOUT (last: {last_response})" if last_response else "TIMEOUT"
+    # 펌웨어가 아직 동작 중일 수 있음 → 끝날 때까지(또는 진행 간격 몇 번만큼 조용할 때까지) 동기화
+    final = _resync(ser, watch, watch.resync_quiet(timeout), read=_read_waiting)
+    resp = final if final is not None else failure
+    ok = resp.startswith("OK,")
+    _record_cmd(cmd, tm, ok, resp, len(line), stage)
+    return ok, resp
+
+# ✅ STEP/HOME 소요 시간은 출발 단계에 따라 다름 (HOME: 0→즉시, 1→2.0s, 2→4.5s / NEXT: 0→2.0s, 1→2.5s)
+#   → 출발 단계별로 따로 학습 (stage=None이면 단계 모름: 스크립트 등, 별도 키)
+def step_next(ser, on_progress=None, stage: int = None):
+    """회전판을 다음 단계로 이동 (2.0~2.5s 소요). stage: 출발 단계"""
+    timeout = timing_model.deadline("STEP,NEXT", 4.0, slot=stage)
+    return send_raw(ser, "STEP,NEXT", timeout=timeout, stall=timeout, on_progress=on_progress, stage=stage)
+
+def step_home(ser, stage: int = None):
+    """회전판을 HOME 위치로 복귀 (최대 4.5s 소요). stage: 출발 단계"""
+    timeout = timing_model.deadline("HOME", 6.0, slot=stage)
+    ok, resp = send_raw(ser, "HOME", timeout=timeout, stall=timeout, stage=stage)
     if ok and resp:
         return ok, resp
-    return send_raw(ser, "STEP,HOME", timeout=6.0)
+    timeout = timing_model.deadline("STEP,HOME", 6.0, slot=stage)
+    return send_raw(ser, "STEP,HOME", timeout=timeout, stall=timeout, stage=stage)
+
+# 펌웨어 단계별 이동 시간 (firmware/src/servos.cpp kSERVO_MS_STEP1/2, 50%)
+# 아두이노가 리셋되면 단계가 0으로 초기화돼 HOME이 아무것도 안 함 → 알고 있는 단계만큼 JOG로 되돌림
+_STAGE_RETURN_MS = {1: 2000, 2: 2000 + 2500}
+
+def return_home_from(ser, stage: int):
+    """펌웨어가 단계를 잊은 상태(리셋 직후)에서 stage → HOME 복귀"""
+    ms = _STAGE_RETURN_MS.get(int(stage))
+    if ms is None:
+        return True, "OK,HOME"
+    return jog(ser, "B", ms, 50)
 
-def step_next_n(ser, n: int, gap_ms: int = 150):
+def step_next_n(ser, n: int, gap_ms: int = 150, stage: int = None):
     """
     STEP,NEXT를 n번 연속 수행. 중간 실패 시 즉시 중단.
     gap_ms: 각 스텝 사이 대기 시간 (밀리초)
+    stage: 출발 단계 (i번째 스텝은 stage + i 에서 출발)
     """
     n = max(0, int(n))
     for i in range(n):
-        ok, msg = step_next(ser)
+        ok, msg = step_next(ser, stage=None if stage is None else int(stage) + i)
         if not ok:
             return False, f"{msg} (i={i+1}/{n})"
         if gap_ms > 0:
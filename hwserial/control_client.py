@@ -0,0 +1,143 @@
+# hwserial/control_client.py
+"""
+진단/복구 스크립트용 하드웨어 연결
+
+    link = open_link()                    # 키오스크 실행 중이면 제어 소켓, 아니면 시리얼 직접
+    ok, resp = send_raw(link, "TEST_SOLENOID,1,B", timeout=8.0)
+    link.close()
+
+- 제어 소켓(hwserial/control_server.py)이 있으면 아두이노 리셋/서비스 중지 없이 바로 명령
+- 소켓 연결이 안 되고 시리얼 포트를 잡은 프로세스도 없을 때만(서비스 꺼짐) 기존처럼 open_serial()
+  포트를 누가 쓰고 있으면 열지 않고 IOError (실행 중인 서비스 밑에서 아두이노가 리셋되지 않도록)
+- 어느 쪽으로 연결했는지 출력
+- send_raw / jog / step_next / step_home 은 arduino_link 와 같은 인자, 같은 (ok, resp) 반환
+"""
+import json
+import os
+import socket
+
+from config import settings
+from hwserial import arduino_link
+from hwserial.control_server import socket_path
+
+
+class ControlClient:
+    def __init__(self, sock, path: str):
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+        self.port = f"control socket ({path})"   # 스크립트의 연결 표시용 (serial.Serial.port 대응)
+
+    def request(self, req: dict, timeout: float = 8.0):
+        """요청 1건 → (ok, resp). 서버가 시리얼을 잡을 때까지 기다리는 시간 포함"""
+        self._sock.settimeout(timeout + settings.CONTROL_WAIT_SEC + 2.0)
+        try:
+            self._file.write((json.dumps(req) + "\n").encode("utf-8"))
+            self._file.flush()
+            line = self._file.readline()
+        except OSError as e:
+            return False, f"ERR,CONTROL,{e}"
+        if not line:
+            return False, "ERR,CONTROL,closed"
+        try:
+            reply = json.loads(line.decode("utf-8"))
+        except ValueError:
+            reply = None       # 깨진 응답 (UnicodeDecodeError 포함)
+        if not isinstance(reply, dict):
+            return False, f"ERR,CONTROL,bad reply: {line[:80]!r}"
+        return bool(reply.get("ok")), reply.get("resp", "")
+
+    def close(self):
+        try:
+            self._file.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def connect(path: str = None):
+    """실행 중인 키오스크의 제어 소켓 연결 (없으면 None)"""
+    path = socket_path(path)
+    if not path or not hasattr(socket, "AF_UNIX"):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(1.0)
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return ControlClient(sock, path)
+
+
+def _port_holders(port: str) -> list:
+    """시리얼 포트를 열고 있는 프로세스 pid 목록 (/proc 없는 OS는 빈 목록)"""
+    try:
+        target = os.path.realpath(port)
+        pids = [p for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return []
+    holders = []
+    for pid in pids:
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue   # 종료됐거나 권한 없음
+        for fd in fds:
+            try:
+                if os.readlink(f"{fd_dir}/{fd}") == target:
+                    holders.append(int(pid))
+                    break
+            except OSError:
+                continue
+    return holders
+
+
+def open_link(baud_rate=9600):
+    """
+    제어 소켓 우선. 시리얼 직접 열기는 서비스가 정말 꺼져 있을 때만
+    (소켓 연결 실패 + 포트를 잡은 프로세스 없음 — 죽은 서비스가 남긴 소켓 파일은 연결 거부라 여기 해당)
+    """
+    path = socket_path()
+    client = connect(path)
+    if client is not None:
+        print(f"[LINK] 제어 소켓 {path} (실행 중인 키오스크 경유)")
+        return client
+    port = arduino_link.autodetect_port()
+    holders = _port_holders(port) if port else []
+    if holders:
+        raise IOError(f"{port} 사용 중 (pid {', '.join(map(str, holders))}) — 제어 소켓 {path or '(꺼짐)'} 연결 실패. "
+                      f"키오스크 로그의 [CONTROL] 경로와 TDB_CONTROL_SOCKET_PATH 확인")
+    print(f"[LINK] 시리얼 {port or '(자동 탐지)'} 직접 연결 (키오스크 꺼짐, 아두이노 리셋)")
+    return arduino_link.open_serial(baud_rate=baud_rate)
+
+
+def send_raw(link, line: str, timeout: float = 8.0):
+    if isinstance(link, ControlClient):
+        return link.request({"op": "send", "line": line, "timeout": timeout}, timeout)
+    return arduino_link.send_raw(link, line, timeout=timeout)
+
+
+def jog(link, direction: str, ms: int, speed: int = None):
+    if isinstance(link, ControlClient):
+        return link.request({"op": "jog", "direction": direction, "ms": ms, "speed": speed},
+                            max(8.0, ms / 1000.0 + 2.0))
+    return arduino_link.jog(link, direction, ms, speed)
+
+
+def step_next(link):
+    if isinstance(link, ControlClient):
+        return link.request({"op": "step_next"})
+    return arduino_link.step_next(link)
+
+
+def step_home(link):
+    if isinstance(link, ControlClient):
+        return link.request({"op": "step_home"}, 12.0)
+    return arduino_link.step_home(link)
@@ -0,0 +1,175 @@
+# hwserial/control_server.py
+"""
+하드웨어 제어 소켓 (실행 중인 키오스크의 시리얼을 진단 도구와 공유)
+
+- 시리얼 소유자는 serial_reader 1개뿐 → 진단 스크립트가 포트를 따로 열지 않음
+  (열 때마다 아두이노 리셋 2초 + tdb.service와 포트 충돌 → 서비스 중지 필요했음)
+- UNIX 소켓(CONTROL_SOCKET_PATH, 상대 경로는 프로젝트 루트 기준)으로 JSON 한 줄 요청 → JSON 한 줄 응답
+    {"op": "send", "line": "TEST_SOLENOID,1,B", "timeout": 8}  → {"ok": true, "resp": "OK,TEST_SOLENOID,1,B"}
+    {"op": "jog", "direction": "B", "ms": 2000, "speed": 50} / {"op": "step_next"} / {"op": "step_home"}
+    {"op": "ping"} → 현재 시리얼 사용 중인 쪽 (owner)
+- SerialArbiter: 세션 경로(태그 읽기/배출)와 유지보수 명령이 번갈아 사용
+  유지보수 요청이 기다리면 세션 경로는 다음 태그 읽기 전에 양보 (읽기 1회 ≈ 0.1초)
+  배출 세션 중이면 CONTROL_WAIT_SEC까지 기다리다 ERR,BUSY
+- send는 진단 명령만 허용 (DISPENSE는 재고/저널/보고를 거치지 않으므로 막음)
+클라이언트: hwserial/control_client.py
+"""
+import json
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from config import settings
+from hwserial.arduino_link import send_raw, jog, step_next, step_home
+from services import metrics
+
+metrics.describe("tdb_control_requests_total", "counter", "Control socket requests by op and outcome")
+
+# send로 보낼 수 있는 명령 (진단/복구용)
+ALLOWED_PREFIXES = ("TEST_SOLENOID", "JOG", "STEP,", "HOME")
+
+def socket_path(path: str = None) -> str:
+    """제어 소켓 경로 (상대 경로는 프로젝트 루트 기준 → 스크립트를 어느 디렉터리에서 실행해도 같은 소켓)"""
+    return settings.project_path(settings.CONTROL_SOCKET_PATH if path is None else path)
+
+
+class SerialBusy(Exception):
+    def __init__(self, owner):
+        super().__init__(f"serial busy ({owner})")
+        self.owner = owner
+
+
+class SerialArbiter:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._owner = None
+        self._waiting = 0          # 기다리는 유지보수 요청 수
+
+    @property
+    def owner(self):
+        with self._cond:
+            return self._owner
+
+    @contextmanager
+    def session(self, owner: str = "session"):
+        """세션 경로: 유지보수 요청이 기다리고 있으면 먼저 양보"""
+        with self._cond:
+            while self._owner is not None or self._waiting:
+                self._cond.wait()
+            self._owner = owner
+        try:
+            yield
+        finally:
+            self._release()
+
+    @contextmanager
+    def maintenance(self, timeout: float):
+        """유지보수 명령: timeout초 안에 못 잡으면 SerialBusy"""
+        with self._cond:
+            self._waiting += 1
+            try:
+                if not self._cond.wait_for(lambda: self._owner is None, timeout):
+                    raise SerialBusy(self._owner)
+                self._owner = "maintenance"
+            finally:
+                self._waiting -= 1
+                self._cond.notify_all()
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        with self._cond:
+            self._owner = None
+            self._cond.notify_all()
+
+
+arbiter = SerialArbiter()
+
+
+def _send(ser, line: str, timeout: float = 8.0):
+    cmd = str(line).strip().upper()
+    if not cmd.startswith(ALLOWED_PREFIXES):
+        return False, f"ERR,NOT_ALLOWED,{cmd.split(',')[0]}"
+    return send_raw(ser, cmd, timeout=float(timeout))
+
+
+_OPS = {
+    "send": lambda ser, req: _send(ser, req.get("line", ""), req.get("timeout", 8.0)),
+    "jog": lambda ser, req: jog(ser, req.get("direction"), req.get("ms", 0), req.get("speed")),
+    "step_next": lambda ser, req: step_next(ser),
+    "step_home": lambda ser, req: step_home(ser),
+}
+
+
+def handle(ser, req: dict, wait: float = None) -> dict:
+    """요청 1건 처리 (소켓과 무관하게 호출 가능)"""
+    op = req.get("op")
+    if op == "ping":
+        metrics.inc("tdb_control_requests_total", op="ping", result="ok")
+        return {"ok": True, "resp": "OK,PONG", "owner": arbiter.owner}
+    fn = _OPS.get(op)
+    if fn is None:
+        metrics.inc("tdb_control_requests_total", op="unknown", result="error")
+        return {"ok": False, "resp": f"ERR,UNKNOWN_OP,{op}"}
+    wait = settings.CONTROL_WAIT_SEC if wait is None else wait
+    try:
+        with arbiter.maintenance(wait):
+            ok, resp = fn(ser, req)
+    except SerialBusy as e:
+        metrics.inc("tdb_control_requests_total", op=op, result="busy")
+        return {"ok": False, "resp": f"ERR,BUSY,{e.owner}"}
+    except Exception as e:
+        metrics.inc("tdb_control_requests_total", op=op, result="error")
+        return {"ok": False, "resp": f"ERR,{e}"}
+    metrics.inc("tdb_control_requests_total", op=op, result="ok" if ok else "error")
+    return {"ok": ok, "resp": resp}
+
+
+def _serve_client(conn, ser):
+    with conn:
+        f = conn.makefile("rwb")
+        for raw in f:
+            try:
+                req = json.loads(raw.decode("utf-8"))
+                reply = handle(ser, req if isinstance(req, dict) else {})
+            except ValueError:
+                reply = {"ok": False, "resp": "ERR,BAD_JSON"}
+            try:
+                f.write((json.dumps(reply, ensure_ascii=False) + "\n").encode("utf-8"))
+                f.flush()
+            except OSError:
+                return
+
+
+def start(ser, path: str = None):
+    """제어 소켓 시작 (경로가 비어 있거나 UNIX 소켓 미지원이면 아무것도 안 함)"""
+    path = socket_path(path)
+    if not path or not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(path)  # 이전 프로세스가 남긴 소켓 파일
+        srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        srv.bind(path)
+        os.chmod(path, 0o660)
+        srv.listen(4)
+    except OSError as e:
+        print(f"[CONTROL] socket listen failed ({path}): {e}")
+        return None
+
+    def _accept_loop():
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                return
+            threading.Thread(target=_serve_client, args=(conn, ser), daemon=True).start()
+
+    threading.Thread(target=_accept_loop, daemon=True, name="control-socket").start()
+    print(f"[CONTROL] listening on {path}")
+    return srv
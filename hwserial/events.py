@@ -0,0 +1,128 @@
+# hwserial/events.py
+"""
+배출 세션 이벤트 (serial_reader → 어댑터 → DispenseState / GUI)
+
+상태 문자열 키워드 매칭 대신 타입으로 구분:
+  SessionStarted → (MoveStarted → MoveFinished)? → DispenseItem(→ DispenseProgress...)... → PhaseReported → ...
+  → Homing → HomeFinished → SessionEnded
+QueueChanged: 세션과 별개로 대기열(배출 중 찍힌 태그)이 바뀔 때
+모터가 실제로 움직이는 구간: MoveStarted~MoveFinished, Homing~HomeFinished
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+_TIME_KO = {"morning": "아침", "afternoon": "점심", "evening": "저녁"}
+
+
+@dataclass(frozen=True, kw_only=True)
+class DispenseEvent:
+    session_id: Optional[str] = None
+    ts: float = field(default_factory=time.time)          # 발생 시각 (wall clock)
+    mono: float = field(default_factory=time.monotonic)   # 구간 계산용
+
+
+@dataclass(frozen=True, kw_only=True)
+class SessionStarted(DispenseEvent):
+    user_id: str = ""
+    user_name: str = ""
+    phases: tuple = ()            # ("morning", "evening", ...)
+    members: tuple = ()           # 가족 세션이면 구성원 이름들 (단일 세션이면 비어 있음)
+
+
+@dataclass(frozen=True, kw_only=True)
+class MoveStarted(DispenseEvent):
+    phase: str = ""
+    from_stage: int = 0
+    to_stage: int = 0
+
+
+@dataclass(frozen=True, kw_only=True)
+class MoveFinished(DispenseEvent):
+    phase: str = ""
+    ok: bool = True
+    duration_ms: float = 0.0
+
+
+@dataclass(frozen=True, kw_only=True)
+class DispenseItem(DispenseEvent):
+    phase: str = ""
+    slot: int = 0
+    count: int = 0
+    medi_id: Optional[str] = None
+    index: int = 0                # phase 내 순번 (0부터)
+    total: int = 0                # phase 내 아이템 수
+    ok: Optional[bool] = None     # None=시작, True/False=종료
+    attempts: int = 0
+    duration_ms: Optional[float] = None
+
+
+@dataclass(frozen=True, kw_only=True)
+class DispenseProgress(DispenseEvent):
+    """펌웨어 진행 줄(PROG,DISPENSE): 약 1개 나올 때마다"""
+    phase: str = ""
+    slot: int = 0
+    done: int = 0
+    total: int = 0
+
+
+@dataclass(frozen=True, kw_only=True)
+class PhaseReported(DispenseEvent):
+    phase: str = ""
+    result: str = "completed"     # completed | partial | offline
+    items: int = 0
+    duration_ms: float = 0.0
+
+
+@dataclass(frozen=True, kw_only=True)
+class Homing(DispenseEvent):
+    reason: str = "final"         # final | reset
+
+
+@dataclass(frozen=True, kw_only=True)
+class HomeFinished(DispenseEvent):
+    reason: str = "final"
+    ok: bool = True
+    duration_ms: float = 0.0
+
+
+@dataclass(frozen=True, kw_only=True)
+class SessionEnded(DispenseEvent):
+    result: str = "completed"     # completed | partial | error
+    progress: dict = field(default_factory=dict)
+    duration_ms: float = 0.0
+
+
+@dataclass(frozen=True, kw_only=True)
+class QueueChanged(DispenseEvent):
+    waiting: tuple = ()           # 대기 중인 사용자 표시명 (순서대로, 이름 확인 전이면 '확인 중')
+
+
+MOTION_START = (MoveStarted, Homing)
+MOTION_END = (MoveFinished, HomeFinished)
+
+
+def describe(ev: DispenseEvent) -> Optional[str]:
+    """배출 상태 타일에 표시할 문구 (표시할 필요 없으면 None)"""
+    if isinstance(ev, SessionStarted) and ev.members:
+        return f"가족 {len(ev.members)}명 약 배출 시작... ({', '.join(_TIME_KO.get(p, p) for p in ev.phases)})"
+    if isinstance(ev, SessionStarted):
+        return f"{ev.user_name}님 약 배출 시작... ({', '.join(_TIME_KO.get(p, p) for p in ev.phases)})"
+    if isinstance(ev, MoveStarted):
+        return f"{_TIME_KO.get(ev.phase, ev.phase)} 위치로 이동 중..."
+    if isinstance(ev, DispenseItem) and ev.ok is None:
+        return f"{_TIME_KO.get(ev.phase, ev.phase)} - 슬롯 {ev.slot}에서 {ev.count}개 배출 중..."
+    if isinstance(ev, DispenseProgress):
+        return f"{_TIME_KO.get(ev.phase, ev.phase)} - 슬롯 {ev.slot}에서 배출 중... ({ev.done}/{ev.total})"
+    if isinstance(ev, Homing) and ev.reason == "final":
+        return "HOME 위치로 복귀 중..."
+    if isinstance(ev, SessionEnded):
+        return "배출 완료!" if ev.result == "completed" else "배출 완료 (일부 오류)"
+    return None
+
+
+def describe_queue(ev: QueueChanged) -> Optional[str]:
+    """배출 상태 타일 아래에 붙일 대기 안내 (대기 없으면 None)"""
+    if not ev.waiting:
+        return None
+    return f"대기 {len(ev.waiting)}명 (다음: {ev.waiting[0]})"
@@ -0,0 +1,163 @@
+# hwserial/inventory.py
+"""
+로컬 재고 추적 + 배출 계획 검증
+
+- reconcile(slots, fetched_at): 서버 슬롯 목록(get_slots_for_machine)으로 기준값 갱신
+- consume(slot, count): 배출 성공 시 로컬 차감 → ack(...)로 서버 보고 완료 표시
+  서버는 보고를 받을 때 remain을 차감하므로, 보고 전(또는 조회 이후 보고된) 차감분만 빼서 계산
+  (폴링 도중 보고가 들어와도 이중 차감/누락 없음)
+- validate(phases): 계획 전체를 시간대 순으로 누적 확인 → 부족한 아이템에 short 표시
+  (빈 슬롯에 DISPENSE 보내고 타임아웃 + 재시도로 시간 버리지 않도록 이동 전에 걸러냄)
+- projection(): 오늘 스케줄 기준 하루 사용량 → 슬롯별 남은 일수 (GUI 재고 타일)
+서버 데이터를 한 번도 못 받은 슬롯은 '알 수 없음'으로 보고 막지 않음
+"""
+import threading
+import time
+from typing import Optional
+
+from services import metrics
+
+_lock = threading.Lock()
+_server = {}          # slot -> 서버 슬롯 dict (remain은 조회 시점 값)
+_fetched_at = None    # 마지막 reconcile 기준 시각 (조회 시작, monotonic)
+_records = []         # [slot, count, acked_at] 로컬 차감 (acked_at None = 아직 서버 미반영)
+_usage = {}           # slot -> 하루 사용량 (오늘 스케줄 dose 합)
+
+metrics.describe("tdb_dispense_skipped_total", "counter", "Plan items skipped before motion because the slot is out of stock")
+
+
+def _slot_key(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def reconcile(slots: list, fetched_at: float = None):
+    """서버 슬롯 목록 반영 (fetched_at: 조회 시작 시각, 생략 시 지금)"""
+    global _server, _fetched_at
+    fetched_at = time.monotonic() if fetched_at is None else fetched_at
+    server = {}
+    for s in slots or []:
+        slot = _slot_key(s.get("slot_number"))
+        if slot is not None:
+            server[slot] = dict(s)
+    with _lock:
+        _server, _fetched_at = server, fetched_at
+        # 조회 전에 서버에 반영된 차감분은 이제 서버 값에 포함됨
+        _records[:] = [r for r in _records if r[2] is None or r[2] > fetched_at]
+
+
+def consume(slot: int, count: int):
+    with _lock:
+        _records.append([int(slot), int(count), None])
+
+
+def ack(consumed):
+    """서버 보고 성공: [(slot, count), ...] 만큼 오래된 미반영 차감부터 반영 완료 표시"""
+    now = time.monotonic()
+    with _lock:
+        for slot, count in consumed or []:
+            for r in _records:
+                if r[2] is None and r[0] == int(slot) and r[1] == int(count):
+                    r[2] = now
+                    break
+
+
+def _remaining_locked(slot) -> Optional[int]:
+    data = _server.get(slot)
+    if data is None or data.get("remain") is None:
+        return None
+    pending = sum(r[1] for r in _records
+                  if r[0] == slot and (r[2] is None or _fetched_at is None or r[2] > _fetched_at))
+    return max(0, int(data.get("remain") or 0) - pending)
+
+
+def remaining(slot) -> Optional[int]:
+    """로컬 기준 남은 수량 (서버 데이터 없으면 None)"""
+    with _lock:
+        return _remaining_locked(_slot_key(slot))
+
+
+def age() -> Optional[float]:
+    """마지막 reconcile 후 경과 시간 (한 번도 없으면 None)"""
+    with _lock:
+        return None if _fetched_at is None else time.monotonic() - _fetched_at
+
+
+def validate(phases: list):
+    """
+    계획 검증 (아침→점심→저녁 순으로 슬롯별 필요량 누적)
+
+    Returns:
+        (phases, shortages)
+        - phases: 아이템 복사본, 재고로 채울 수 없는 아이템은 "short": True
+        - shortages: [(time_key, item), ...]
+    """
+    order = {"morning": 0, "afternoon": 1, "evening": 2}
+    with _lock:
+        left = {slot: _remaining_locked(slot) for slot in _server}
+    checked, shortages = [], []
+    for phase in sorted(phases, key=lambda p: order.get(p.get("time", ""), 99)):
+        items = []
+        for it in phase.get("items") or []:
+            it = dict(it)
+            slot, count = _slot_key(it.get("slot", 1)), int(it.get("count", 1))
+            available = left.get(slot)
+            if available is not None and count > available:
+                it["short"] = True
+                shortages.append((phase.get("time"), it))
+                metrics.inc("tdb_dispense_skipped_total", slot=slot)
+            elif available is not None:
+                left[slot] = available - count
+            items.append(it)
+        checked.append(dict(phase, items=items))
+    return checked, shortages
+
+
+def set_schedules(schedules: list):
+    """오늘 스케줄 → 슬롯별 하루 사용량 (medi_id 우선, 없으면 약 이름으로 슬롯 매칭)"""
+    global _usage
+    with _lock:
+        by_medi = {str(s["medi_id"]): slot for slot, s in _server.items() if s.get("medi_id") is not None}
+        by_name = {s.get("name"): slot for slot, s in _server.items() if s.get("name")}
+    usage = {}
+    for s in schedules or []:
+        slot = _slot_key(s.get("slot_number"))
+        if slot is None and s.get("medi_id") is not None:
+            slot = by_medi.get(str(s["medi_id"]))
+        if slot is None:
+            slot = by_name.get(s.get("medicine_name"))
+        if slot is None:
+            continue
+        try:
+            usage[slot] = usage.get(slot, 0) + int(s.get("dose") or 1)
+        except (TypeError, ValueError):
+            continue
+    with _lock:
+        _usage = usage
+
+
+def projection() -> dict:
+    """슬롯별 남은 일수 (하루 사용량을 모르면 None)"""
+    with _lock:
+        result = {}
+        for slot in _server:
+            remain, daily = _remaining_locked(slot), _usage.get(slot)
+            result[slot] = None if remain is None or not daily else remain // daily
+        return result
+
+
+def slot_rows() -> list:
+    """GUI 재고 타일용: 서버 슬롯 목록에 로컬 remain + days_left 반영"""
+    days = projection()
+    with _lock:
+        rows = []
+        for slot, data in sorted(_server.items()):
+            row = dict(data)
+            remain = _remaining_locked(slot)
+            if remain is not None:
+                row["remain"] = remain
+            row["days_left"] = days.get(slot)
+            rows.append(row)
+        return rows
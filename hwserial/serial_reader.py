@@ -1,26 +1,44 @@
-import os
 import time
 import logging
-from logging.handlers import RotatingFileHandler
 import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Optional
 from datetime import datetime, timedelta
 from config import settings
 from hwserial.arduino_link import (
     open_serial,
     read_uid_once,
+    set_uid_sink,
     dispense,
+    dispense_multi,
+    multi_supported,
     step_next,
     step_home,
-    step_next_n
+    step_next_n,
+    return_home_from
 )
+from hwserial import events
+from hwserial import inventory
+from hwserial import session_journal
+from hwserial import control_server
+from hwserial.control_server import arbiter
+from hwserial import state_bus
+from hwserial.state_bus import DeviceState
+from hwserial.session_queue import TagQueue
+from services import metrics, tracing
+from services.startup import Startup
+from services.logging_setup import get_logger
 from services.api_client import (
-    check_machine_registered,
     resolve_uid,
     build_queue,
     report_dispense,
     heartbeat,
-    get_users_for_machine
+    get_users_for_machine,
+    get_slots_for_machine
 )
 
 # 세션 락 & 키트 고정
@@ -32,31 +50,34 @@ _last_uid = None
 _last_ts = 0.0
 
 # ---------------------------
-# 로깅 설정
+# 로깅 설정 (비동기: services/logging_setup.py)
+# import 시점에는 디렉토리/핸들러를 만들지 않고 첫 로그 때 생성
 # ---------------------------
-os.makedirs("logs", exist_ok=True)
-logger = logging.getLogger("serial_reader")
-logger.setLevel(logging.INFO)
-handler = RotatingFileHandler("logs/serial_reader.log", maxBytes=2_000_000, backupCount=3)
-fmt = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
-handler.setFormatter(fmt)
-logger.addHandler(handler)
-
-def logi(msg):
-    print(msg)
-    logger.info(msg)
-
-def loge(msg):
-    print(msg)
-    logger.error(msg)
+_logger = None
+
+def _log() -> logging.Logger:
+    global _logger
+    if _logger is None:
+        _logger = get_logger("serial_reader")
+    return _logger
+
+def logi(msg, *args):
+    _log().info(msg, *args)
+
+def loge(msg, *args):
+    _log().error(msg, *args)
+
+def logd(msg, *args):
+    """상세 디버그 로그 (기본 INFO 레벨에서는 포맷팅 없이 버려짐)"""
+    _log().debug(msg, *args)
 
 # ---------------------------
-# 오프라인 적치 & 상태 파일
+# 오프라인 적치
 # ---------------------------
-STATE_PATH = Path("data/state.json")
 OFFLINE_PATH = Path("data/offline_reports.jsonl")
-STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
-OFFLINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+metrics.describe("tdb_sessions_total", "counter", "Tag sessions by result (rate x 3600 = sessions per hour)")
+metrics.describe("tdb_session_gap_seconds", "histogram", "Carousel idle time between a session and the next already-queued one")
 
 # ---------------------------
 # 헬퍼 함수들
@@ -153,6 +174,28 @@ def filter_phases_by_time(phases: list, current_slot: str) -> list:
     filtered = [p for p in phases if p.get("time") in allowed]
     return filtered
 
+def merge_group_phases(member_phases: list) -> list:
+    """
+    가족 세션: 구성원별 큐를 시간대(스테이지)별로 합침 → 스테이지당 1회 방문
+
+    Args:
+        member_phases: [(user_id, phases), ...] (phases는 build_queue 형식)
+
+    Returns:
+        [{"time": "morning", "items": [{..., "user_id": ...}, ...]}, ...] (아침→점심→저녁 순)
+        아이템마다 user_id를 붙여 사용자별 보고에 사용
+    """
+    merged = {}
+    for user_id, phases in member_phases:
+        for phase in phases or []:
+            items = phase.get("items") or []
+            if not items:
+                continue
+            bucket = merged.setdefault(phase.get("time", ""), [])
+            bucket.extend(dict(it, user_id=str(user_id)) for it in items)
+    order = {"morning": 0, "afternoon": 1, "evening": 2}
+    return [{"time": t, "items": merged[t]} for t in sorted(merged, key=lambda t: order.get(t, 99))]
+
 def _stage_for_time_key(time_key: str) -> int:
     """
     물리 맵:
@@ -163,24 +206,95 @@ def _stage_for_time_key(time_key: str) -> int:
     return {"morning": 0, "afternoon": 1, "evening": 2}.get(time_key, 0)
 
 def write_state(status: str, **kwargs):
-    """GUI가 읽을 state.json 파일 업데이트"""
-    state = {
-        "status": status,
-        "last_uid": kwargs.get("last_uid"),
-        "phase": kwargs.get("phase"),
-        "progress": kwargs.get("progress", {}),
-        "error": kwargs.get("error"),
-        "ts": time.time(),
-    }
-    tmp = STATE_PATH.with_suffix(".json.tmp")
-    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
-    tmp.replace(STATE_PATH)
+    """상태 버스에 현재 상태 발행 (GUI 구독자 통지 + 합쳐진 state.json 스냅샷)"""
+    state_bus.bus.publish(DeviceState(
+        status=status,
+        last_uid=kwargs.get("last_uid"),
+        phase=kwargs.get("phase"),
+        progress=dict(kwargs.get("progress") or {}),
+        error=kwargs.get("error"),
+        ts=time.time(),
+    ))
+
+def _emit(adapter, event):
+    """타입 이벤트 발행 (어댑터 → DispenseState / GUI)"""
+    if adapter:
+        adapter.notify_event(event)
+
+def _ms_since(t0: float) -> float:
+    return round((time.monotonic() - t0) * 1000, 1)
+
+def _dispense_batch(ser, adapter, sid, time_key: str, items: list, trace):
+    """
+    한 시간대의 여러 슬롯을 MULTI 한 번으로 동시 배출 (슬롯별 시간 합 → 가장 느린 슬롯 시간)
+
+    Returns:
+        (t0, {item_idx: (나온 개수, 응답)}) — 비어 있으면 순차 배출
+        같은 슬롯 아이템(가족 세션)은 개수를 합쳐 보내고, 나온 개수는 앞 아이템부터 채움
+        덜 나온 아이템은 호출 측 순차 루프에서 남은 개수만 재시도
+        (dispense_multi는 실패해도 펌웨어 상태 머신이 끝나거나 조용해질 때까지 읽고 반환
+         → 재시도 DISPENSE가 진행 중인 MULTI와 겹치지 않음)
+    """
+    t0 = _t()
+    if settings.DRY_RUN or settings.DISPENSE_CONCURRENCY <= 1 or not multi_supported():
+        return t0, {}
+    totals = {}
+    for it in items:
+        if not it.get("short"):
+            slot = int(it.get("slot", 1))
+            totals[slot] = totals.get(slot, 0) + int(it.get("count", 1))
+    if len(totals) < 2:
+        return t0, {}
+
+    slot_done = {}
+
+    def on_progress(prog):
+        if prog.command != "DISPENSE" or prog.slot not in totals or prog.done is None:
+            return
+        if prog.done == 0:
+            # 펌웨어가 슬롯 배출을 시작함 → 그 슬롯 아이템 시작 알림 (구 펌웨어면 여기 안 옴)
+            for idx, it in enumerate(items):
+                if not it.get("short") and int(it.get("slot", 1)) == prog.slot:
+                    _emit(adapter, events.DispenseItem(session_id=sid, phase=time_key, slot=prog.slot,
+                                                       count=int(it.get("count", 1)), medi_id=it.get("medi_id", "unknown"),
+                                                       index=idx, total=len(items)))
+        else:
+            _emit(adapter, events.DispenseProgress(session_id=sid, phase=time_key, slot=prog.slot,
+                                                   done=prog.done, total=totals[prog.slot]))
+            slot_done[prog.slot] = prog.done
+            for idx, got in _split_done(items, slot_done).items():
+                if int(items[idx].get("slot", 1)) == prog.slot:
+                    session_journal.pills(time_key, idx, got)
+
+    logi(f"  [DISPENSE] {time_key} - 동시 배출 {totals} (최대 {settings.DISPENSE_CONCURRENCY}개 슬롯)")
+    with trace.span("dispense_multi", phase=time_key, slots=len(totals)) as sp:
+        ok, msg, done = dispense_multi(ser, list(totals.items()), settings.DISPENSE_CONCURRENCY, on_progress)
+        sp["ok"] = ok
+    logi(f"  -> Arduino 응답: {msg} [{_dt(t0)}]")
+    if not done:
+        logi("  [INFO] 펌웨어가 동시 배출(MULTI)을 지원하지 않음 → 순차 배출")
+        return t0, {}
+
+    return t0, {idx: (got, msg) for idx, got in _split_done(items, done).items()}
+
+def _split_done(items: list, slot_done: dict) -> dict:
+    """슬롯별 나온 개수 → 아이템별 개수 (같은 슬롯은 앞 아이템부터 채움, 재고 부족 아이템 제외)"""
+    left = dict(slot_done)
+    out = {}
+    for idx, it in enumerate(items):
+        if it.get("short"):
+            continue
+        slot, count = int(it.get("slot", 1)), int(it.get("count", 1))
+        out[idx] = min(count, left.get(slot, 0))
+        left[slot] = left.get(slot, 0) - out[idx]
+    return out
 
 def store_offline(payload: dict):
     """서버 전송 실패 시 JSONL로 1줄 적치"""
+    OFFLINE_PATH.parent.mkdir(parents=True, exist_ok=True)
     with OFFLINE_PATH.open("a", encoding="utf-8") as f:
         f.write(json.dumps(payload, ensure_ascii=False) + "\n")
-    logger.info(f"[OFFLINE] stored -> {payload.get('time')} items={len(payload.get('items', []))}")
+    _log().info(f"[OFFLINE] stored -> {payload.get('time')} items={len(payload.get('items', []))}")
 
 def flush_offline() -> int:
     """적치분 재전송. 성공 건수 반환"""
@@ -196,14 +310,16 @@ def flush_offline() -> int:
                 continue
             try:
                 payload = json.loads(line)
-                # report_dispense를 직접 호출
+                # report_dispense를 직접 호출 (서버 반영 실패 시 예외 → 적치 유지, 재고 ack 안 함)
                 report_dispense(
                     user_id=payload.get("user_id"),
                     machine_id=payload.get("machine_id"),
                     items=payload.get("items", []),
                     time=payload.get("time"),
-                    result=payload.get("result", "completed")
+                    result=payload.get("result", "completed"),
+                    report_id=payload.get("report_id")
                 )
+                inventory.ack(payload.get("consumed"))
                 sent += 1
             except Exception:
                 keep.append(line)
@@ -214,11 +330,15 @@ def flush_offline() -> int:
 
     return sent
 
-def process_queue(machine_id: str, user_id: str, phases: list, ser, adapter=None):
+def process_queue(machine_id: str, user_id: str, phases: list, ser, adapter=None, trace=None, session_id=None):
     """
     시간대별로 회전판을 이동하며 약을 배출하는 핵심 로직
     phases: [{"time": "morning", "items": [...]}, ...]
+    trace: 세션 트레이스 (이동/배출/보고/복귀 단계 span 기록)
+    session_id: 이벤트에 실을 세션 ID
     """
+    trace = trace or tracing.NULL_TRACE
+    sid = session_id
     progress = {"morning": False, "afternoon": False, "evening": False}
     all_ok = True
     current_stage = 0  # 아침(초기)에서 시작
@@ -232,34 +352,50 @@ def process_queue(machine_id: str, user_id: str, phases: list, ser, adapter=None
         items = phase.get("items", [])
         if not items:
             continue
+        # 재고 부족(inventory.validate)으로 전부 건너뛰는 시간대면 이동 없이 보고만
+        movable = any(not it.get("short") for it in items)
 
         # 1) 목표 스테이지로 이동
         target = _stage_for_time_key(time_key)
-        if target < current_stage:
+        if movable and target < current_stage:
             # 뒤로 가야 하면 HOME으로 리셋 후 다시 전진
             logi(f"  [RESET] Returning to HOME before moving to {time_key}")
-            ok, msg = step_home(ser) if not settings.DRY_RUN else (True, "OK,DRY")
+            _emit(adapter, events.Homing(session_id=sid, reason="reset"))
+            thr = _t()
+            session_journal.moving(0)
+            with trace.span("home_reset", phase=time_key) as sp:
+                ok, msg = step_home(ser, stage=current_stage) if not settings.DRY_RUN else (True, "OK,DRY")
+                sp["ok"] = ok
+            if ok:
+                session_journal.moved(0)
+            _emit(adapter, events.HomeFinished(session_id=sid, reason="reset", ok=ok, duration_ms=_ms_since(thr)))
             logi(f"  HOME(reset): {msg}")
             if not ok:
                 all_ok = False
             current_stage = 0
 
-        need = target - current_stage
+        need = target - current_stage if movable else 0
         if need > 0:
             # ★ 이동 시작 알림
             write_state(status="moving", last_uid=_active_kit_uid, phase=time_key, progress=progress)
-            if adapter:
-                adapter.notify_status_update(3, f"{_time_key_to_korean(time_key)} 위치로 이동 중...")
+            _emit(adapter, events.MoveStarted(session_id=sid, phase=time_key, from_stage=current_stage, to_stage=target))
 
             tmv = _t()
             logi(f"  [MOVE] stage {current_stage} → {target} ({time_key})")
-            ok, msg = step_next_n(ser, need)
+            session_journal.moving(target)
+            with trace.span("move", phase=time_key, steps=need) as sp:
+                ok, msg = step_next_n(ser, need, stage=current_stage)
+                sp["ok"] = ok
+            if ok:
+                session_journal.moved(target)
+            _emit(adapter, events.MoveFinished(session_id=sid, phase=time_key, ok=ok, duration_ms=_ms_since(tmv)))
             logi(f"  STEP: {msg} [{_dt(tmv)}]")
             if not ok:
                 all_ok = False
                 loge(f"[ERR] Failed to move carousel: {msg}")
                 if adapter:
                     adapter.notify_error(f"회전판 이동 실패: {msg}")
+                current_stage = None  # 중간에 멈춰 실제 단계 모름 (HOME 소요 시간 학습 키에서 제외)
                 break
             current_stage = target
 
@@ -270,102 +406,169 @@ def process_queue(machine_id: str, user_id: str, phases: list, ser, adapter=None
                     ser.reset_input_buffer()  # 남은 응답 제거
             except Exception as e:
                 loge(f"[WARN] Failed to clear serial buffer: {e}")
-            logi(f"[DEBUG] 회전판 이동 완료 후 0.3초 대기 + 버퍼 클리어")
+            logd("[DEBUG] 회전판 이동 완료 후 0.3초 대기 + 버퍼 클리어")
 
         # ★ 배출 시작 알림
         write_state(status="dispensing", last_uid=_active_kit_uid, phase=time_key, progress=progress)
 
         # 2) 해당 시간대 아이템 전부 배출
-        phase_ok = True
-        logi(f"[DEBUG] ===== {time_key} 배출 시작 =====")
-        logi(f"[DEBUG] 배출할 아이템 개수: {len(items)}")
+        failed_users = set()  # 최종 실패 아이템이 있는 사용자 (보고 result 결정)
+        consumed_by_user = {}  # 사용자 -> [(slot, count)] 실제 배출분 (보고 성공 시 재고 반영 완료 표시)
+        logd("[DEBUG] ===== %s 배출 시작 =====", time_key)
+        logd("[DEBUG] 배출할 아이템 개수: %s", len(items))
+
+        # 여러 슬롯이면 먼저 동시 배출 1회 → 덜 나온 아이템만 아래 순차 루프에서 재시도
+        batch_t0, batched = _dispense_batch(ser, adapter, sid, time_key, items, trace)
 
         for item_idx, it in enumerate(items):
             slot = int(it.get("slot", 1))
             count = int(it.get("count", 1))
             medi_id = it.get("medi_id", "unknown")
 
-            logi(f"[DEBUG] --- Item {item_idx + 1}/{len(items)} ---")
-            logi(f"[DEBUG] 원본 item 데이터: {it}")
-            logi(f"[DEBUG] 파싱된 값: slot={slot}, count={count}, medi_id={medi_id}")
-
-            if adapter:
-                adapter.notify_status_update(3, f"{_time_key_to_korean(time_key)} - 슬롯 {slot}에서 {count}개 배출 중...")
-
-            logi(f"  [DISPENSE] {time_key} - slot {slot}, count {count} (medi_id: {medi_id})")
-            logi(f"[DEBUG] dispense() 호출 파라미터: slot={slot}, count={count}")
+            logd("[DEBUG] --- Item %s/%s ---", item_idx + 1, len(items))
+            logd("[DEBUG] 원본 item 데이터: %s", it)
+            logd("[DEBUG] 파싱된 값: slot=%s, count=%s, medi_id=%s", slot, count, medi_id)
+
+            item_user = str(it.get("user_id", user_id))
+            if it.get("short"):
+                # 빈 슬롯: 명령 보내지 않음 (타임아웃 + 재시도 대기 없음)
+                loge(f"[SKIP] {time_key} - slot {slot} 재고 부족 (남은 {inventory.remaining(slot)}개, 필요 {count}개)")
+                failed_users.add(item_user)
+                _emit(adapter, events.DispenseItem(session_id=sid, phase=time_key, slot=slot, count=count,
+                                                   medi_id=medi_id, index=item_idx, total=len(items),
+                                                   ok=False, attempts=0, duration_ms=0.0))
+                continue
 
-            ok, msg = dispense(ser, slot, count) if not settings.DRY_RUN else (True, "OK,DRY")
-            logi(f"  -> Arduino 응답: {msg}")
-            logi(f"[DEBUG] dispense() 결과: ok={ok}, msg={msg}")
+            tdisp = _t()
+            attempts = 1
+            # ✅ 펌웨어 진행 줄(PROG,DISPENSE) → 실제로 나온 개수 추적 + GUI 실시간 표시
+            pills = {"done": 0, "base": 0}  # base: 이전 시도까지 나온 개수
+
+            def on_progress(prog, _slot=slot, _count=count, _phase=time_key, _idx=item_idx):
+                if prog.command != "DISPENSE" or prog.done is None:
+                    return
+                pills["done"] = pills["base"] + prog.done
+                if prog.done > 0:
+                    session_journal.pills(_phase, _idx, pills["done"])
+                    _emit(adapter, events.DispenseProgress(session_id=sid, phase=_phase, slot=_slot,
+                                                           done=pills["done"], total=_count))
+
+            if item_idx in batched:
+                # 동시 배출에서 이미 처리됨 (시작 알림도 그쪽에서)
+                tdisp = batch_t0
+                pills["done"], msg = batched[item_idx]
+                ok = pills["done"] >= count
+                if not ok:
+                    msg = f"{msg} (slot {slot}: {pills['done']}/{count})"
+            else:
+                _emit(adapter, events.DispenseItem(session_id=sid, phase=time_key, slot=slot, count=count,
+                                                   medi_id=medi_id, index=item_idx, total=len(items)))
+                logi(f"  [DISPENSE] {time_key} - slot {slot}, count {count} (medi_id: {medi_id})")
+                logd("[DEBUG] dispense() 호출 파라미터: slot=%s, count=%s", slot, count)
+                ok, msg = dispense(ser, slot, count, on_progress=on_progress) if not settings.DRY_RUN else (True, "OK,DRY")
+                logi(f"  -> Arduino 응답: {msg}")
+            logd("[DEBUG] dispense() 결과: ok=%s, msg=%s", ok, msg)
+            item_ok = ok
 
             if not ok:
                 loge(f"[FAIL] dispense failed for slot {slot}: {msg}")
-                phase_ok = False
-                logi(f"[DEBUG] phase_ok 설정: False (첫 시도 실패)")
 
-                # 재시도 1회
-                if not settings.DRY_RUN:
-                    logi(f"  [RETRY] Retrying slot {slot}, count {count}...")
-                    logi(f"[DEBUG] 재시도 dispense() 호출 파라미터: slot={slot}, count={count}")
-                    ok2, msg2 = dispense(ser, slot, count)
+                # 재시도 1회 (이미 나온 개수는 빼고 남은 것만 → 중복 배출 방지)
+                # dispense()는 실패해도 펌웨어가 이전 명령을 끝낼 때까지(또는 조용해질 때까지) 읽고 반환
+                # → 여기서는 펌웨어가 멈춰 있고, pills["done"]은 마지막 진행 줄 기준
+                remaining = count - pills["done"]
+                if not settings.DRY_RUN and remaining > 0:
+                    logi(f"  [RETRY] Retrying slot {slot}, count {remaining} (이미 {pills['done']}개 배출)...")
+                    logd("[DEBUG] 재시도 dispense() 호출 파라미터: slot=%s, count=%s", slot, remaining)
+                    pills["base"] = pills["done"]
+                    ok2, msg2 = dispense(ser, slot, remaining, on_progress=on_progress)
+                    attempts += 1
+                    item_ok = ok2
                     logi(f"  (retry)-> Arduino 응답: {msg2}")
-                    logi(f"[DEBUG] 재시도 결과: ok={ok2}, msg={msg2}")
-
-                    if ok2:
-                        phase_ok = True
-                        logi(f"[DEBUG] phase_ok 설정: True (재시도 성공)")
-                    else:
-                        logi(f"[DEBUG] phase_ok 유지: False (재시도도 실패)")
+                    logd("[DEBUG] 재시도 결과: ok=%s, msg=%s", ok2, msg2)
+                elif not settings.DRY_RUN:
+                    # 진행 줄로는 전부 나왔는데 최종 응답만 못 받음
+                    logi(f"  [INFO] slot {slot}: {count}개 모두 배출 확인 (최종 응답 누락)")
+                    item_ok = True
 
                 # ✅ 팝업 제거: 로그만 남기고 팝업 표시하지 않음
-                logi(f"[DEBUG] 최종 phase_ok 상태: {phase_ok}")
-                if not phase_ok:
+                if not item_ok:
                     loge(f"[WARN] 슬롯 {slot} 배출 실패 (팝업 표시 안 함)")
             else:
-                logi(f"[DEBUG] 배출 성공 (첫 시도)")
-
-            time.sleep(0.1)
-
-        logi(f"[DEBUG] ===== {time_key} 배출 완료 (phase_ok={phase_ok}) =====")
-
-        # 3) 시간대별 서버 리포트 (slot 정보 포함)
-        payload_items = [
-            {
-                "medi_id": it.get("medi_id"),
-                "slot": int(it.get("slot", 1)),
-                "count": int(it.get("count", 1))
-            }
-            for it in items if it.get("medi_id")
-        ]
+                logd("[DEBUG] 배출 성공 (첫 시도)")
+            if item_ok:
+                inventory.consume(slot, count)
+                consumed_by_user.setdefault(item_user, []).append((slot, count))
+            else:
+                failed_users.add(item_user)
+                if pills["done"] > 0:
+                    inventory.consume(slot, pills["done"])  # 실패해도 이미 나온 만큼은 차감
+                    consumed_by_user.setdefault(item_user, []).append((slot, pills["done"]))
+            session_journal.item(time_key, item_idx, count if item_ok else pills["done"], item_ok)
+            trace.add("dispense", tdisp, phase=time_key, slot=slot, count=count, ok=item_ok,
+                      **({"pills": pills["done"]} if not item_ok else {}))
+            _emit(adapter, events.DispenseItem(session_id=sid, phase=time_key, slot=slot, count=count,
+                                               medi_id=medi_id, index=item_idx, total=len(items),
+                                               ok=item_ok, attempts=attempts, duration_ms=_ms_since(tdisp)))
+
+            if item_idx not in batched:
+                time.sleep(0.1)
+
+        # 시간대 결과는 아이템 전체 기준 (재고 부족 건너뜀/최종 실패가 하나라도 있으면 실패)
+        phase_ok = not failed_users
+        logd("[DEBUG] ===== %s 배출 완료 (phase_ok=%s) =====", time_key, phase_ok)
+
+        # 3) 시간대별 서버 리포트 (slot 정보 포함, 가족 세션이면 사용자별로 나눠서)
+        payload_by_user = {}
+        for it in items:
+            if it.get("medi_id"):
+                payload_by_user.setdefault(str(it.get("user_id", user_id)), []).append({
+                    "medi_id": it.get("medi_id"),
+                    "slot": int(it.get("slot", 1)),
+                    "count": int(it.get("count", 1))
+                })
 
         # 3) 시간대별 서버 리포트 (오프라인 처리 포함)
-        if payload_items:
-            result_status = "completed" if phase_ok else "partial"
+        for report_user, payload_items in payload_by_user.items():
+            result_status = "partial" if report_user in failed_users else "completed"
             payload = {
                 "machine_id": machine_id,
-                "user_id": user_id,
+                "user_id": report_user,
                 "time": time_key,
                 "items": payload_items,
-                "result": result_status
+                "result": result_status,
+                "consumed": consumed_by_user.get(report_user, []),  # 오프라인 재전송 성공 시 재고 반영용
+                "report_id": session_journal.report_id(sid, time_key, report_user) if sid else None,
             }
 
             try:
                 trep = _t()
-                logi(f"[REPORT] {time_key} - {len(payload_items)} items")
+                logi(f"[REPORT] {time_key} - user={report_user}, {len(payload_items)} items")
+                session_journal.report_sending(time_key, report_user)
+                # 서버 반영 실패 시 예외 → 아래 reported/ack는 확인된 보고만 (실패분은 except에서 오프라인 적치)
                 report_dispense(
-                    user_id=user_id,
+                    user_id=report_user,
                     machine_id=machine_id,
                     items=payload_items,
                     time=time_key,
-                    result=result_status
+                    result=result_status,
+                    report_id=payload["report_id"]
                 )
                 logi(f"[REPORT_OK] {time_key} - {result_status} [{_dt(trep)}]")
+                session_journal.reported(time_key, report_user, result_status)
+                inventory.ack(payload["consumed"])
+                trace.add("report", trep, phase=time_key, result=result_status)
+                _emit(adapter, events.PhaseReported(session_id=sid, phase=time_key, result=result_status,
+                                                    items=len(payload_items), duration_ms=_ms_since(trep)))
             except Exception as e:
                 loge(f"[ERR] report failed: {e}")
+                trace.add("report", trep, phase=time_key, result="offline")
+                _emit(adapter, events.PhaseReported(session_id=sid, phase=time_key, result="offline",
+                                                    items=len(payload_items), duration_ms=_ms_since(trep)))
                 # 오프라인에 저장 (디스크 오류 방어)
                 try:
                     store_offline(payload)
+                    session_journal.reported(time_key, report_user, "offline")
                 except Exception as offline_err:
                     loge(f"[ERR] Failed to store offline report: {offline_err}")
                 phase_ok = False
@@ -379,32 +582,399 @@ def process_queue(machine_id: str, user_id: str, phases: list, ser, adapter=None
 
     # 4) 전 타임 끝나면 원위치 복귀
     write_state(status="returning", last_uid=_active_kit_uid, phase="evening", progress=progress)
-
-    if adapter:
-        adapter.notify_status_update(3, "HOME 위치로 복귀 중...")
+    _emit(adapter, events.Homing(session_id=sid, reason="final"))
 
     logi("[HOME] Returning to initial position")
+    thm = _t()
     if settings.DRY_RUN:
         logi("[DRY] HOME")
+        ok = True
     else:
-        thm = _t()
-        ok, msg = step_home(ser)
+        session_journal.moving(0)
+        ok, msg = step_home(ser, stage=current_stage)
+        trace.add("home", thm, ok=ok)
+        if ok:
+            session_journal.moved(0)
         logi(f"  HOME(final): {msg} [{_dt(thm)}]")
         if not ok:
             all_ok = False
             loge(f"[ERR] Failed to return HOME: {msg}")
             if adapter:
                 adapter.notify_error(f"HOME 복귀 실패: {msg}")
+    _emit(adapter, events.HomeFinished(session_id=sid, reason="final", ok=ok, duration_ms=_ms_since(thm)))
 
     return all_ok, progress
 
-def main(adapter=None):
+# ---------------------------
+# 세션 준비 (네트워크 조회만, 시리얼 사용 안 함 → 다른 세션 배출 중에도 병렬 실행 가능)
+# ---------------------------
+@dataclass
+class SessionPlan:
+    uid: str
+    outcome: str                      # ready | resolve_failed | kit_not_registered | out_of_time
+                                      # | already_taken | queue_failed | queue_invalid | no_schedule
+    user_id: Optional[str] = None
+    user_name: str = "알 수 없는 사용자"
+    current_slot: Optional[str] = None
+    time_message: str = ""
+    phases: list = field(default_factory=list)
+    filtered_phases: list = field(default_factory=list)
+    message: str = ""                 # 거절 시 상태 타일 문구
+    members: dict = field(default_factory=dict)   # 가족 세션: user_id -> 이름 (단일 세션이면 비어 있음)
+
+
+def _log_phases(title: str, phases: list):
+    if not _log().isEnabledFor(logging.DEBUG):
+        return
+    logd("[DEBUG] ===== %s =====", title)
+    for idx, phase in enumerate(phases):
+        items = phase.get("items", [])
+        logd("[DEBUG] Phase %s: time=%s, items_count=%s", idx, phase.get("time", "unknown"), len(items))
+        for item_idx, item in enumerate(items):
+            logd("[DEBUG]   Item %s: slot=%s, count=%s, medi_id=%s", item_idx, item.get('slot'), item.get('count'), item.get('medi_id'))
+    logd("[DEBUG] ================================")
+
+
+def _queue_phases(queue_response):
+    """build_queue 응답 → phases (형식 오류면 None)"""
+    # 응답 파싱: {"status": "ok", "queue": [...]} 또는 직접 배열
+    if isinstance(queue_response, dict) and "queue" in queue_response:
+        return queue_response["queue"] or []
+    if isinstance(queue_response, list):
+        return queue_response
+    return None
+
+
+def _prepare_group(machine_id: str, plan: SessionPlan, users: list, trace) -> SessionPlan:
+    """보호자 태그: 오늘 아직 안 먹은 구성원 전체의 큐를 받아 시간대별로 합침"""
+    members = [u for u in users if u.get("user_id") is not None and int(u.get("took_today") or 0) != 1]
+    if not members:
+        plan.outcome, plan.message = "already_taken", "가족 모두 오늘 복용을 마쳤습니다"
+        return plan
+
+    # 구성원별 build_queue는 병렬로 (구성원 수만큼 왕복 시간이 늘지 않도록)
+    with trace.span("build_queue", members=len(members)):
+        with ThreadPoolExecutor(max_workers=min(4, len(members)), thread_name_prefix="group-queue") as pool:
+            responses = list(pool.map(lambda u: build_queue(machine_id, str(u["user_id"])), members))
+
+    raw, filtered = [], []
+    for user, resp in zip(members, responses):
+        member_id = str(user["user_id"])
+        phases = _queue_phases(resp) if resp else None
+        if phases is None:
+            loge(f"[GROUP] 큐 조회 실패 → 제외 (user={member_id})")
+            continue
+        if isinstance(resp, dict) and int(resp.get("took_today") or 0) == 1:
+            continue
+        plan.members[member_id] = user.get("name") or member_id
+        raw.append((member_id, phases))
+        filtered.append((member_id, filter_phases_by_time(phases, plan.current_slot)))
+
+    if not raw:
+        plan.outcome, plan.message = "queue_failed", "서버 연결 오류"
+        return plan
+
+    plan.phases = merge_group_phases(raw)
+    plan.filtered_phases = merge_group_phases(filtered)
+    logi(f"[GROUP] 가족 세션: {list(plan.members.values())} → 시간대 {[p['time'] for p in plan.filtered_phases]}")
+    _log_phases("가족 합친 큐", plan.filtered_phases)
+
+    if not plan.filtered_phases:
+        plan.outcome = "no_schedule"
+        plan.message = (f"현재 시간대({plan.current_slot})에 배출할 약이 없습니다" if plan.phases
+                        else "오늘 배출할 스케줄이 없습니다")
+    return plan
+
+
+def prepare_session(machine_id: str, uid: str, trace=None) -> SessionPlan:
+    """UID 해석 → 사용자 이름 → 시간대 → build_queue → 시간대 필터링"""
+    trace = trace or tracing.NULL_TRACE
+
+    with trace.span("resolve"):
+        res = resolve_uid(uid)
+    if not res:
+        return SessionPlan(uid, "resolve_failed")
+
+    # ✅ 재고 기준값이 오래됐으면 갱신 (GUI 폴링이 돌고 있으면 보통 생략됨)
+    inv_age = inventory.age()
+    if inv_age is None or inv_age > settings.INVENTORY_MAX_AGE_SEC:
+        t_inv = _t()
+        with trace.span("inventory"):
+            slots = get_slots_for_machine(machine_id)
+        if slots is not None:
+            inventory.reconcile(slots, fetched_at=t_inv)
+    if not res.get("registered"):
+        logi(f"[ACTION] KIT_NOT_REGISTERED → UID={uid} QR 표시 필요")
+        return SessionPlan(uid, "kit_not_registered")
+
+    plan = SessionPlan(uid, "ready", user_id=str(res.get("user_id")))
+    took_today = int(res.get("took_today", 0))
+    logi(f"[OK] user={plan.user_id}, took_today={took_today}")
+
+    # ===== 사용자 이름 조회 =====
+    with trace.span("user_lookup"):
+        users = get_users_for_machine(machine_id) or []
+    role = res.get("role")
+    for user in users:
+        if str(user.get("user_id")) == plan.user_id:
+            plan.user_name = user.get("name")
+            role = role or user.get("role")
+            break
+
+    # ===== 1) 현재 시간대 확인 =====
+    with trace.span("time_slot"):
+        plan.current_slot, plan.time_message = get_current_time_slot()
+    logd("[DEBUG] current_slot: %s / time_message: %s", plan.current_slot, plan.time_message)
+
+    if plan.current_slot is None:
+        # 배출 불가 시간대 (00:00~06:00)
+        logi(f"[REJECT] 배출 불가 시간대 ({datetime.now():%H시 %M분}) → 배출 건너뜀")
+        plan.outcome, plan.message = "out_of_time", plan.time_message
+        return plan
+
+    # ===== 보호자 + 가족 모드: 구성원 전체를 한 번의 회전으로 =====
+    if settings.GROUP_DISPENSE and role == "parent" and users:
+        return _prepare_group(machine_id, plan, users, trace)
+
+    # ===== 2) took_today 확인 (이미 복용 완료) =====
+    if took_today == 1:
+        logi(f"[INFO] 이미 오늘 복용 완료 (user={plan.user_id})")
+        plan.outcome, plan.message = "already_taken", f"오늘 이미 복용하셨습니다 ({plan.user_name}님)"
+        return plan
+
+    # ===== 3) 스케줄 조회 (서버가 시간대별로 그룹화된 큐 반환) =====
+    logi(f"[SCHEDULE] 현재 시간대: {plan.current_slot} ({datetime.now().hour}시)")
+    with trace.span("build_queue"):
+        queue_response = build_queue(machine_id, plan.user_id)
+    if not queue_response:
+        loge(f"[ERR] 서버 응답 없음 (user={plan.user_id})")
+        plan.outcome, plan.message = "queue_failed", "서버 연결 오류"
+        return plan
+
+    phases = _queue_phases(queue_response)
+    if phases is None:
+        loge(f"[ERR] invalid queue format: {queue_response}")
+        plan.outcome, plan.message = "queue_invalid", "큐 형식 오류"
+        return plan
+    plan.phases = phases
+    _log_phases("서버 응답 원본 큐", plan.phases)
+
+    # ===== 4) 현재 시간대에 맞게 필터링 =====
+    tfilt = _t()
+    plan.filtered_phases = filter_phases_by_time(plan.phases, plan.current_slot)
+    logi(f"[FILTER] 전체={len(plan.phases)}, 필터링 후={len(plan.filtered_phases)}, 시간대={plan.current_slot}")
+    trace.add("filter", tfilt, phases=len(plan.phases), kept=len(plan.filtered_phases))
+    _log_phases("필터링 후 큐", plan.filtered_phases)
+
+    # ===== 5) 필터링 후 비어있는지 확인 =====
+    if not any(p.get("items") for p in plan.filtered_phases):
+        logi(f"[INFO] 현재 시간대({plan.current_slot})에 배출할 약이 없음")
+        if any(p.get("items") for p in plan.phases):
+            # 스케줄은 있지만 현재 시간대가 지나서 배출할 수 없음
+            plan.message = f"현재 시간대({plan.current_slot})에 배출할 약이 없습니다"
+        else:
+            plan.message = "오늘 배출할 스케줄이 없습니다"
+        plan.outcome = "no_schedule"
+    return plan
+
+
+# ---------------------------
+# 결과 문구 유지 (고정 sleep 대신 타이머 → 대기열에 다음 태그가 있으면 바로 진행)
+# ---------------------------
+_status_gen = 0
+
+def _hold_then_wait(adapter, seconds: float = None):
+    """seconds 후에도 새 세션이 시작되지 않았으면 대기 화면으로"""
+    gen = _status_gen
+
+    def _release():
+        if gen == _status_gen and _session_user_id is None:
+            write_state(status="waiting_uid")
+            if adapter:
+                adapter.notify_waiting()
+
+    timer = threading.Timer(settings.STATUS_HOLD_SEC if seconds is None else seconds, _release)
+    timer.daemon = True
+    timer.start()
+
+
+def run_session(machine_id: str, plan: SessionPlan, ser, adapter=None, trace=None):
+    """준비된 계획 실행: 거절 안내 또는 process_queue + 결과 표시"""
+    global _session_user_id, _active_kit_uid, _status_gen
+    trace = trace or tracing.NULL_TRACE
+    uid = plan.uid
+    _status_gen += 1  # 이전 세션의 결과 문구 타이머 무효화
+
+    if plan.outcome != "ready":
+        trace.finish(plan.outcome, **({"user_id": plan.user_id} if plan.user_id else {}))
+        metrics.inc("tdb_sessions_total", result=plan.outcome)
+        if plan.outcome == "resolve_failed":
+            if adapter: adapter.notify_error("UID를 해석할 수 없습니다.")
+        elif plan.outcome == "kit_not_registered":
+            write_state(status="kit_not_registered", last_uid=uid)
+            if adapter: adapter.notify_kit_unregistered(uid)
+        elif plan.outcome == "queue_failed":
+            if adapter:
+                adapter.notify_waiting()
+                adapter.notify_error(plan.message)
+        else:
+            write_state(status={"out_of_time": "out_of_time", "already_taken": "already_taken",
+                                "no_schedule": "no_schedule"}.get(plan.outcome, "error"), last_uid=uid)
+            if adapter:
+                adapter.notify_status_update(3, plan.message)
+                if plan.outcome in ("out_of_time", "queue_invalid"):
+                    adapter.notify_error(plan.message)
+            _hold_then_wait(adapter)
+        return plan.outcome
+
+    # ✅ 재고 확인: 채울 수 없는 아이템은 이동 전에 표시 (빈 슬롯 타임아웃 방지)
+    phases, shortages = inventory.validate(plan.filtered_phases)
+    if shortages:
+        empty_slots = sorted({int(it.get("slot", 1)) for _, it in shortages})
+        logi(f"[INVENTORY] 재고 부족으로 건너뜀: {[(t, it.get('slot'), it.get('count')) for t, it in shortages]}")
+        if adapter:
+            adapter.notify_status_update(3, f"슬롯 {', '.join(map(str, empty_slots))} 재고 부족 - 건너뜁니다")
+
+    # ★★★ process_queue 호출 (시간대별 회전판 이동 + 배출) ★★★
+    _session_user_id = plan.user_id
+    _active_kit_uid = uid
+    filtered_times = [p.get("time") for p in phases if any(not it.get("short") for it in p.get("items") or [])]
+    first_phase = filtered_times[0] if filtered_times else "morning"
+
+    write_state(status="queue_ready", last_uid=uid, phase=first_phase)
+    logi(f"[QUEUE] 배출 시작: {plan.user_name}님 - {filtered_times}"
+         + (f" (가족 {len(plan.members)}명)" if plan.members else ""))
+    session_id = trace.session_id or uuid.uuid4().hex[:12]
+    t_session = _t()
+    _emit(adapter, events.SessionStarted(session_id=session_id, user_id=plan.user_id,
+                                         user_name=plan.user_name, phases=tuple(filtered_times),
+                                         members=tuple(plan.members.values())))
+
+    progress = {}  # 예외 발생 시에도 안전하도록 초기화
+    # ✅ 선기록: 도중에 프로세스가 죽어도 재시작 시 recover_interrupted()가 이어서 정리
+    session_journal.begin(session_id, machine_id, plan.user_id, phases)
+    try:
+        all_success, progress = process_queue(machine_id, plan.user_id, phases, ser, adapter,
+                                              trace=trace, session_id=session_id)
+    except Exception:
+        metrics.inc("tdb_sessions_total", result="error")
+        _emit(adapter, events.SessionEnded(session_id=session_id, result="error",
+                                           progress=progress, duration_ms=_ms_since(t_session)))
+        raise
+    session_journal.end()
+    result = "completed" if all_success else "partial"
+    trace.finish(result, user_id=plan.user_id)
+    metrics.inc("tdb_sessions_total", result=result)
+
+    if all_success:
+        logi("[OK] Dispense completed successfully")
+        write_state(status="done", last_uid=uid, progress=progress)
+    else:
+        loge("[WARN] Dispense completed with errors")
+        write_state(status="error", last_uid=uid, progress=progress, error="일부 배출 실패")
+    _emit(adapter, events.SessionEnded(session_id=session_id, result=result,
+                                       progress=dict(progress), duration_ms=_ms_since(t_session)))
+
+    _session_user_id = _active_kit_uid = None
+    _hold_then_wait(adapter)
+    return result
+
+
+def recover_interrupted(ser, adapter=None, after_reset: bool = True) -> bool:
+    """
+    끝나지 않은 세션 저널이 있으면 자동 복구 (사람이 recovery_jog.py 돌릴 필요 없음)
+    1) 회전판 HOME 복귀 — after_reset(시리얼을 새로 열어 아두이노가 단계를 잊음)이면
+       저널의 마지막 단계만큼 JOG로 되돌림, 아니면 펌웨어 HOME
+    2) 보고 안 된 시간대는 실제 나온 개수로 보고 (실패 시 오프라인 적치) → 서버가 복용 처리해 재배출 없음
+       전송 중 죽은 보고(서버 반영 여부 모름)는 REPORT_DEDUP_BY_ID=1(서버가 report_id로 중복 제거)일 때만
+       같은 키로 재전송, 아니면 들어간 것으로 보고 넘김 (이중 반영 방지)
+    3) 저널 삭제 (모든 보고를 서버/오프라인 적치로 넘긴 경우만)
+    """
+    rec = session_journal.pending()
+    if rec is None:
+        return False
+    t0 = _t()
+    logi(f"[RECOVER] 중단된 세션 {rec.session_id} (user={rec.user_id}, stage={rec.stage}, "
+         f"배출 {rec.dispensed_total()}개)")
+    write_state(status="returning")
+    if adapter:
+        adapter.notify_status_update(3, "이전 배출 정리 중...")
+
+    if settings.DRY_RUN:
+        ok, msg = True, "OK,DRY"
+    elif after_reset:
+        ok, msg = return_home_from(ser, rec.stage)
+    else:
+        ok, msg = step_home(ser, stage=rec.stage)
+    logi(f"  HOME(recover): {msg}")
+    if not ok:
+        loge(f"[ERR] 복구 중 HOME 실패: {msg}")
+        if adapter:
+            adapter.notify_error(f"회전판 복귀 실패: {msg}")
+
+    # 보고를 서버 또는 오프라인 적치로 넘긴 경우에만 reported 기록 → 둘 다 실패하면 저널 유지 (다음 복구에서 재시도)
+    # 재고: 재시작 후(after_reset)에는 이전 차감 기록이 메모리와 함께 사라졌으므로 다시 차감,
+    #       같은 프로세스 안 복구면 process_queue가 이미 차감함 → 성공 시 ack만
+    handed_off = True
+    for payload in rec.reports():
+        maybe_sent = payload.pop("maybe_sent")
+        if maybe_sent and not settings.REPORT_DEDUP_BY_ID:
+            loge(f"  [REPORT] {payload['time']} - user={payload['user_id']} 전송 중 중단됨 → 서버 반영 여부 모름, "
+                 f"재전송 안 함 (report_id={payload['report_id']}, 서버 기록 확인 필요)")
+            if not after_reset:
+                inventory.ack(payload["consumed"])
+            session_journal.reported(payload["time"], payload["user_id"], "maybe_sent")
+            continue
+        if maybe_sent:
+            logi(f"  [REPORT] {payload['time']} - user={payload['user_id']} 전송 중 중단됨 → "
+                 f"report_id={payload['report_id']} 로 재전송")
+        try:
+            session_journal.report_sending(payload["time"], payload["user_id"])
+            report_dispense(user_id=payload["user_id"], machine_id=payload["machine_id"],
+                            items=payload["items"], time=payload["time"], result=payload["result"],
+                            report_id=payload["report_id"])
+            result = payload["result"]
+            if not after_reset:
+                inventory.ack(payload["consumed"])
+        except Exception as e:
+            loge(f"[ERR] recover report failed: {e}")
+            try:
+                store_offline(payload)
+            except Exception as offline_err:
+                loge(f"[ERR] recover offline store failed: {offline_err} (저널 유지)")
+                handed_off = False
+                continue
+            if after_reset:
+                for slot, count in payload["consumed"]:
+                    inventory.consume(slot, count)   # 서버 반영 전까지 로컬 재고에서 차감
+            result = "offline"
+        session_journal.reported(payload["time"], payload["user_id"], result)
+        logi(f"  [REPORT] {payload['time']} - user={payload['user_id']} {payload['result']} → {result}")
+
+    if handed_off:
+        session_journal.end()
+        metrics.inc("tdb_sessions_total", result="recovered")
+        logi(f"[RECOVER] 완료 [{_dt(t0)}]")
+    else:
+        loge("[RECOVER] 보고를 넘기지 못한 시간대가 있어 저널 유지 (다음 복구에서 재시도)")
+    write_state(status="waiting_uid")
+    if adapter:
+        adapter.notify_waiting()
+    return True
+
+
+def main(adapter=None, startup=None):
     global _last_uid, _last_ts, _session_user_id, _active_kit_uid
     machine_id = settings.MACHINE_ID
 
-    # --- (A) 등록될 때까지 대기 ---
+    # ✅ 등록 확인과 시리얼 열기는 동시에 진행 (main.py가 GUI 생성 전에 시작해 둠)
+    if startup is None:
+        startup = Startup(machine_id)
+        startup.begin(lambda: open_serial(baud_rate=9600))
+
+    # --- (A) 등록될 때까지 대기 (시리얼 열기는 그동안 계속 진행) ---
+    registered = startup.registration.result()
     while True:
-        registered = check_machine_registered(machine_id)
         if registered:
             write_state(status="waiting_uid")  # 등록 완료되면 대기 화면
             if adapter:
@@ -415,20 +985,55 @@ def main(adapter=None):
         if adapter:
             adapter.notify_unregistered(settings.DEVICE_UID)
         time.sleep(5)  # 5초마다 재확인
+        registered = startup.check_registration_live()
 
     try:
-        ser = open_serial(baud_rate=9600)
+        ser = startup.serial.result() if startup.serial else open_serial(baud_rate=9600)
     except Exception as e:
         loge(f"[ERR] Serial open failed: {e}")
         if adapter: adapter.notify_error(f"시리얼 포트 열기 실패: {e}")
         return
 
+    # ✅ 세션 대기열: 배출 중 찍힌 태그도 받아서 다음 사용자 준비를 미리 해 둠
+    tag_queue = TagQueue(lambda uid, trace: prepare_session(machine_id, uid, trace),
+                         maxsize=settings.TAG_QUEUE_MAX, max_age=settings.TAG_PREFETCH_MAX_SEC,
+                         on_change=lambda names: _emit(adapter, events.QueueChanged(waiting=names)))
+
+    def on_uid(uid, t_read=None):
+        """UID 수신 (메인 루프 또는 배출 명령 응답 대기 중 arduino_link에서 호출)"""
+        global _last_uid, _last_ts
+        now = time.monotonic()
+        if uid == _last_uid and (now - _last_ts) < settings.UID_COOLDOWN_SEC:
+            return
+        _last_uid, _last_ts = uid, now
+
+        # ✅ 세션 트레이스 시작 (UID 수신 시점 기준)
+        trace = tracing.start_session(start=t_read or now, uid=uid, machine_id=machine_id)
+        if t_read is not None:
+            trace.add("uid_read", t_read, now)
+        if tag_queue.offer(uid, trace):
+            logi(f"[UID] {uid} (대기 {len(tag_queue)})")
+        else:
+            logi(f"[UID] {uid} 대기열 추가 안 함 (진행/대기 중이거나 가득 참)")
+
+    set_uid_sink(on_uid)
+    try:
+        with arbiter.session("recovery"):
+            recover_interrupted(ser, adapter, after_reset=True)
+    except Exception as e:
+        loge(f"[ERR] session recovery failed: {e}")
+    # ✅ 진단 스크립트는 포트를 따로 열지 않고 이 소켓으로 (시리얼 소유자는 이 스레드 하나)
+    control_server.start(ser)
+    last_session_end = None
+    served_at = {}  # user_id -> 마지막 배출 세션 종료 시각 (미리 받은 큐가 낡았는지 판단)
+
     with ser:
         logi("[INFO] Serial ready. Waiting UID...")
         if adapter: adapter.notify_waiting()
         last_hb = time.monotonic() - settings.HEARTBEAT_SEC
     
         while True:
+            trace = tracing.NULL_TRACE
             try:
                 now = time.monotonic()
     
@@ -443,228 +1048,67 @@ def main(adapter=None):
                         loge(f"[HB] failed: {e}")
                     last_hb = now
 
-                # UID 읽기 (시리얼 연결 오류 방어)
-                try:
-                    uid = read_uid_once(ser)
-                    if not uid:
+                # 대기열에 태그가 있으면 바로 다음 세션 (회전판은 비어 있음)
+                entry = tag_queue.pop()
+                if entry is None:
+                    # UID 읽기 (시리얼 연결 오류 방어)
+                    try:
+                        t_read = time.monotonic()
+                        with arbiter.session("idle"):   # 유지보수 명령이 기다리면 여기서 양보
+                            uid = read_uid_once(ser)
+                    except Exception as e:
+                        loge(f"[ERR] Failed to read UID from serial: {e}")
+                        if adapter:
+                            adapter.notify_error(f"RFID 읽기 오류: {e}")
+                        time.sleep(1)
                         continue
-                except Exception as e:
-                    loge(f"[ERR] Failed to read UID from serial: {e}")
-                    if adapter:
-                        adapter.notify_error(f"RFID 읽기 오류: {e}")
-                    time.sleep(1)
+                    if uid:
+                        on_uid(uid, t_read)
                     continue
-    
-                if uid == _last_uid and (now - _last_ts) < settings.UID_COOLDOWN_SEC:
-                    continue
-                _last_uid, _last_ts = uid, now
-    
-                if _session_user_id is not None:
-                    continue
-
-                logi(f"[UID] {uid}")
-                write_state(status="resolving_uid", last_uid=uid)
-                if adapter:
-                    adapter.notify_uid(uid)
-                    adapter.notify_status_update(3, f"카드 확인 중...")
-
-                res = resolve_uid(uid)
-
-                if not res:
-                    if adapter: adapter.notify_error("UID를 해석할 수 없습니다.")
-                    continue
-    
-                if not res.get("registered"):
-                    logi(f"[ACTION] KIT_NOT_REGISTERED → UID={uid} QR 표시 필요")
-                    write_state(status="kit_not_registered", last_uid=uid)
-                    if adapter: adapter.notify_kit_unregistered(uid)
-                    continue
-
-                user_id = str(res.get("user_id"))
-                took_today = int(res.get("took_today", 0))
-
-                logi(f"[OK] user={user_id}, took_today={took_today}")
-
-                # ===== 사용자 이름 조회 (빠른 피드백용) =====
-                users = get_users_for_machine(machine_id)
-                user_name = "알 수 없는 사용자"
-                if users:
-                    for user in users:
-                        if str(user.get("user_id")) == user_id:
-                            user_name = user.get("name")
-                            break
-
-                # ✅ 사용자 이름 표시
-                if adapter:
-                    adapter.notify_status_update(3, f"{user_name}님 확인됨")
-
-                # ===== 1) 현재 시간대 확인 =====
-                now_time = datetime.now()
-                current_hour = now_time.hour
-                current_minute = now_time.minute
-                logi(f"[DEBUG] ===== 시간대 확인 =====")
-                logi(f"[DEBUG] 현재 시각: {current_hour:02d}:{current_minute:02d}")
-
-                current_slot, time_message = get_current_time_slot()
-                logi(f"[DEBUG] current_slot: {current_slot}")
-                logi(f"[DEBUG] time_message: {time_message}")
-                logi(f"[DEBUG] ==========================")
-
-                if current_slot is None:
-                    # 배출 불가 시간대 (00:00~06:00)
-                    logi(f"[REJECT] 배출 불가 시간대: {current_hour}시 {current_minute}분")
-                    logi(f"[REJECT] current_slot이 None입니다. 배출을 건너뜁니다.")
-                    write_state(status="out_of_time", last_uid=uid)
-                    if adapter:
-                        adapter.notify_status_update(3, time_message)
-                        adapter.notify_error(time_message)
-                    time.sleep(3)
-                    if adapter:
-                        adapter.notify_waiting()
-                    continue
-
-                # ===== 2) took_today 확인 (이미 복용 완료) =====
-                if took_today == 1:
-                    logi(f"[INFO] 이미 오늘 복용 완료 (user={user_id})")
-                    write_state(status="already_taken", last_uid=uid)
 
-                    if adapter:
-                        adapter.notify_status_update(3, f"오늘 이미 복용하셨습니다 ({user_name}님)")
-                    time.sleep(3)
-                    if adapter:
-                        adapter.notify_waiting()
-                    continue
-
-                # ===== 3) 스케줄 조회 =====
-                logi(f"[SCHEDULE] 현재 시간대: {current_slot} ({datetime.now().hour}시)")
-                if adapter:
-                    adapter.notify_status_update(3, f"{user_name}님 스케줄 조회 중... ({time_message})")
-
-                _session_user_id = user_id
-                _active_kit_uid = uid
-
-                # build_queue 호출 (서버가 시간대별로 그룹화된 큐 반환)
-                queue_response = build_queue(machine_id, user_id)
-                if not queue_response:
-                    loge(f"[ERR] 서버 응답 없음 (user={user_id})")
-                    if adapter:
-                        adapter.notify_waiting()
-                        adapter.notify_error("서버 연결 오류")
-                    time.sleep(3)
-                    _session_user_id = _active_kit_uid = None
-                    continue
-
-                # 응답 파싱: {"status": "ok", "queue": [...]} 또는 직접 배열
-                if isinstance(queue_response, dict) and "queue" in queue_response:
-                    phases = queue_response["queue"] or []
-                elif isinstance(queue_response, list):
-                    phases = queue_response
-                else:
-                    loge(f"[ERR] invalid queue format: {queue_response}")
-                    if adapter: adapter.notify_error("큐 형식 오류")
-                    time.sleep(3)
-                    _session_user_id = _active_kit_uid = None
-                    if adapter: adapter.notify_waiting()
-                    continue
-
-                # ===== DEBUG: 서버에서 받은 원본 큐 출력 =====
-                logi(f"[DEBUG] ===== 서버 응답 원본 큐 =====")
-                logi(f"[DEBUG] 전체 phases 개수: {len(phases)}")
-                for idx, phase in enumerate(phases):
-                    time_key = phase.get("time", "unknown")
-                    items = phase.get("items", [])
-                    logi(f"[DEBUG] Phase {idx}: time={time_key}, items_count={len(items)}")
-                    for item_idx, item in enumerate(items):
-                        logi(f"[DEBUG]   Item {item_idx}: slot={item.get('slot')}, count={item.get('count')}, medi_id={item.get('medi_id')}")
-                logi(f"[DEBUG] ================================")
-
-                # ===== 5) 현재 시간대에 맞게 필터링 =====
-                logi(f"[DEBUG] 필터링 전 current_slot 재확인: {current_slot}")
-
-                # ✅ 안전장치: current_slot이 None이면 빈 리스트 반환
-                if current_slot is None:
-                    loge(f"[ERR] current_slot이 None입니다! 필터링을 건너뛰고 빈 큐로 처리합니다.")
-                    filtered_phases = []
-                else:
-                    filtered_phases = filter_phases_by_time(phases, current_slot)
-
-                logi(f"[FILTER] 전체={len(phases)}, 필터링 후={len(filtered_phases)}, 시간대={current_slot}")
-
-                # ===== DEBUG: 필터링 후 큐 출력 =====
-                logi(f"[DEBUG] ===== 필터링 후 큐 =====")
-                for idx, phase in enumerate(filtered_phases):
-                    time_key = phase.get("time", "unknown")
-                    items = phase.get("items", [])
-                    logi(f"[DEBUG] Filtered Phase {idx}: time={time_key}, items_count={len(items)}")
-                    for item_idx, item in enumerate(items):
-                        logi(f"[DEBUG]   Item {item_idx}: slot={item.get('slot')}, count={item.get('count')}, medi_id={item.get('medi_id')}")
-                logi(f"[DEBUG] ================================")
-
-                # ===== 6) 필터링 후 비어있는지 확인 =====
-                if not filtered_phases or all(not p.get("items") for p in filtered_phases):
-                    logi(f"[INFO] 현재 시간대({current_slot})에 배출할 약이 없음")
-                    write_state(status="no_schedule", last_uid=uid)
-
-                    # 원래 phases에는 있었는지 확인
-                    has_any_schedule = any(p.get("items") for p in phases)
-
-                    if has_any_schedule:
-                        # 스케줄은 있지만 현재 시간대가 지나서 배출할 수 없음
-                        msg = f"현재 시간대({current_slot})에 배출할 약이 없습니다"
-                        logi(f"[INFO] {msg}")
-                    else:
-                        # 아예 스케줄이 없음
-                        msg = "오늘 배출할 스케줄이 없습니다"
-                        logi(f"[INFO] {msg}")
-
-                    if adapter:
-                        adapter.notify_status_update(3, msg)
-
-                    time.sleep(3)
-                    _session_user_id = _active_kit_uid = None
-                    if adapter:
-                        adapter.notify_waiting()
-                    continue
-
-                # ★★★ process_queue 호출 (시간대별 회전판 이동 + 배출) ★★★
-                # 필터링된 시간대 목록
-                filtered_times = [p.get("time") for p in filtered_phases if p.get("items")]
-                filtered_times_korean = [_time_key_to_korean(t) for t in filtered_times]
-                first_phase = filtered_phases[0].get("time") if filtered_phases else "morning"
-
-                write_state(status="queue_ready", last_uid=uid, phase=first_phase)
-                logi(f"[QUEUE] 배출 시작: {user_name}님 - {filtered_times}")
-                if adapter:
-                    adapter.notify_status_update(3, f"{user_name}님 약 배출 시작... ({', '.join(filtered_times_korean)})")
-
-                progress = {}  # 예외 발생 시에도 안전하도록 초기화
-                all_success, progress = process_queue(machine_id, user_id, filtered_phases, ser, adapter)
-
-                if all_success:
-                    logi("[OK] Dispense completed successfully")
-                    write_state(status="done", last_uid=uid, progress=progress)
-                    if adapter:
-                        adapter.notify_status_update(3, "배출 완료!")
-                else:
-                    loge("[WARN] Dispense completed with errors")
-                    write_state(status="error", last_uid=uid, progress=progress, error="일부 배출 실패")
-                    if adapter:
-                        adapter.notify_status_update(3, "배출 완료 (일부 오류)")
-
-                time.sleep(3)
-                _session_user_id = _active_kit_uid = None
-                write_state(status="waiting_uid")
-                if adapter: adapter.notify_waiting()
+                trace = entry.trace
+                try:
+                    if not entry.is_ready():
+                        write_state(status="resolving_uid", last_uid=entry.uid)
+                        if adapter:
+                            adapter.notify_uid(entry.uid)
+                            adapter.notify_status_update(3, "카드 확인 중...")
+                    plan = entry.plan(tag_queue.prepare, tag_queue.max_age)
+                    prepared_at = entry.prepared_at or 0.0
+                    if any(served_at.get(u, 0.0) > prepared_at for u in {plan.user_id, *plan.members}):
+                        # 준비 이후 다른 세션(가족 세션 등)에서 배출된 사용자 → 미리 받은 큐는 낡음, 다시 조회
+                        plan = tag_queue.prepare(entry.uid, trace)
+                    if plan.outcome == "ready" and adapter:
+                        adapter.notify_uid(entry.uid)
+                        adapter.notify_status_update(3, f"{plan.user_name}님 확인됨")
+                    if last_session_end is not None and entry.queued_at < last_session_end:
+                        # 이전 세션 중에 찍힌 태그 → 회전판이 놀았던 시간
+                        metrics.observe("tdb_session_gap_seconds", time.monotonic() - last_session_end)
+                    with arbiter.session():
+                        result = run_session(machine_id, plan, ser, adapter, trace)
+                    if result in ("completed", "partial"):
+                        last_session_end = time.monotonic()
+                        for u in {plan.user_id, *plan.members}:
+                            served_at[u] = last_session_end
+                finally:
+                    tag_queue.finish()
 
             except Exception as e:
                 loge(f"[FATAL] unhandled exception in main loop: {e}")
+                trace.finish("exception", error=str(e))
                 write_state(status="error", error=str(e))
                 if adapter:
                     adapter.notify_waiting()
                     adapter.notify_error(f"오류: {e}")
                 _session_user_id = _active_kit_uid = None
+                try:
+                    # 세션 도중 예외 → 아두이노는 단계를 기억하므로 펌웨어 HOME
+                    with arbiter.session("recovery"):
+                        recover_interrupted(ser, adapter, after_reset=False)
+                except Exception as rec_err:
+                    loge(f"[ERR] session recovery failed: {rec_err}")
                 time.sleep(5)
                 continue
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
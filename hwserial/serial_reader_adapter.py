@@ -1,8 +1,9 @@
 import threading
 from .serial_reader import main as serial_main
+from .state_bus import bus as state_bus
 
 class SerialReaderAdapter:
-    def __init__(self, on_waiting=None, on_uid=None, on_error=None, on_unregistered=None, on_kit_unregistered=None, on_status_update=None, on_user_list_update=None, on_slot_list_update=None, on_schedule_list_update=None, on_history_list_update=None):
+    def __init__(self, on_waiting=None, on_uid=None, on_error=None, on_unregistered=None, on_kit_unregistered=None, on_status_update=None, on_user_list_update=None, on_slot_list_update=None, on_schedule_list_update=None, on_history_list_update=None, on_state_change=None, on_event=None, startup=None):
         self.on_waiting = on_waiting
         self.on_uid = on_uid
         self.on_error = on_error
@@ -13,7 +14,11 @@ class SerialReaderAdapter:
         self.on_slot_list_update = on_slot_list_update
         self.on_schedule_list_update = on_schedule_list_update
         self.on_history_list_update = on_history_list_update
-        
+        self.on_state_change = on_state_change
+        self.on_event = on_event
+        self.startup = startup  # services.startup.Startup (등록 확인/시리얼 열기 선행 작업)
+        self._unsubscribe_state = None
+
         self._thread = None
         self._stop_event = threading.Event()
         self._ready_event = threading.Event()
@@ -56,9 +61,18 @@ class SerialReaderAdapter:
         if self.on_history_list_update:
             self.on_history_list_update(history)
 
+    def notify_state_change(self, state):
+        if self.on_state_change:
+            self.on_state_change(state)
+
+    def notify_event(self, event):
+        """타입 배출 이벤트 (hwserial/events.py)"""
+        if self.on_event:
+            self.on_event(event)
+
     def _run_serial_main(self):
         try:
-            serial_main(self)
+            serial_main(self, startup=self.startup)
         except Exception as e:
             print(f"[FATAL] 시리얼 리더 스레드 오류: {e}")
             self.notify_error(f"시리얼 스레드 오류: {e}")
@@ -66,6 +80,9 @@ class SerialReaderAdapter:
             self._ready_event.set()
 
     def start(self):
+        # ✅ 상태 버스 직접 구독 (state.json 파일 경유 없음)
+        if self._unsubscribe_state is None:
+            self._unsubscribe_state = state_bus.subscribe(self.notify_state_change)
         if self._thread is None:
             self._thread = threading.Thread(target=self._run_serial_main)
             self._thread.daemon = True
@@ -77,5 +94,8 @@ class SerialReaderAdapter:
     def stop(self):
         print("Adapter stopping...")
         self._stop_event.set()
+        if self._unsubscribe_state:
+            self._unsubscribe_state()
+            self._unsubscribe_state = None
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout=2)
\ No newline at end of file
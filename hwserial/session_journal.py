@@ -0,0 +1,194 @@
+# hwserial/session_journal.py
+"""
+배출 세션 선기록(write-ahead) 저널 → 프로세스가 세션 도중 죽어도 재시작 시 자동 복구
+
+- begin(): 세션 계획(시간대별 아이템) 기록 — 이동/배출 전에
+- moving()/moved(): 회전판 이동 전후 (마지막으로 확인된 단계)
+- pills()/item(): 실제로 나온 개수 (진행 줄마다 + 아이템 끝)
+- report_sending(): 시간대 보고 전송 직전 (응답 전에 죽으면 서버 반영 여부 모름)
+- reported(): 시간대 보고를 서버/오프라인 적치로 넘김
+- end(): 정상 종료 → 파일 삭제
+기록마다 flush + fsync (워치독 sys.exit / 시리얼 예외 / 정전에도 마지막 줄까지 남음)
+
+재시작 시 pending() → Interrupted:
+- stage: 회전판 추정 단계 (시리얼을 다시 열면 아두이노가 리셋돼 펌웨어는 단계를 잊음)
+- reports(): 보고 안 된 시간대를 실제 나온 개수로 만든 보고 payload (다시 배출하지 않음)
+  보고마다 report_id(세션+시간대+사용자) — 서버가 이 키로 중복을 걸러낼 때만 재전송이 안전
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+JOURNAL_PATH = Path("data/session_journal.jsonl")
+
+_lock = threading.Lock()
+_fh = None
+
+
+def _write(record: dict):
+    global _fh
+    record["ts"] = round(time.time(), 3)
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+    with _lock:
+        try:
+            if _fh is None:
+                JOURNAL_PATH.parent.mkdir(parents=True, exist_ok=True)
+                _fh = JOURNAL_PATH.open("a", encoding="utf-8")
+            _fh.write(line)
+            _fh.flush()
+            os.fsync(_fh.fileno())
+        except OSError as e:
+            print(f"[JOURNAL] write failed: {e}")
+
+
+def begin(session_id: str, machine_id: str, user_id, phases: list, stage: int = 0):
+    """세션 시작 (이전 기록은 지움). phases: validate 이후 아이템 (short 표시 포함)"""
+    global _fh
+    with _lock:
+        if _fh is not None:
+            _fh.close()
+            _fh = None
+        try:
+            JOURNAL_PATH.unlink(missing_ok=True)
+        except OSError:
+            pass
+    plan = [{"time": p.get("time"),
+             "items": [{"slot": int(it.get("slot", 1)), "count": int(it.get("count", 1)),
+                        "medi_id": it.get("medi_id"), "user_id": str(it.get("user_id", user_id)),
+                        "short": bool(it.get("short"))}
+                       for it in p.get("items") or []]}
+            for p in phases]
+    _write({"ev": "begin", "session_id": session_id, "machine_id": machine_id,
+            "user_id": str(user_id), "stage": int(stage), "phases": plan})
+
+
+def moving(to_stage: int):
+    _write({"ev": "move", "to": int(to_stage)})
+
+
+def moved(stage: int):
+    """이동 성공 (실패하면 기록하지 않음 → 목표 단계로 추정)"""
+    _write({"ev": "moved", "stage": int(stage)})
+
+
+def pills(phase: str, index: int, done: int):
+    """아이템 index 에서 지금까지 나온 개수 (진행 줄 기준)"""
+    _write({"ev": "pills", "phase": phase, "item": int(index), "done": int(done)})
+
+
+def item(phase: str, index: int, done: int, ok: bool):
+    _write({"ev": "item", "phase": phase, "item": int(index), "done": int(done), "ok": bool(ok)})
+
+
+def report_id(session_id: str, phase: str, user_id) -> str:
+    """보고 멱등 키 (같은 세션의 같은 시간대/사용자 보고는 몇 번 보내도 같은 값)"""
+    return f"{session_id}:{phase}:{user_id}"
+
+
+def report_sending(phase: str, user_id):
+    """보고 전송 직전 (reported 없이 끝나면 서버에 들어갔을 수도 있음)"""
+    _write({"ev": "report_sending", "phase": phase, "user_id": str(user_id)})
+
+
+def reported(phase: str, user_id, result: str):
+    """보고를 서버 또는 오프라인 적치로 넘김 (복구 시 다시 보고하지 않음)"""
+    _write({"ev": "report", "phase": phase, "user_id": str(user_id), "result": result})
+
+
+def end():
+    """정상 종료 → 저널 삭제"""
+    global _fh
+    with _lock:
+        if _fh is not None:
+            _fh.close()
+            _fh = None
+        try:
+            JOURNAL_PATH.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"[JOURNAL] remove failed: {e}")
+
+
+@dataclass
+class Interrupted:
+    session_id: str
+    machine_id: str
+    user_id: str
+    phases: list
+    stage: int = 0                                  # 회전판 추정 단계 (0 HOME / 1 점심 / 2 저녁)
+    done: dict = field(default_factory=dict)        # (phase, index) -> 나온 개수
+    reported: set = field(default_factory=set)      # {(phase, user_id)}
+    sending: set = field(default_factory=set)       # 전송 시작 후 결과 기록 전 {(phase, user_id)}
+
+    def dispensed_total(self) -> int:
+        return sum(self.done.values())
+
+    def reports(self) -> list:
+        """
+        보고 안 된 (시간대, 사용자)별 보고 payload (process_queue 보고와 같은 형식)
+        items: 실제 나온 개수만 / 하나도 안 나온 사용자는 보고하지 않음 (다시 태그하면 정상 배출)
+        maybe_sent: 전송 중 죽은 보고 (서버에 이미 들어갔을 수 있음, 재전송 여부는 호출 측이 결정)
+        """
+        out = []
+        for phase in self.phases:
+            time_key = phase.get("time")
+            by_user = {}
+            for idx, it in enumerate(phase.get("items") or []):
+                by_user.setdefault(it.get("user_id") or self.user_id, []).append((idx, it))
+            for user, entries in by_user.items():
+                if (time_key, user) in self.reported:
+                    continue
+                items, consumed, complete = [], [], True
+                for idx, it in entries:
+                    got = self.done.get((time_key, idx), 0)
+                    if got < it["count"]:
+                        complete = False
+                    if got > 0:
+                        consumed.append((it["slot"], got))
+                        if it.get("medi_id"):
+                            items.append({"medi_id": it["medi_id"], "slot": it["slot"], "count": got})
+                if not consumed:
+                    continue
+                out.append({"machine_id": self.machine_id, "user_id": user, "time": time_key,
+                            "items": items, "result": "completed" if complete else "partial",
+                            "consumed": consumed,
+                            "report_id": report_id(self.session_id, time_key, user),
+                            "maybe_sent": (time_key, user) in self.sending})
+        return out
+
+
+def pending() -> Optional[Interrupted]:
+    """끝나지 않은 세션 기록 재생 (없으면 None). 마지막 줄이 잘렸으면 그 줄만 무시"""
+    try:
+        lines = JOURNAL_PATH.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    state = None
+    for line in lines:
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        ev = rec.get("ev")
+        if ev == "begin":
+            state = Interrupted(rec.get("session_id", ""), rec.get("machine_id", ""),
+                                str(rec.get("user_id")), rec.get("phases") or [], int(rec.get("stage") or 0))
+        elif state is None:
+            continue
+        elif ev == "move":
+            # 이동 중 죽었으면 도착했다고 봄 (재시작까지 걸리는 시간 > 한 칸 이동 시간, 아두이노는 끝까지 동작)
+            state.stage = int(rec["to"])
+        elif ev == "moved":
+            state.stage = int(rec["stage"])
+        elif ev in ("pills", "item"):
+            key = (rec.get("phase"), int(rec["item"]))
+            state.done[key] = max(state.done.get(key, 0), int(rec["done"]))
+        elif ev == "report_sending":
+            state.sending.add((rec.get("phase"), str(rec.get("user_id"))))
+        elif ev == "report":
+            state.reported.add((rec.get("phase"), str(rec.get("user_id"))))
+            state.sending.discard((rec.get("phase"), str(rec.get("user_id"))))
+    return state
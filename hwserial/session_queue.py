@@ -0,0 +1,129 @@
+# hwserial/session_queue.py
+"""
+배출 세션 대기열 (세션 진행 중 찍힌 태그 보관)
+
+- offer(uid): 대기열에 추가 (최대 TAG_QUEUE_MAX, 진행 중/대기 중인 같은 UID는 무시)
+  → 추가 즉시 워커 스레드에서 prepare(uid) 시작 (UID 해석/사용자 조회/큐 생성)
+    회전판이 움직이는 동안 다음 사용자 준비를 끝내 둠
+- pop(): 다음 항목 (없으면 None). 준비 결과는 entry.plan() 으로 받음 (아직이면 완료까지 대기)
+- 준비 결과가 max_age 보다 오래되면 다시 준비 (시간대/스케줄 변경 반영)
+- 세션 진행 중 GUI에는 waiting_names() 로 대기 인원/다음 사용자 표시
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from services import metrics
+
+metrics.describe("tdb_tag_queue_wait_seconds", "histogram", "Time a tag waited in the session queue before its session started")
+metrics.describe("tdb_tag_queue_rejected_total", "counter", "Tags not queued, by reason (duplicate, full)")
+
+
+class QueuedTag:
+    def __init__(self, uid: str, trace, queued_at: float):
+        self.uid = uid
+        self.trace = trace
+        self.queued_at = queued_at
+        self._future = None
+        self._prepared = None           # prefetch 결과 (완료 전 None)
+        self._prepared_at = None
+
+    @property
+    def user_name(self):
+        """준비가 끝났으면 사용자 이름 (아니면 None)"""
+        return getattr(self._prepared, "user_name", None)
+
+    @property
+    def prepared_at(self):
+        """prefetch 완료 시각 (monotonic, 완료 전 None)"""
+        return self._prepared_at
+
+    def is_ready(self) -> bool:
+        return self._future is not None and self._future.done()
+
+    def plan(self, prepare, max_age: float):
+        """준비 결과 (prefetch가 max_age보다 오래됐거나 실패했으면 지금 다시 준비)"""
+        try:
+            plan = self._future.result()
+        except Exception:
+            return prepare(self.uid, self.trace)
+        if self._prepared_at is not None and time.monotonic() - self._prepared_at > max_age:
+            return prepare(self.uid, self.trace)
+        return plan
+
+
+class TagQueue:
+    def __init__(self, prepare, maxsize: int = 5, max_age: float = 60.0, on_change=None):
+        self.prepare = prepare            # prepare(uid, trace) → 세션 계획 (네트워크 조회만, 시리얼 사용 금지)
+        self.maxsize = max(1, int(maxsize))
+        self.max_age = max_age
+        self.on_change = on_change        # on_change(names: tuple) — 대기열 변경/이름 확인 시
+        self._lock = threading.Lock()
+        self._notify_lock = threading.Lock()   # 통지 순서 보장 (마지막 통지 = 최신 상태)
+        self._items = deque()
+        self._active_uid = None
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tag-prefetch")
+        metrics.register_callback("tdb_tag_queue_depth", self.__len__, "gauge",
+                                  "Tags waiting for the carousel")
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def offer(self, uid: str, trace) -> bool:
+        """태그 추가 (이미 진행/대기 중이거나 가득 차면 False)"""
+        with self._lock:
+            if uid == self._active_uid or any(e.uid == uid for e in self._items):
+                reason = "duplicate"
+            elif len(self._items) >= self.maxsize:
+                reason = "full"
+            else:
+                reason = None
+                entry = QueuedTag(uid, trace, time.monotonic())
+                entry._future = self._pool.submit(self._prefetch, entry)
+                self._items.append(entry)
+        if reason:
+            metrics.inc("tdb_tag_queue_rejected_total", reason=reason)
+            return False
+        self._changed()
+        return True
+
+    def _prefetch(self, entry: QueuedTag):
+        with entry.trace.span("prefetch"):
+            plan = self.prepare(entry.uid, entry.trace)
+        entry._prepared, entry._prepared_at = plan, time.monotonic()
+        self._changed()  # 이름 확인됨 → 대기 표시 갱신
+        return plan
+
+    def pop(self):
+        """다음 태그 꺼내기 (꺼낸 UID는 finish() 전까지 진행 중으로 취급)"""
+        with self._lock:
+            if not self._items:
+                return None
+            entry = self._items.popleft()
+            self._active_uid = entry.uid
+        now = time.monotonic()
+        entry.trace.add("queue_wait", entry.queued_at, now)
+        metrics.observe("tdb_tag_queue_wait_seconds", now - entry.queued_at)
+        self._changed()
+        return entry
+
+    def finish(self):
+        with self._lock:
+            self._active_uid = None
+
+    def waiting_names(self) -> tuple:
+        """대기 중인 사용자 표시명 (이름 확인 전이면 '확인 중')"""
+        with self._lock:
+            items = list(self._items)
+        return tuple(e.user_name or "확인 중" for e in items)
+
+    def _changed(self):
+        if not self.on_change:
+            return
+        with self._notify_lock:
+            try:
+                self.on_change(self.waiting_names())
+            except Exception as e:
+                print(f"[TAG_QUEUE] on_change failed: {e}")
@@ -0,0 +1,197 @@
+# hwserial/state_bus.py
+"""
+기기 상태 publish/subscribe 버스 (state.json 파일 핸드오프 대체)
+
+- 프로세스 내부 구독자(어댑터 콜백, DashboardApp 등): subscribe()로 직접 통지
+- 외부 프로세스(gui/qr_display.py): UNIX 소켓으로 변경 시에만 JSON 한 줄 push
+- 디스크 스냅샷(data/state.json): 최신 상태만, STATE_SNAPSHOT_MIN_SEC 간격으로 합쳐서 기록
+"""
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+
+STATE_PATH = Path("data/state.json")
+
+
+@dataclass(frozen=True)
+class DeviceState:
+    status: str = "waiting_uid"
+    last_uid: Optional[str] = None
+    phase: Optional[str] = None
+    progress: dict = field(default_factory=dict)
+    error: Optional[str] = None
+    ts: float = 0.0
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "DeviceState":
+        return cls(
+            status=d.get("status", "waiting_uid"),
+            last_uid=d.get("last_uid"),
+            phase=d.get("phase"),
+            progress=d.get("progress") or {},
+            error=d.get("error"),
+            ts=d.get("ts") or 0.0,
+        )
+
+
+class StateBus:
+    def __init__(self, snapshot_path: Path = STATE_PATH, socket_path: str = None,
+                 min_interval: float = 1.0):
+        self._snapshot_path = Path(snapshot_path)
+        self._socket_path = socket_path
+        self._min_interval = min_interval
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._state = DeviceState()
+        self._version = 0
+        self._written_version = 0
+        self._subscribers = []
+        self._clients = []
+        self._started = False
+
+    # --- 프로세스 내부 API ---
+    def subscribe(self, fn):
+        """fn(state: DeviceState) 등록, 해제 함수 반환 (호출은 publish한 스레드에서 수행)"""
+        with self._lock:
+            self._subscribers.append(fn)
+
+        def _unsubscribe():
+            with self._lock:
+                if fn in self._subscribers:
+                    self._subscribers.remove(fn)
+        return _unsubscribe
+
+    def snapshot(self) -> DeviceState:
+        with self._lock:
+            return self._state
+
+    def publish(self, state: DeviceState):
+        self._ensure_started()
+        with self._cond:
+            self._state = state
+            self._version += 1
+            subscribers = list(self._subscribers)
+            self._cond.notify_all()
+        for fn in subscribers:
+            try:
+                fn(state)
+            except Exception as e:
+                print(f"[STATE_BUS] subscriber error: {e}")
+
+    # --- 백그라운드 스레드 ---
+    def _ensure_started(self):
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._snapshot_loop, daemon=True).start()
+        if self._socket_path and hasattr(socket, "AF_UNIX"):
+            threading.Thread(target=self._socket_accept_loop, daemon=True).start()
+            threading.Thread(target=self._socket_push_loop, daemon=True).start()
+        atexit.register(self.flush)
+
+    def _snapshot_loop(self):
+        """변경이 있을 때만, 최소 간격을 두고 최신 상태 1건만 디스크에 기록"""
+        while True:
+            with self._cond:
+                while self._version == self._written_version:
+                    self._cond.wait()
+            self.flush()
+            time.sleep(self._min_interval)
+
+    def flush(self):
+        with self._lock:
+            if self._version == self._written_version:
+                return
+            state, version = self._state, self._version
+        try:
+            self._snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._snapshot_path.with_suffix(".json.tmp")
+            tmp.write_text(state.to_json(), encoding="utf-8")
+            tmp.replace(self._snapshot_path)
+            with self._lock:
+                self._written_version = max(self._written_version, version)
+        except OSError as e:
+            print(f"[STATE_BUS] snapshot write failed: {e}")
+
+    def _socket_accept_loop(self):
+        path = self._socket_path
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            if os.path.exists(path):
+                os.unlink(path)  # 이전 프로세스가 남긴 소켓 파일
+            srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            srv.bind(path)
+            srv.listen(4)
+        except OSError as e:
+            print(f"[STATE_BUS] socket listen failed ({path}): {e}")
+            return
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                continue
+            conn.settimeout(1.0)  # 읽지 않는 클라이언트가 push 스레드를 막지 않도록
+            # 새 클라이언트는 "받은 버전 0"으로 등록 → push 스레드가 현재 상태 1회 전송
+            with self._cond:
+                self._clients.append([conn, 0])
+                self._cond.notify_all()
+
+    def _socket_push_loop(self):
+        """클라이언트별로 마지막 전송 이후 바뀐 경우에만 최신 상태 push (중간 상태는 합쳐짐)"""
+        while True:
+            with self._cond:
+                while not any(c[1] != self._version for c in self._clients):
+                    self._cond.wait()
+                state, version = self._state, self._version
+                pending = [c for c in self._clients if c[1] != version]
+            dead = []
+            for client in pending:
+                if self._send(client[0], state):
+                    client[1] = version
+                else:
+                    dead.append(client)
+            if dead:
+                with self._lock:
+                    self._clients = [c for c in self._clients if c not in dead]
+
+    @staticmethod
+    def _send(conn, state: DeviceState) -> bool:
+        try:
+            conn.sendall((state.to_json() + "\n").encode("utf-8"))
+            return True
+        except OSError:
+            try:
+                conn.close()
+            except OSError:
+                pass
+            return False
+
+
+bus = StateBus(
+    snapshot_path=STATE_PATH,
+    socket_path=settings.project_path(settings.STATE_SOCKET_PATH),
+    min_interval=settings.STATE_SNAPSHOT_MIN_SEC,
+)
+
+
+def read_snapshot(path: Path = STATE_PATH) -> DeviceState:
+    """디스크 스냅샷 읽기 (소켓을 쓸 수 없는 외부 도구용)"""
+    try:
+        return DeviceState.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+    except Exception:
+        return DeviceState()
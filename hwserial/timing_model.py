@@ -0,0 +1,168 @@
+# hwserial/timing_model.py
+"""
+아두이노 명령 소요 시간 학습 → 적응형 타임아웃
+
+- observe(): 성공한 명령의 실제 소요 시간 기록 (기기 × 명령 × 슬롯별)
+  DISPENSE는 개수로 나눈 1개당 시간으로 기록
+  STEP,NEXT / HOME 은 슬롯 자리에 출발 단계 (HOME은 단계 0이면 즉시, 2면 4.5초 → 한 키로 섞지 않음)
+- 통계: EWMA(평균/편차) + 최근 WINDOW개 표본 분위수 (p95/p99)
+- deadline(): max(p99 × 여유배수, EWMA + 4×편차) 를 [하한, 기존 고정값 × 상한배수] 로 제한
+  표본이 TIMING_MIN_SAMPLES 미만이면 기존 고정 타임아웃 그대로
+- 타임아웃이 한 번 나면 그 키의 다음 명령(재시도)은 상한값으로 → 느려진 기구도 한 번은 끝까지 기다림
+- data/timing_model.json 에 저장 (SAVE_MIN_SEC 간격으로 합쳐서 기록, 종료 시 1회)
+"""
+import atexit
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from config import settings
+from services import metrics
+
+MODEL_PATH = Path("data/timing_model.json")
+WINDOW = 200          # 분위수 계산용 최근 표본 수
+ALPHA = 0.1           # EWMA 가중치
+SAVE_MIN_SEC = 30
+
+_lock = threading.Lock()
+_stats = {}           # "기기|명령|슬롯" -> _Stats
+_loaded = False
+_dirty = False
+_last_save = 0.0
+_after_timeout = set()   # 직전 명령이 타임아웃 난 키 (다음 1회는 상한값)
+
+
+class _Stats:
+    __slots__ = ("n", "ewma", "dev", "samples")
+
+    def __init__(self, n=0, ewma=0.0, dev=0.0, samples=()):
+        self.n = n
+        self.ewma = ewma
+        self.dev = dev
+        self.samples = deque(samples, maxlen=WINDOW)
+
+    def add(self, x: float):
+        if self.n == 0:
+            self.ewma, self.dev = x, x / 4
+        else:
+            diff = x - self.ewma
+            self.ewma += ALPHA * diff
+            self.dev += ALPHA * (abs(diff) - self.dev)
+        self.n += 1
+        self.samples.append(x)
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def to_json(self):
+        return {"n": self.n, "ewma": round(self.ewma, 4), "dev": round(self.dev, 4),
+                "samples": [round(x, 4) for x in self.samples]}
+
+
+def _key(command: str, slot=None) -> str:
+    return f"{settings.MACHINE_ID}|{command}|{'' if slot is None else int(slot)}"
+
+
+def _ensure_loaded():
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        data = json.loads(MODEL_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        data = {}
+    for key, s in (data.get("stats") or {}).items():
+        try:
+            _stats[key] = _Stats(int(s["n"]), float(s["ewma"]), float(s["dev"]), map(float, s["samples"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    atexit.register(flush)
+    metrics.register_callback("tdb_serial_deadline_seconds", _deadline_gauge, "gauge",
+                              "Learned per-unit command deadline by command and slot")
+
+
+def observe(command: str, seconds: float, slot=None, count: int = 1, ok: bool = True, timed_out: bool = False):
+    """명령 결과 기록 (성공만 표본으로, 타임아웃은 다음 1회 상한값 표시)"""
+    global _dirty
+    key = _key(command, slot)
+    with _lock:
+        _ensure_loaded()
+        if timed_out:
+            _after_timeout.add(key)
+            return
+        _after_timeout.discard(key)
+        if not ok:
+            return
+        _stats.setdefault(key, _Stats()).add(seconds / max(1, int(count)))
+        _dirty = True
+    _maybe_save()
+
+
+def _unit_deadline(s: _Stats) -> float:
+    return max(s.quantile(0.99) * settings.TIMING_MARGIN, s.ewma + 4 * s.dev)
+
+
+def deadline(command: str, default: float, slot=None, count: int = 1) -> float:
+    """
+    학습된 타임아웃 (초). default는 기존 고정 타임아웃 (학습 전 값 + 상한 기준)
+    """
+    if not settings.TIMING_ADAPTIVE:
+        return default
+    key = _key(command, slot)
+    ceiling = default * settings.TIMING_MAX_FACTOR
+    with _lock:
+        _ensure_loaded()
+        if key in _after_timeout:
+            return ceiling
+        s = _stats.get(key)
+        if s is None or s.n < settings.TIMING_MIN_SAMPLES:
+            return default
+        value = _unit_deadline(s) * max(1, int(count))
+    return min(ceiling, max(settings.TIMING_FLOOR_SEC, value))
+
+
+def snapshot() -> dict:
+    """키별 요약 (진단/스크립트용)"""
+    with _lock:
+        _ensure_loaded()
+        return {k: {"n": s.n, "ewma": round(s.ewma, 3), "p95": round(s.quantile(0.95), 3),
+                    "p99": round(s.quantile(0.99), 3), "deadline": round(_unit_deadline(s), 3)}
+                for k, s in _stats.items() if s.samples}
+
+
+def _deadline_gauge():
+    with _lock:
+        out = {}
+        for key, s in _stats.items():
+            machine, command, slot = key.split("|", 2)
+            if machine == settings.MACHINE_ID and s.n >= settings.TIMING_MIN_SAMPLES:
+                out[(("command", command), ("slot", slot or "-"))] = _unit_deadline(s)
+        return out
+
+
+def _maybe_save():
+    if time.monotonic() - _last_save >= SAVE_MIN_SEC:
+        flush()
+
+
+def flush(path: Path = None):
+    global _dirty, _last_save
+    path = path or MODEL_PATH
+    with _lock:
+        if not _dirty:
+            return
+        payload = json.dumps({"saved_at": int(time.time()),
+                              "stats": {k: s.to_json() for k, s in _stats.items()}},
+                             separators=(",", ":"))
+        _dirty, _last_save = False, time.monotonic()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        tmp.replace(path)
+    except OSError as e:
+        print(f"[TIMING] model write failed: {e}")
@@ -3,33 +3,101 @@ import threading
 import time
 from datetime import datetime, timedelta
 from gui.gui_app import DashboardApp
+from gui import view_models
+from hwserial import events, inventory
 from hwserial.serial_reader_adapter import SerialReaderAdapter
 from config import settings
+from services import metrics, warm_start
+from services import startup as startup_profile
+from services.startup import Startup
+from hwserial.arduino_link import open_serial
 from services.api_client import (
     get_users_for_machine,
     get_slots_for_machine,
     get_today_schedules_for_machine,
     get_dose_history_for_machine,
+    prewarm,
+    start_keepalive,
 )
 
-# ✅ 배출 상태 관리 클래스 (폴링 일시정지용)
+# ✅ 배출 상태 관리 클래스 (폴링 일시정지용, 타입 이벤트로 갱신)
 class DispenseState:
-    is_dispensing = False
+    # 세션 중에도 계속 조회해도 되는 데이터 (재고는 배출로 바뀌는 중이므로 제외)
+    NON_CONFLICTING = ("users", "schedules", "history")
+
+    in_session = False
+    in_motion = False
     lock = threading.Lock()
 
     @classmethod
-    def set_dispensing(cls, state: bool):
+    def apply(cls, event):
+        with cls.lock:
+            if isinstance(event, events.SessionStarted):
+                cls.in_session = True
+            elif isinstance(event, events.MOTION_START):
+                cls.in_motion = True
+            elif isinstance(event, events.MOTION_END):
+                cls.in_motion = False
+            elif isinstance(event, events.SessionEnded):
+                cls.in_session = cls.in_motion = False
+
+    @classmethod
+    def reset(cls):
         with cls.lock:
-            cls.is_dispensing = state
+            cls.in_session = cls.in_motion = False
 
     @classmethod
     def get_dispensing(cls):
         with cls.lock:
-            return cls.is_dispensing
+            return cls.in_session or cls.in_motion
+
+    @classmethod
+    def can_fetch(cls, kind=None):
+        """
+        kind 조회 허용 여부 (kind=None이면 '무엇이든 조회 가능한가')
+        - 모터 이동/복귀 중: 전부 중지
+        - 세션 중(이동 외): POLL_DURING_DISPENSE=1 이면 충돌 없는 조회만 허용
+        """
+        with cls.lock:
+            if cls.in_motion:
+                return False
+            if not cls.in_session:
+                return True
+            if not settings.POLL_DURING_DISPENSE:
+                return False
+            return kind is None or kind in cls.NON_CONFLICTING
 
 def main():
+    # ✅ --profile-startup: -X importtime 으로 자기 자신을 다시 실행해 import/부팅 시간 기록
+    if '--profile-startup' in sys.argv:
+        sys.exit(startup_profile.run_profiled([a for a in sys.argv if a != '--profile-startup']))
+    profile_out = startup_profile.profiling_output()
+
     is_demo_mode = '--demo' in sys.argv
-    app = DashboardApp(fullscreen=not is_demo_mode)
+
+    # ✅ 등록 확인 + 시리얼 열기를 먼저 백그라운드로 시작 → GUI 생성과 겹쳐서 진행
+    startup = Startup(settings.MACHINE_ID)
+    startup.begin(None if is_demo_mode else (lambda: open_serial(baud_rate=9600)))
+
+    # ✅ 웜 스타트: 네트워크 호출 전에 마지막 정상 데이터로 첫 화면 구성 (stale 표시)
+    warm = warm_start.load() if settings.WARM_START_ENABLED else {}
+    if warm:
+        print(f"[WARM_START] 이전 데이터 로드 (캐러셀 위치: stage {warm.get('carousel_stage', '?')})")
+    with startup.phase("gui_build"):
+        app = DashboardApp(fullscreen=not is_demo_mode, warm_start=warm)
+    app.after_idle(lambda: startup.mark("first_frame"))
+
+    if profile_out:
+        # 프로파일 자식: 준비 완료(또는 타임아웃) 후 결과 기록하고 종료
+        t_profile = time.monotonic()
+
+        def _finish_profile():
+            if startup.is_ready() or time.monotonic() - t_profile > startup_profile.PROFILE_TIMEOUT_SEC:
+                startup_profile.write_profile(startup, profile_out)
+                app.quit()
+            else:
+                app.after(200, _finish_profile)
+        app.after(200, _finish_profile)
 
     app.update_tile_content(3, "시스템 초기화 중...")
 
@@ -40,6 +108,7 @@ def main():
                     message="앱에서 이 QR 코드를 스캔하여 기기를 등록하세요.")
 
     def on_waiting():
+        prewarm()  # ✅ 다음 태그 대비 HTTP 연결 미리 열어두기
         app.ui_call(app.hide_popup)  # 팝업 숨기기
         app.ui_call(app.update_tile_content, 3, "RFID 대기 중...")
 
@@ -58,82 +127,97 @@ def main():
         app.ui_call(app.update_tile_content, 3, "미등록 카드")
 
     def on_status_update(tile_index, message):
-        # ✅ 배출 상태 감지 (이동/배출/복귀 중 → 폴링 일시정지)
-        dispensing_keywords = ["이동 중", "배출 중", "복귀 중", "위치로", "배출 시작"]
-        done_keywords = ["완료", "대기 중", "RFID"]
+        app.ui_call(app.update_tile_content, tile_index, message)
 
-        if any(keyword in message for keyword in dispensing_keywords):
-            DispenseState.set_dispensing(True)
-        elif any(keyword in message for keyword in done_keywords):
-            DispenseState.set_dispensing(False)
+    def on_state_change(state):
+        # ✅ 안전장치: 대기 상태로 돌아오면 세션 이벤트 누락과 무관하게 폴링 재개
+        if state.status == "waiting_uid":
+            DispenseState.reset()
 
-        app.ui_call(app.update_tile_content, tile_index, message)
+    move_target = {"stage": None}
+
+    def on_event(event):
+        # ✅ 타입 이벤트: 이동 구간 정확히 추적 + 상태 타일 갱신
+        DispenseState.apply(event)
+        app.ui_call(app.on_dispense_event, event)
+        # ✅ 캐러셀 위치 기록 (웜 스타트 스냅샷, 이동 실패 시 위치 불명)
+        if isinstance(event, events.MoveStarted):
+            move_target["stage"] = event.to_stage
+        elif isinstance(event, events.MoveFinished):
+            warm_start.update("carousel_stage", move_target["stage"] if event.ok else None)
+        elif isinstance(event, events.HomeFinished):
+            warm_start.update("carousel_stage", 0 if event.ok else None)
+        elif isinstance(event, events.SessionEnded):
+            refresh_inventory_tile()  # 서버 재조회 전에 배출분 반영
+
+    def on_fresh_data(kind, data, tile_index, update_tile, build_model):
+        # ✅ 가공은 폴링 스레드에서, 적용 후 stale 표시 해제 + 스냅샷 갱신
+        app.ui_call(update_tile, build_model(data))
+        app.ui_post(("stale", tile_index), app.clear_stale, tile_index)
+        warm_start.update(kind, data)
 
     def on_user_list_update(users: list):
-        app.ui_call(app.update_user_tile, users)
+        on_fresh_data("users", users, 5, app.update_user_tile, view_models.users)
 
-    def on_slot_list_update(slots: list):
-        app.ui_call(app.update_inventory_tile, slots)
+    def refresh_inventory_tile():
+        # ✅ 로컬 재고(배출 차감 반영) + 남은 일수 예측으로 재고 타일 갱신
+        if inventory.age() is None:
+            return  # 서버 재고를 아직 못 받음 (웜 스타트 화면 유지)
+        app.ui_call(app.update_inventory_tile, view_models.slots(inventory.slot_rows()))
+
+    def on_slot_list_update(slots: list, fetched_at=None):
+        inventory.reconcile(slots, fetched_at)
+        on_fresh_data("slots", slots, 1, app.update_inventory_tile,
+                      lambda _: view_models.slots(inventory.slot_rows()))
 
     def on_schedule_list_update(schedules: list):
-        app.ui_call(app.update_schedule_tile, schedules)
+        on_fresh_data("schedules", schedules, 2, app.update_schedule_tile, view_models.schedules)
+        inventory.set_schedules(schedules)  # 하루 사용량 → 재고 타일 남은 일수
+        refresh_inventory_tile()
 
     def on_history_list_update(history: list):
-        if history:
-            processed_entries = set()
-            history_lines = []
-            history.sort(key=lambda x: x.get('dispensed_at', ''), reverse=True)
-            for item in history:
-                user_name = item.get('user_name', '알 수 없는 사용자')
-                dispensed_at_str = item.get('dispensed_at', '')
-                try:
-                    utc_time = datetime.fromisoformat(dispensed_at_str.replace('Z', '+00:00'))
-                    local_dt = utc_time.astimezone()
-                    entry_key = (user_name, local_dt.strftime('%Y-%m-%d'))
-                    if entry_key not in processed_entries:
-                        summary = f"{user_name}님 - {local_dt.strftime('%m월 %d일')} 복용 완료"
-                        history_lines.append(summary)
-                        processed_entries.add(entry_key)
-                except (ValueError, TypeError):
-                    history_lines.append(f"{user_name} - 시간 정보 오류")
-            app.ui_call(app.update_tile_content, 4, "\n".join(history_lines))
-        else:
-            app.ui_call(app.update_tile_content, 4, "최근 기록 없음")
+        # ✅ 정렬/시간 파싱/문구 조립은 폴링 스레드에서 (Tk 스레드는 텍스트만 대입)
+        on_fresh_data("history", history, 4, app.update_history_tile, view_models.history)
 
     stop_polling = threading.Event()
-    polling_thread = None
 
     def poll_server_data():
         try:
-            time.sleep(1)
             while not stop_polling.is_set():
                 # ✅ 배출 중이면 폴링 스킵 (1초 대기 후 재확인)
-                if DispenseState.get_dispensing():
+                if not DispenseState.can_fetch():
                     print("[POLLING] 배출 진행 중... 폴링 일시정지")
                     time.sleep(1)
                     continue
 
                 print("[POLLING] 서버에서 최신 정보를 가져옵니다...")
+                t_poll = time.monotonic()
                 try:
                     machine_id = settings.MACHINE_ID
                     if not machine_id:
                         time.sleep(10)
                         continue
 
-                    users = get_users_for_machine(machine_id)
-                    if users is not None: app.ui_call(on_user_list_update, users)
+                    if DispenseState.can_fetch("users"):
+                        users = get_users_for_machine(machine_id)
+                        if users is not None: on_user_list_update(users)
 
-                    slots = get_slots_for_machine(machine_id)
-                    if slots is not None: app.ui_call(on_slot_list_update, slots)
+                    if DispenseState.can_fetch("slots"):
+                        t_slots = time.monotonic()
+                        slots = get_slots_for_machine(machine_id)
+                        if slots is not None: on_slot_list_update(slots, fetched_at=t_slots)
 
-                    schedules = get_today_schedules_for_machine(machine_id)
-                    if schedules is not None: app.ui_call(on_schedule_list_update, schedules)
+                    if DispenseState.can_fetch("schedules"):
+                        schedules = get_today_schedules_for_machine(machine_id)
+                        if schedules is not None: on_schedule_list_update(schedules)
 
                     yesterday = datetime.now() - timedelta(days=1)
                     start_date_str = yesterday.strftime('%Y-%m-%d')
-                    history = get_dose_history_for_machine(machine_id, start_date=start_date_str)
-                    if history is not None: app.ui_call(on_history_list_update, history)
+                    if DispenseState.can_fetch("history"):
+                        history = get_dose_history_for_machine(machine_id, start_date=start_date_str)
+                        if history is not None: on_history_list_update(history)
 
+                    startup.mark("first_poll", t_poll)  # 최초 1회만 기록
                 except Exception as e:
                     print(f"[POLLING_ERROR] 데이터 업데이트 중 오류 발생: {e}")
                 time.sleep(10)
@@ -150,29 +234,27 @@ def main():
         on_user_list_update=on_user_list_update,
         on_slot_list_update=on_slot_list_update,
         on_schedule_list_update=on_schedule_list_update,
-        on_history_list_update=on_history_list_update
+        on_history_list_update=on_history_list_update,
+        on_state_change=on_state_change,
+        on_event=on_event,
+        startup=startup,
     )
 
-    def start_polling_when_ready():
-        nonlocal polling_thread
-        if adapter.is_ready():
-            print("시리얼 준비 완료. 주기적 폴링을 시작합니다.")
-            if polling_thread is None:
-                polling_thread = threading.Thread(target=poll_server_data, daemon=True)
-                polling_thread.start()
-        else:
-            app.after(100, start_polling_when_ready)
+    # ✅ 화면 터치(UI 깨어남) 시 HTTP 연결 pre-warm
+    app.bind_all('<Button-1>', lambda e: prewarm(), add='+')
+    start_keepalive()
+    metrics.start_http_server(settings.METRICS_PORT, settings.METRICS_ADDR)
 
     try:
+        # ✅ 폴링은 시리얼 준비를 기다리지 않고 바로 시작 (웜 스타트 화면을 곧바로 최신화)
+        polling_thread = threading.Thread(target=poll_server_data, daemon=True)
+        polling_thread.start()
         if is_demo_mode:
             print("--- DEMO MODE ---")
-            polling_thread = threading.Thread(target=poll_server_data, daemon=True)
-            polling_thread.start()
         else:
             print("--- SERIAL MODE ---")
             adapter.start()
-            app.after(100, start_polling_when_ready)
-        
+
         app.mainloop()
 
     finally:
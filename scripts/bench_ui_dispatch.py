@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+UI 업데이트 폭주 시 Tk 이벤트 루프 지연 측정 (after(0) 직접 호출 vs UiDispatcher)
+
+워커 스레드 여러 개가 타일 라벨 텍스트를 연속으로 갱신하는 동안
+10ms 주기 after() 프로브가 실제로 얼마나 늦게 실행되는지 기록한다.
+
+Usage:
+    python scripts/bench_ui_dispatch.py                        # 두 방식 모두
+    python scripts/bench_ui_dispatch.py --mode dispatch --updates 20000 --threads 4
+    (디스플레이 필요: 헤드리스 환경은 xvfb-run 으로 실행)
+"""
+
+import argparse
+import sys
+import threading
+import time
+import tkinter as tk
+from pathlib import Path
+
+# 프로젝트 루트를 Python path에 추가
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from gui.ui_dispatcher import UiDispatcher
+
+PROBE_MS = 10
+
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+
+
+def run(mode: str, updates: int, threads: int, tiles: int, fps: float) -> dict:
+    root = tk.Tk()
+    root.withdraw()
+    labels = [tk.Label(root, text="") for _ in range(tiles)]
+    for lbl in labels:
+        lbl.pack()
+    dispatcher = UiDispatcher(root, max_fps=fps)
+
+    lags = []
+    applied = [0]
+    done_posting = threading.Event()
+    final_text = {}
+    t_done = [None]
+
+    def set_text(idx, text):
+        applied[0] += 1
+        labels[idx].config(text=text)
+        labels[idx].update_idletasks()  # 실제 타일처럼 레이아웃 비용 포함
+
+    def post(idx, text):
+        if mode == "legacy":
+            root.after(0, lambda: set_text(idx, text))
+        else:
+            dispatcher.post(set_text, idx, text, key=("tile", idx, "text"))
+
+    def worker(wid):
+        per_thread = updates // threads
+        for i in range(per_thread):
+            idx = (wid + i) % tiles
+            post(idx, f"w{wid} #{i}")
+            if i % 200 == 0:
+                time.sleep(0.001)  # 시리얼 스레드처럼 짧은 버스트 반복
+
+    def probe(expected):
+        now = time.monotonic()
+        lags.append((now - expected) * 1000.0)
+        if done_posting.is_set() and all(labels[i].cget("text") == t for i, t in final_text.items()):
+            t_done[0] = now
+            root.quit()
+            return
+        root.after(PROBE_MS, probe, now + PROBE_MS / 1000.0)
+
+    def start_workers():
+        ws = [threading.Thread(target=worker, args=(w,), daemon=True) for w in range(threads)]
+        for w in ws:
+            w.start()
+
+        def _join():
+            for w in ws:
+                w.join()
+            # 모든 post가 끝난 뒤 타일마다 완료 마커를 보냄 → 화면에 반영되면 측정 종료
+            for idx in range(tiles):
+                final_text[idx] = f"done {idx}"
+                post(idx, final_text[idx])
+            done_posting.set()
+
+        threading.Thread(target=_join, daemon=True).start()
+
+    t0 = time.monotonic()
+    root.after(0, start_workers)
+    root.after(PROBE_MS, probe, t0 + PROBE_MS / 1000.0)
+    root.mainloop()
+    root.destroy()
+
+    return {
+        "mode": mode,
+        "posted": (updates // threads) * threads,
+        "applied": applied[0],
+        "elapsed_s": (t_done[0] or time.monotonic()) - t0,
+        "lag_p50": _pct(lags, 50),
+        "lag_p95": _pct(lags, 95),
+        "lag_p99": _pct(lags, 99),
+        "lag_max": max(lags) if lags else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tk UI dispatcher stress benchmark")
+    parser.add_argument("--mode", choices=["legacy", "dispatch", "both"], default="both")
+    parser.add_argument("--updates", type=int, default=10000, help="총 업데이트 수")
+    parser.add_argument("--threads", type=int, default=4, help="워커 스레드 수")
+    parser.add_argument("--tiles", type=int, default=5, help="갱신 대상 라벨 수")
+    parser.add_argument("--fps", type=float, default=20.0, help="디스패처 프레임 상한")
+    args = parser.parse_args()
+
+    modes = ["legacy", "dispatch"] if args.mode == "both" else [args.mode]
+    print(f"{'mode':<10} {'posted':>8} {'applied':>8} {'elapsed(s)':>11} "
+          f"{'lag p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    for mode in modes:
+        r = run(mode, args.updates, args.threads, args.tiles, args.fps)
+        print(f"{r['mode']:<10} {r['posted']:>8} {r['applied']:>8} {r['elapsed_s']:>11.2f} "
+              f"{r['lag_p50']:>8.1f} {r['lag_p95']:>8.1f} {r['lag_p99']:>8.1f} {r['lag_max']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 # scripts/recovery_jog.py
 import argparse
-from hwserial.arduino_link import open_serial, jog, step_next, step_home
+# 키오스크 실행 중이면 제어 소켓으로 (서비스 중지/아두이노 리셋 없음), 아니면 시리얼 직접
+from hwserial.control_client import open_link, jog, step_next, step_home
 
 def main():
     ap = argparse.ArgumentParser(description="Emergency JOG / STEP control")
@@ -13,7 +14,7 @@ def main():
     if not args.step and not args.dir:
         ap.error("하나 이상 선택 필요: --step 또는 --dir/--ms")
 
-    with open_serial() as ser:
+    with open_link() as ser:
         if args.step:
             if args.step == "NEXT":
                 ok, msg = step_next(ser)
@@ -17,7 +17,8 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(project_root))
 
-from hwserial.arduino_link import open_serial, send_raw
+# 키오스크 실행 중이면 제어 소켓으로 (서비스 중지/아두이노 리셋 없음), 아니면 시리얼 직접
+from hwserial.control_client import open_link, send_raw
 
 
 def test_solenoid(ser, slot: int, test_type: str):
@@ -124,7 +125,7 @@ def main():
     # 시리얼 포트 열기
     print("Arduino 연결 중...")
     try:
-        ser = open_serial(baud_rate=9600)
+        ser = open_link(baud_rate=9600)
     except Exception as e:
         print(f"❌ 시리얼 포트 열기 실패: {e}")
         print("\n해결 방법:")
@@ -152,7 +153,7 @@ def main():
         sys.exit(1)
     finally:
         ser.close()
-        print("\n시리얼 포트 닫음")
+        print("\n연결 닫음")
 
 
 if __name__ == "__main__":
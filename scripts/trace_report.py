@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+배출 세션 트레이스 조회 (data/traces.jsonl)
+
+Usage:
+    python scripts/trace_report.py                  # 최근 50세션 단계별 백분위수
+    python scripts/trace_report.py --last 200       # 최근 200세션 기준
+    python scripts/trace_report.py --waterfall 3    # 최근 3세션 워터폴 출력
+    python scripts/trace_report.py --result completed
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# 프로젝트 루트를 Python path에 추가
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.tracing import TRACE_PATH, load_recent, stage_totals, percentile
+
+BAR_WIDTH = 50
+
+# 세션 흐름 순서 (표 정렬용, 그 외 단계는 뒤에 이름순) — serial_reader/session_queue가 기록하는 span 이름
+STAGE_ORDER = ["uid_read", "queue_wait", "prefetch", "resolve", "inventory", "user_lookup", "time_slot",
+               "build_queue", "filter", "home_reset", "move", "dispense_multi", "dispense", "report", "home"]
+
+
+def _stage_sort_key(name: str):
+    return (STAGE_ORDER.index(name), "") if name in STAGE_ORDER else (len(STAGE_ORDER), name)
+
+
+def _fmt_ms(v) -> str:
+    return "-" if v is None else f"{v:,.0f}"
+
+
+def print_waterfall(trace: dict):
+    """세션 1건 워터폴 (각 span의 시작/길이를 막대로 표시)"""
+    total = max(trace.get("total") or 0.0, 1.0)
+    ts = datetime.fromtimestamp(trace.get("ts", 0)).strftime("%Y-%m-%d %H:%M:%S")
+    attrs = trace.get("attrs", {})
+    print(f"\n{'='*80}")
+    print(f"세션 {trace.get('id')}  {ts}  result={trace.get('result')}  "
+          f"total={_fmt_ms(trace.get('total'))}ms  user={attrs.get('user_id', '-')}")
+    print(f"{'='*80}")
+    for sp in trace.get("spans", []):
+        start = int(sp["s"] / total * BAR_WIDTH)
+        width = max(1, int(round(sp["d"] / total * BAR_WIDTH)))
+        bar = " " * start + "█" * min(width, BAR_WIDTH - start)
+        a = sp.get("a", {})
+        detail = ",".join(f"{k}={v}" for k, v in a.items())
+        print(f"{sp['n']:<12s} |{bar:<{BAR_WIDTH}s}| {_fmt_ms(sp['d']):>7s}ms  {detail}")
+
+
+def print_percentiles(traces: list):
+    """단계별 세션당 소요시간 백분위수"""
+    per_stage = {}
+    for t in traces:
+        for name, ms in stage_totals(t).items():
+            per_stage.setdefault(name, []).append(ms)
+    totals = [t.get("total", 0.0) for t in traces]
+
+    print(f"\n{'='*80}")
+    print(f"단계별 소요시간 (세션 {len(traces)}건, ms)")
+    print(f"{'='*80}")
+    print(f"{'stage':<12s} {'n':>5s} {'p50':>9s} {'p90':>9s} {'p99':>9s} {'max':>9s} {'share':>7s}")
+    grand = sum(totals) or 1.0
+    for name in sorted(per_stage, key=_stage_sort_key):
+        vals = per_stage[name]
+        share = sum(vals) / grand * 100
+        print(f"{name:<12s} {len(vals):>5d} {_fmt_ms(percentile(vals, 0.5)):>9s} "
+              f"{_fmt_ms(percentile(vals, 0.9)):>9s} {_fmt_ms(percentile(vals, 0.99)):>9s} "
+              f"{_fmt_ms(max(vals)):>9s} {share:>6.1f}%")
+    print(f"{'-'*80}")
+    print(f"{'TOTAL':<12s} {len(totals):>5d} {_fmt_ms(percentile(totals, 0.5)):>9s} "
+          f"{_fmt_ms(percentile(totals, 0.9)):>9s} {_fmt_ms(percentile(totals, 0.99)):>9s} "
+          f"{_fmt_ms(max(totals) if totals else None):>9s}")
+
+    results = {}
+    for t in traces:
+        results[t.get("result")] = results.get(t.get("result"), 0) + 1
+    print("\n결과 분포: " + ", ".join(f"{k}={v}" for k, v in sorted(results.items(), key=lambda kv: -kv[1])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="배출 세션 트레이스 조회")
+    parser.add_argument("--last", type=int, default=50, help="분석할 최근 세션 수 (기본 50)")
+    parser.add_argument("--waterfall", type=int, default=0, help="워터폴로 출력할 최근 세션 수")
+    parser.add_argument("--result", default=None, help="결과로 필터 (completed, partial, no_schedule ...)")
+    parser.add_argument("--file", default=None, help=f"트레이스 파일 (기본 {TRACE_PATH})")
+    args = parser.parse_args()
+
+    path = Path(args.file) if args.file else project_root / TRACE_PATH
+    traces = load_recent(args.last, path)
+    if args.result:
+        traces = [t for t in traces if t.get("result") == args.result]
+
+    if not traces:
+        print(f"트레이스 없음: {path}")
+        sys.exit(1)
+
+    for t in traces[-args.waterfall:] if args.waterfall > 0 else []:
+        print_waterfall(t)
+    print_percentiles(traces)
+
+
+if __name__ == "__main__":
+    main()
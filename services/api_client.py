@@ -1,44 +1,285 @@
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import functools
+import re
+import threading
+import time
 from config import settings
+from services import metrics
+from services.lazy_import import lazy_import
+
+# ✅ requests/urllib3는 첫 HTTP 요청 시점에 로드 (import 시간 단축)
+requests = lazy_import("requests")
 
 _session = None
+_session_lock = threading.Lock()
+
+# ✅ 연결 수명 관리 상태 (keep-alive / pre-warm)
+_last_activity = 0.0          # 마지막 요청/probe 시각 (monotonic)
+_keepalive_thread = None
+_prewarm_lock = threading.Lock()
+_prewarm_running = False
+_conn_stats = {"requests": 0, "connects": 0, "probes": 0}
+_stats_lock = threading.Lock()   # 요청 스레드 / probe 스레드 / 메트릭 수집이 동시에 접근
+_server_keepalive = None         # 서버가 Keep-Alive: timeout=N 으로 알려준 유휴 연결 유지 시간 (초)
+
+def _count(key: str, n: int = 1):
+    with _stats_lock:
+        _conn_stats[key] += n
+
+def _stat(key: str) -> int:
+    with _stats_lock:
+        return _conn_stats[key]
+
+@functools.lru_cache(maxsize=None)
+def _counting_adapter_cls():
+    """✅ 실제 TCP(TLS) 핸드셰이크 횟수 집계용 어댑터 (urllib3 로드가 필요하므로 첫 세션 생성 시 정의)"""
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class _CountingHTTPConnection(HTTPConnection):
+        def connect(self):
+            _count("connects")
+            super().connect()
+
+    class _CountingHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            _count("connects")
+            super().connect()
+
+    # 요청 수는 풀에서 연결을 꺼낼 때 집계 → urllib3 Retry 재시도(재연결 포함)도 실제로 보낸 만큼 셈
+    class _CountingHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = _CountingHTTPConnection
+
+        def _get_conn(self, timeout=None):
+            conn = super()._get_conn(timeout)
+            _count("requests")
+            return conn
+
+    class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = _CountingHTTPSConnection
+
+        def _get_conn(self, timeout=None):
+            conn = super()._get_conn(timeout)
+            _count("requests")
+            return conn
+
+    class _CountingAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": _CountingHTTPConnectionPool,
+                "https": _CountingHTTPSConnectionPool,
+            }
+
+    return _CountingAdapter
+
+def _make_adapter(pool_maxsize: int):
+    from urllib3.util.retry import Retry
+    retry = Retry(total=3, connect=3, read=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504))
+    return _counting_adapter_cls()(
+        max_retries=retry,
+        pool_connections=settings.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize,
+    )
+
+def _parse_pool_sizes(spec: str) -> dict:
+    """"host[:port]=size,..." → {host: size} (잘못된 항목은 무시)"""
+    sizes = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        host, size = part.rsplit("=", 1)
+        try:
+            sizes[host.strip()] = max(1, int(size))
+        except ValueError:
+            continue
+    return sizes
 
 def _get_session():
     global _session
     if _session is None:
-        _session = requests.Session()
-        retry = Retry(total=3, connect=3, read=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504))
-        adapter = HTTPAdapter(max_retries=retry)
-        _session.mount("http://", adapter)
-        _session.mount("https://", adapter)
-        _session.headers.update({
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        })
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = _make_adapter(settings.HTTP_POOL_MAXSIZE)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                # 호스트별 풀 크기 (더 긴 prefix가 우선 매칭됨)
+                for host, size in _parse_pool_sizes(settings.HTTP_POOL_SIZES).items():
+                    host_adapter = _make_adapter(size)
+                    s.mount(f"http://{host}", host_adapter)
+                    s.mount(f"https://{host}", host_adapter)
+                s.headers.update({
+                    "Content-Type": "application/json",
+                    "Accept": "application/json"
+                })
+                _session = s
     return _session
 
-def _request(method, path, **kwargs):
+def _touch():
+    global _last_activity
+    _last_activity = time.monotonic()
+
+_KEEPALIVE_TIMEOUT_RE = re.compile(r"timeout\s*=\s*(\d+(?:\.\d+)?)")
+
+def _note_keepalive(res):
+    """응답의 Keep-Alive: timeout=N 기억 (Node.js 기본 5초 → 25초 probe로는 연결이 먼저 닫힘)"""
+    global _server_keepalive
+    m = _KEEPALIVE_TIMEOUT_RE.search(res.headers.get("Keep-Alive", ""))
+    if m:
+        _server_keepalive = float(m.group(1))
+
+def _keepalive_interval() -> float:
+    """probe 주기: HTTP_KEEPALIVE_SEC, 서버가 유지 시간을 알려줬으면 그 60% 이하"""
+    interval = settings.HTTP_KEEPALIVE_SEC
+    if _server_keepalive:
+        interval = min(interval, max(1.0, _server_keepalive * 0.6))
+    return interval
+
+def _probe():
+    """가벼운 HEAD 요청으로 풀의 연결을 살려둠 (응답 코드는 무시)"""
+    try:
+        _count("probes")
+        res = _get_session().head(settings.SERVER_BASE_URL, timeout=3, allow_redirects=False)
+        _note_keepalive(res)
+    except requests.exceptions.RequestException as e:
+        print(f"[HTTP_PROBE_ERR] {e}")
+    finally:
+        _touch()
+
+def prewarm():
+    """
+    연결 pre-warm 훅 (논블로킹)
+    UI가 깨어나거나 다음 태그가 예상될 때 호출 → 유휴 연결을 미리 열어둠
+    """
+    global _prewarm_running
+    if time.monotonic() - _last_activity < settings.HTTP_PREWARM_IDLE_SEC:
+        return
+    with _prewarm_lock:
+        if _prewarm_running:
+            return
+        _prewarm_running = True
+
+    def _run():
+        global _prewarm_running
+        try:
+            _probe()
+        finally:
+            _prewarm_running = False
+
+    threading.Thread(target=_run, daemon=True).start()
+
+def _keepalive_loop():
+    last_stats_log = time.monotonic()
+    while True:
+        interval = _keepalive_interval()
+        time.sleep(max(0.5, interval / 2))
+        now = time.monotonic()
+        if now - _last_activity >= interval:
+            _probe()
+        # 10분마다 연결 재사용 통계 로그
+        if now - last_stats_log >= 600:
+            st = get_connection_stats()
+            print(f"[HTTP] requests={st['requests']} new_conn={st['new_connections']} "
+                  f"reused={st['reused']} probes={st['probes']}")
+            last_stats_log = now
+
+def start_keepalive():
+    """유휴 연결 keep-alive probe 스레드 시작 (중복 호출 안전)"""
+    global _keepalive_thread
+    if settings.HTTP_KEEPALIVE_SEC <= 0 or _keepalive_thread is not None:
+        return
+    _keepalive_thread = threading.Thread(target=_keepalive_loop, daemon=True)
+    _keepalive_thread.start()
+
+def get_connection_stats() -> dict:
+    """연결 재사용 통계 (requests: 전체 요청, new_connections: 새 핸드셰이크, reused: 재사용)"""
+    with _stats_lock:
+        total = _conn_stats["requests"]
+        new_conn = _conn_stats["connects"]
+        probes = _conn_stats["probes"]
+    return {
+        "requests": total,
+        "new_connections": new_conn,
+        "reused": max(0, total - new_conn),
+        "probes": probes,
+    }
+
+_ID_FREE_SEGMENTS = {"check", "heartbeat"}
+
+def _endpoint_label(method: str, path: str) -> str:
+    """메트릭 라벨용 경로 정규화: /machine/MACHINE-0001/slots → GET /machine/{machine_id}/slots"""
+    parts = path.split("?", 1)[0].split("/")
+    for i in range(1, len(parts)):
+        if parts[i - 1] == "machine" and parts[i] and parts[i] not in _ID_FREE_SEGMENTS:
+            parts[i] = "{machine_id}"
+    return f"{method.upper()} {'/'.join(parts)}"
+
+def _request(method, path, raise_errors: bool = False, **kwargs):
+    """실패하면 None (raise_errors=True면 예외 그대로 → 성공 여부가 중요한 호출용)"""
     url = f"{settings.SERVER_BASE_URL}{path}"
+    endpoint = _endpoint_label(method, path)
+    t0 = time.monotonic()
+    status = "error"
     try:
         s = _get_session()
         # 타임아웃 10초로 증가 (네트워크 지연 대비)
         timeout = kwargs.pop('timeout', 10)
         res = s.request(method, url, timeout=timeout, **kwargs)
+        _touch()
+        _note_keepalive(res)
+
+        # ✅ 재시도 횟수 / 페이로드 크기 기록
+        retries = getattr(getattr(res.raw, "retries", None), "history", None) or ()
+        if retries:
+            metrics.inc("tdb_api_retries_total", len(retries), endpoint=endpoint)
+        metrics.observe("tdb_api_request_bytes", len(res.request.body or b""),
+                        buckets=metrics.SIZE_BUCKETS, endpoint=endpoint)
+        metrics.observe("tdb_api_response_bytes", len(res.content or b""),
+                        buckets=metrics.SIZE_BUCKETS, endpoint=endpoint)
+
         res.raise_for_status()
 
         json_res = res.json()
+        status = "ok"
         if json_res and "data" in json_res:
             return json_res["data"]
         return json_res
 
+    except requests.exceptions.Timeout as e:
+        status = "timeout"
+        metrics.inc("tdb_api_timeouts_total", endpoint=endpoint)
+        print(f"[API_{method.upper()}_ERR] {path}: {e}")
+        if raise_errors:
+            raise
+        return None
     except requests.exceptions.RequestException as e:
+        if isinstance(e, requests.exceptions.RetryError) or "Max retries" in str(e):
+            metrics.inc("tdb_api_retries_exhausted_total", endpoint=endpoint)
         print(f"[API_{method.upper()}_ERR] {path}: {e}")
+        if raise_errors:
+            raise
         return None
     except Exception as e:
         print(f"[API_UNKNOWN_ERR] {path}: {e}")
+        if raise_errors:
+            raise
         return None
+    finally:
+        metrics.observe("tdb_api_request_seconds", time.monotonic() - t0, endpoint=endpoint)
+        metrics.inc("tdb_api_requests_total", endpoint=endpoint, status=status)
+
+# ✅ 연결 재사용 통계를 메트릭으로 노출
+metrics.register_callback("tdb_http_requests_total", lambda: _stat("requests"), "counter",
+                          "HTTP requests sent through the shared session (incl. probes and retries)")
+metrics.register_callback("tdb_http_new_connections_total", lambda: _stat("connects"), "counter",
+                          "New TCP/TLS connections opened by the shared session")
+metrics.register_callback("tdb_http_reused_connections_total", lambda: get_connection_stats()["reused"], "counter",
+                          "Requests served over an already-open pooled connection")
+metrics.register_callback("tdb_http_keepalive_probes_total", lambda: _stat("probes"), "counter",
+                          "Keep-alive / pre-warm probes sent")
+metrics.describe("tdb_api_request_seconds", "histogram", "API request latency by endpoint")
+metrics.describe("tdb_api_requests_total", "counter", "API requests by endpoint and outcome")
 
 def _get(path, **kwargs):
     return _request("get", path, **kwargs)
@@ -48,9 +289,13 @@ def _post(path, **kwargs):
 
 # --- API 함수들 ---
 
-def check_machine_registered(machine_id: str) -> bool:
+def get_machine_registration(machine_id: str):
+    """등록 여부 (True/False), 서버 응답을 못 받으면 None"""
     res = _get("/machine/check", params={"machine_id": machine_id})
-    return res.get("registered", False) if isinstance(res, dict) else False
+    return bool(res.get("registered", False)) if isinstance(res, dict) else None
+
+def check_machine_registered(machine_id: str) -> bool:
+    return get_machine_registration(machine_id) is True
 
 def resolve_uid(uid: str):
     return _post("/rfid/resolve", json={"uid": uid})
@@ -73,11 +318,15 @@ def build_queue(machine_id: str, user_id: str, weekday: str = None):
 
     return _post("/queue/build", json=payload)
 
-def report_dispense(user_id: str, machine_id: str, items: list, time: str = None, result: str = "completed"):
+def report_dispense(user_id: str, machine_id: str, items: list, time: str = None, result: str = "completed",
+                    report_id: str = None):
     """
     배출 완료를 서버에 보고
     time: "morning" | "afternoon" | "evening" (시간대별 보고 시 필수)
     result: "completed" | "partial" | "failed"
+    서버에 반영되지 않았으면(연결 실패/타임아웃/HTTP 오류/잘못된 응답) 예외 → 호출 측이 오프라인 적치
+    report_id: 멱등 키 (세션+시간대+사용자), payload와 Idempotency-Key 헤더로 전송
+               중복 제거는 서버 구현에 달림 (현재 서버/dev/mock_server.py 지원 미확인 → settings.REPORT_DEDUP_BY_ID)
     """
     payload = {
         "machine_id": machine_id,
@@ -87,8 +336,12 @@ def report_dispense(user_id: str, machine_id: str, items: list, time: str = None
     }
     if time:
         payload["time"] = time
+    if report_id:
+        payload["report_id"] = report_id
+        return _post("/dispense/report", json=payload, headers={"Idempotency-Key": report_id},
+                     raise_errors=True)
 
-    return _post("/dispense/report", json=payload)
+    return _post("/dispense/report", json=payload, raise_errors=True)
 
 def heartbeat(machine_id: str):
     return _post("/machine/heartbeat", json={"machine_id": machine_id})
@@ -0,0 +1,62 @@
+# services/lazy_import.py
+"""
+무거운 선택 모듈 지연 로딩 (qrcode / PIL / requests 등)
+
+    qrcode = lazy_import("qrcode")      # 여기서는 아무것도 import 하지 않음
+    qrcode.make(...)                    # 첫 속성 접근 시 실제 import (이후엔 모듈 그대로 사용)
+
+- 실제 import는 importlib.import_module → sys.modules 공유, 중복 로드 없음
+- 여러 워커 스레드가 동시에 처음 접근해도 모듈별 락으로 1회만 로드
+- 모듈이 설치돼 있지 않으면 import 시점이 아닌 첫 사용 시점에 ImportError
+- 실제 로드에 걸린 시간은 load_times()로 조회 (--profile-startup 보고용)
+"""
+import importlib
+import threading
+import time
+
+_load_times = {}   # name -> seconds (실제 로드된 모듈만)
+
+
+class LazyModule:
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is not None:
+            return module
+        with self.__dict__["_lock"]:
+            module = self.__dict__["_module"]
+            if module is None:
+                t0 = time.perf_counter()
+                module = importlib.import_module(self._name)
+                _load_times[self._name] = time.perf_counter() - t0
+                self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def is_loaded(module) -> bool:
+    """LazyModule이면 실제 로드 여부, 일반 모듈이면 항상 True"""
+    if isinstance(module, LazyModule):
+        return module.__dict__["_module"] is not None
+    return True
+
+
+def load_times() -> dict:
+    return dict(_load_times)
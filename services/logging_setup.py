@@ -0,0 +1,107 @@
+# services/logging_setup.py
+"""
+비동기 로깅 파이프라인
+
+호출 스레드(시리얼/배출 루프)는 QueueHandler로 레코드를 큐에 넣기만 하고,
+콘솔 출력 / SD카드 파일 기록 / JSON-lines 기록은 QueueListener 스레드에서 처리.
+→ 모터 이동·배출 단계가 디스크나 stdout I/O를 기다리지 않음
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config import settings
+
+LOG_DIR = "logs"
+
+_queue = None
+_listener = None
+_queue_handler = None
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    기본 QueueHandler.prepare()는 호출 스레드에서 Formatter(asctime 등)까지 실행함
+    → 메시지 병합만 하고 포맷팅은 리스너 스레드로 미룸
+    """
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _JsonLineFormatter(logging.Formatter):
+    """한 줄 압축 JSON: {"t":..., "lv":"I", "lg":"serial_reader", "m":"..."}"""
+    def format(self, record):
+        d = {
+            "t": round(record.created, 3),
+            "lv": record.levelname[0],
+            "lg": record.name,
+            "m": record.getMessage(),
+        }
+        if record.exc_text:
+            d["exc"] = record.exc_text
+        return json.dumps(d, ensure_ascii=False, separators=(",", ":"))
+
+
+def _level(name: str, default=logging.INFO) -> int:
+    return getattr(logging, str(name or "").upper(), default)
+
+
+def _start_listener():
+    global _queue, _listener, _queue_handler
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    handlers = []
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    console.setLevel(_level(settings.LOG_CONSOLE_LEVEL))
+    handlers.append(console)
+
+    file_handler = RotatingFileHandler(os.path.join(LOG_DIR, "serial_reader.log"),
+                                       maxBytes=2_000_000, backupCount=3, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    file_handler.setLevel(_level(settings.LOG_FILE_LEVEL))
+    handlers.append(file_handler)
+
+    if settings.LOG_JSON:
+        json_handler = RotatingFileHandler(os.path.join(LOG_DIR, "tdb.jsonl"),
+                                           maxBytes=2_000_000, backupCount=2, encoding="utf-8")
+        json_handler.setFormatter(_JsonLineFormatter())
+        json_handler.setLevel(_level(settings.LOG_FILE_LEVEL))
+        handlers.append(json_handler)
+
+    _queue = queue.SimpleQueue()
+    _queue_handler = _LazyQueueHandler(_queue)
+    _listener = QueueListener(_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """비동기 파이프라인에 연결된 로거 반환 (최초 호출 시 리스너 시작)"""
+    if _listener is None:
+        _start_listener()
+    logger = logging.getLogger(name)
+    logger.setLevel(_level(settings.LOG_LEVEL))
+    if _queue_handler not in logger.handlers:
+        logger.addHandler(_queue_handler)
+    logger.propagate = False
+    return logger
+
+
+def stop():
+    """남은 레코드를 모두 기록하고 리스너 종료"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,217 @@
+# services/metrics.py
+"""
+프로세스 내부 메트릭 수집기 (외부 의존성 없음)
+
+- Counter / Histogram / 콜백 기반 값 (라벨 지원)
+- 프로세스 안에서 조회: get_counter(), quantile(), snapshot()
+- Prometheus text format 출력: render_prometheus()
+- 로컬 HTTP 포트로 노출: start_http_server(port) → GET /metrics
+"""
+import bisect
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 기본 버킷 (초 단위 지연 / 바이트 단위 크기)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# 분위수 계산용 최근 샘플 보관 개수 (시리즈별)
+_RESERVOIR_SIZE = 1024
+
+_lock = threading.Lock()
+_counters = {}      # (name, labels) -> float
+_histograms = {}    # (name, labels) -> _Histogram
+_callbacks = {}     # name -> (type, fn)  fn() -> float | {labels_tuple: float}
+_help = {}          # name -> (type, help)
+_server = None
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막은 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=_RESERVOIR_SIZE)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def quantile(self, q: float):
+        if not self.recent:
+            return None
+        data = sorted(self.recent)
+        idx = min(len(data) - 1, max(0, int(round(q * (len(data) - 1)))))
+        return data[idx]
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def describe(name: str, mtype: str, help_text: str):
+    """메트릭 타입/설명 등록 (Prometheus # HELP / # TYPE)"""
+    _help[name] = (mtype, help_text)
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def observe(name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = _Histogram(buckets)
+        h.observe(value)
+
+
+def register_callback(name: str, fn, mtype: str = "gauge", help_text: str = ""):
+    """렌더링 시점에 fn()을 호출해 값을 읽는 메트릭 (외부 모듈 상태 노출용)"""
+    _callbacks[name] = (mtype, fn)
+    if help_text:
+        describe(name, mtype, help_text)
+
+
+def get_counter(name: str, **labels) -> float:
+    with _lock:
+        return _counters.get(_key(name, labels), 0.0)
+
+
+def quantile(name: str, q: float, **labels):
+    """최근 샘플 기준 분위수 (샘플 없으면 None)"""
+    with _lock:
+        h = _histograms.get(_key(name, labels))
+        return h.quantile(q) if h else None
+
+
+def snapshot() -> dict:
+    """프로세스 내부 조회용 요약 {name: [{labels, count, sum, p50, p90, p99}|{labels, value}]}"""
+    out = {}
+    with _lock:
+        for (name, labels), v in _counters.items():
+            out.setdefault(name, []).append({"labels": dict(labels), "value": v})
+        for (name, labels), h in _histograms.items():
+            out.setdefault(name, []).append({
+                "labels": dict(labels),
+                "count": h.count,
+                "sum": h.sum,
+                "p50": h.quantile(0.5),
+                "p90": h.quantile(0.9),
+                "p99": h.quantile(0.99),
+            })
+    return out
+
+
+def reset():
+    """테스트용: 수집값 초기화 (콜백 등록은 유지)"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels, extra=None) -> str:
+    items = list(labels) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+def render_prometheus() -> str:
+    """Prometheus text exposition format (v0.0.4)"""
+    lines = []
+    seen = set()
+
+    def header(name, default_type):
+        if name in seen:
+            return
+        seen.add(name)
+        mtype, help_text = _help.get(name, (default_type, ""))
+        if help_text:
+            lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {mtype}")
+
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(_histograms.items(), key=lambda kv: kv[0])
+        hist_data = [(k, h.buckets, list(h.counts), h.sum, h.count) for k, h in histograms]
+
+    for (name, labels), v in counters:
+        header(name, "counter")
+        lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(v)}")
+
+    for (name, labels), buckets, counts, total, count in hist_data:
+        header(name, "histogram")
+        cum = 0
+        for bound, c in zip(buckets, counts):
+            cum += c
+            lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', _fmt_value(bound))])} {cum}")
+        lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+
+    for name, (mtype, fn) in sorted(_callbacks.items()):
+        try:
+            value = fn()
+        except Exception:
+            continue
+        if value is None:
+            continue
+        header(name, mtype)
+        if isinstance(value, dict):
+            for labels, v in sorted(value.items()):
+                lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(v)}")
+        else:
+            lines.append(f"{name} {_fmt_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 스크랩 요청마다 로그 남기지 않음
+
+
+def start_http_server(port: int, addr: str = "127.0.0.1"):
+    """/metrics HTTP 서버를 데몬 스레드로 시작 (port<=0 이면 비활성, 중복 호출 안전)"""
+    global _server
+    if port <= 0 or _server is not None:
+        return _server
+    try:
+        _server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    except OSError as e:
+        print(f"[METRICS] HTTP 서버 시작 실패 ({addr}:{port}): {e}")
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    print(f"[METRICS] http://{addr}:{port}/metrics")
+    return _server
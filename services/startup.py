@@ -0,0 +1,251 @@
+# services/startup.py
+"""
+부팅 오케스트레이션 (등록 확인 / 시리얼 열기 / GUI 생성 병렬화)
+
+- begin(): 등록 확인과 시리얼 열기를 워커 스레드에서 바로 시작 (GUI 생성과 동시에 진행)
+- 등록 상태는 data/registration.json 에 캐시 → 마지막에 등록돼 있었으면 기다리지 않고
+  진행하고, 실제 확인은 백그라운드에서 수행해 캐시 갱신
+- 단계별 소요 시간 + 프로세스 시작 → 준비 완료 시간을 메트릭으로 노출하고 1회 출력
+- python main.py --profile-startup: -X importtime 으로 재실행해 import/첫 프레임 시간 기록
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from services import metrics
+from services.api_client import get_machine_registration
+
+REG_PATH = Path("data/registration.json")
+PROFILE_LOG = Path("logs/startup_profile.jsonl")
+PROFILE_ENV = "TDB_PROFILE_STARTUP"       # 자식 프로세스 표시 + 결과 파일 경로
+PROFILE_TIMEOUT_SEC = 30                  # 준비 완료를 못 하더라도 이 시간 뒤 종료
+
+# 준비 완료 판단: 이 단계들이 모두 끝나면 boot-to-ready 기록
+READY_PHASES = ("gui_build", "registration", "serial_open", "first_poll")
+
+
+def _process_age() -> float:
+    """프로세스 시작 후 경과 시간 (import 시간 포함, Linux 외에는 0)"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0.0
+
+
+def load_registration(machine_id: str):
+    """캐시된 등록 여부 (다른 기기 ID로 저장됐거나 없으면 None)"""
+    try:
+        data = json.loads(REG_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("machine_id") != machine_id:
+        return None
+    return bool(data.get("registered"))
+
+
+def save_registration(machine_id: str, registered: bool):
+    try:
+        REG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = REG_PATH.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"machine_id": machine_id, "registered": registered,
+                                   "checked_at": int(time.time())}), encoding="utf-8")
+        tmp.replace(REG_PATH)
+    except OSError as e:
+        print(f"[STARTUP] registration cache write failed: {e}")
+
+
+class Startup:
+    def __init__(self, machine_id: str, ready_phases=READY_PHASES):
+        self.machine_id = machine_id
+        self.t0 = time.monotonic() - _process_age()
+        self.ready_phases = tuple(ready_phases)
+        self._lock = threading.Lock()
+        self._phases = {}          # name -> (start, end)  (t0 기준 초)
+        self._ready_at = None
+        self._pool = None
+        self.registration = None   # Future[bool]
+        self.serial = None         # Future[serial.Serial]
+
+        metrics.register_callback("tdb_startup_phase_seconds", self._phase_durations, "gauge",
+                                  "Duration of each startup phase")
+        metrics.register_callback("tdb_startup_ready_seconds", lambda: self._ready_at, "gauge",
+                                  "Process start to dashboard ready (registration, serial, GUI and first poll done)")
+
+    # --- 병렬 시작 ---
+    def begin(self, open_serial_fn=None):
+        """등록 확인 + 시리얼 열기를 백그라운드에서 시작 (open_serial_fn 없으면 등록만)"""
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="startup")
+        self.registration = self._pool.submit(self._timed, "registration", self._check_registration)
+        if open_serial_fn is not None:
+            self.serial = self._pool.submit(self._timed, "serial_open", open_serial_fn)
+        else:
+            self.ready_phases = tuple(p for p in self.ready_phases if p != "serial_open")
+        self._pool.shutdown(wait=False)
+
+    def _timed(self, name, fn):
+        start = time.monotonic()
+        try:
+            return fn()
+        finally:
+            self.mark(name, start)
+
+    def _check_registration(self) -> bool:
+        cached = load_registration(self.machine_id)
+        if cached:
+            # 마지막에 등록돼 있었음 → 바로 진행, 확인은 백그라운드
+            threading.Thread(target=self.check_registration_live, daemon=True).start()
+            print("[STARTUP] 등록 상태 캐시 사용 (백그라운드 재확인)")
+            return True
+        return self.check_registration_live()
+
+    def check_registration_live(self) -> bool:
+        registered = get_machine_registration(self.machine_id)
+        if registered is None:
+            # 서버 응답 없음 → 캐시 유지
+            return bool(load_registration(self.machine_id))
+        if registered != load_registration(self.machine_id):
+            if not registered:
+                print("[STARTUP] ⚠️ 서버 확인 결과 미등록 기기 (등록 캐시 해제)")
+            save_registration(self.machine_id, registered)
+        return registered
+
+    # --- 타이밍 ---
+    @contextmanager
+    def phase(self, name: str):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.mark(name, start)
+
+    def mark(self, name: str, start: float = None, end: float = None):
+        """단계 기록 (monotonic). start 생략 시 프로세스 시작부터"""
+        end = time.monotonic() if end is None else end
+        start = self.t0 if start is None else start
+        with self._lock:
+            if name in self._phases:
+                return
+            self._phases[name] = (start - self.t0, end - self.t0)
+            done = self._ready_at is None and all(p in self._phases for p in self.ready_phases)
+            if done:
+                self._ready_at = max(self._phases[p][1] for p in self.ready_phases)
+        if done:
+            print(self.report())
+
+    def _phase_durations(self):
+        with self._lock:
+            return {(("phase", name),): e - s for name, (s, e) in self._phases.items()}
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return self._ready_at is not None
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "phases": {k: [round(s * 1000, 1), round(e * 1000, 1)] for k, (s, e) in self._phases.items()},
+                "ready_ms": None if self._ready_at is None else round(self._ready_at * 1000, 1),
+            }
+
+    def report(self) -> str:
+        with self._lock:
+            phases = sorted(self._phases.items(), key=lambda kv: kv[1][0])
+            ready = self._ready_at
+        lines = ["[STARTUP] 부팅 단계별 시간 (프로세스 시작 기준)"]
+        for name, (s, e) in phases:
+            lines.append(f"  {name:<14} {s * 1000:8.0f}ms → {e * 1000:8.0f}ms  ({(e - s) * 1000:.0f}ms)")
+        if ready is not None:
+            lines.append(f"  {'ready':<14} {ready * 1000:8.0f}ms")
+        return "\n".join(lines)
+
+
+# ---------------------------
+# --profile-startup: -X importtime + 첫 프레임/준비 완료 시간 기록
+# ---------------------------
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(text: str):
+    """-X importtime 출력 → [(모듈, self_us, cumulative_us, depth)] (파싱 안 되는 줄은 무시)"""
+    rows = []
+    for line in text.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return rows
+
+
+def profiling_output():
+    """프로파일 자식 프로세스면 결과 파일 경로, 아니면 None"""
+    return os.environ.get(PROFILE_ENV) or None
+
+
+def run_profiled(argv, top: int = 15) -> int:
+    """
+    부모: 같은 인자로 `python -X importtime` 자식 실행 → 자식은 준비 완료(또는 타임아웃) 후 종료
+    import 시간 상위 모듈 + 단계별 시간을 출력하고 logs/startup_profile.jsonl 에 1줄 추가
+    """
+    out_path = Path("data/startup_profile.tmp.json")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.unlink(missing_ok=True)
+    env = dict(os.environ, **{PROFILE_ENV: str(out_path.resolve())})
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv], env=env,
+                          stderr=subprocess.PIPE, text=True)
+
+    imports = parse_importtime(proc.stderr)
+    other = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+    if other:
+        print("\n".join(other), file=sys.stderr)
+    try:
+        child = json.loads(out_path.read_text(encoding="utf-8"))
+        out_path.unlink(missing_ok=True)
+    except (OSError, ValueError):
+        child = {}
+
+    top_level = [r for r in imports if r[3] == 0]
+    slowest = sorted(top_level, key=lambda r: r[2], reverse=True)[:top]
+    record = {
+        "ts": int(time.time()),
+        "import_total_ms": round(sum(r[2] for r in top_level) / 1000, 1),
+        "first_frame_ms": (child.get("phases", {}).get("first_frame") or [None, None])[1],
+        "ready_ms": child.get("ready_ms"),
+        "phases": child.get("phases", {}),
+        "top_imports": [[name, round(cum / 1000, 1)] for name, _, cum, _ in slowest],
+        "exit_code": proc.returncode,
+    }
+
+    print("\n[PROFILE] import 시간 상위 (cumulative)")
+    for name, ms in record["top_imports"]:
+        print(f"  {ms:8.1f}ms  {name}")
+    print(f"[PROFILE] import 합계: {record['import_total_ms']}ms")
+    print(f"[PROFILE] 첫 프레임: {record['first_frame_ms']}ms / 준비 완료: {record['ready_ms']}ms")
+    for name, (s, e) in sorted(record["phases"].items(), key=lambda kv: kv[1][0]):
+        print(f"  {name:<14} {s:8.0f}ms → {e:8.0f}ms")
+
+    PROFILE_LOG.parent.mkdir(parents=True, exist_ok=True)
+    with PROFILE_LOG.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    print(f"[PROFILE] 기록: {PROFILE_LOG}")
+    return proc.returncode
+
+
+def write_profile(startup: "Startup", path: str):
+    """자식: 단계별 시간 + lazy 모듈 로드 시간 기록"""
+    from services.lazy_import import load_times
+    data = startup.summary()
+    data["lazy_loads_ms"] = {k: round(v * 1000, 1) for k, v in load_times().items()}
+    try:
+        Path(path).write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    except OSError as e:
+        print(f"[PROFILE] result write failed: {e}")
@@ -0,0 +1,153 @@
+# services/tracing.py
+"""
+배출 세션 단위 트레이스 (태그 → 배출 완료까지 단계별 span)
+
+- start_session() 으로 세션 트레이스 생성, span()/add() 로 단계 기록
+- finish() 시 data/traces.jsonl 링 버퍼에 한 줄(압축 JSON)로 저장
+- 조회/분석은 scripts/trace_report.py 참고
+"""
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from config import settings
+from services import metrics
+
+TRACE_PATH = Path("data/traces.jsonl")
+
+_file_lock = threading.Lock()
+_line_count = None  # 파일 줄 수 캐시 (최초 append 시 계산)
+
+metrics.describe("tdb_session_stage_seconds", "histogram", "Dispense session stage duration")
+
+
+class Trace:
+    def __init__(self, start: float = None, **attrs):
+        self.session_id = uuid.uuid4().hex[:12]
+        self.t0 = start if start is not None else time.monotonic()
+        self.wall = time.time() - (time.monotonic() - self.t0)
+        self.attrs = dict(attrs)
+        self.spans = []
+        self._finished = False
+
+    def add(self, name: str, start: float, end: float = None, **attrs):
+        """monotonic 시각 기준 span 추가 (end 생략 시 현재)"""
+        end = time.monotonic() if end is None else end
+        self.spans.append({
+            "n": name,
+            "s": round((start - self.t0) * 1000, 1),
+            "d": round((end - start) * 1000, 1),
+            **({"a": attrs} if attrs else {}),
+        })
+        metrics.observe("tdb_session_stage_seconds", end - start, stage=name)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        start = time.monotonic()
+        try:
+            yield attrs  # 블록 안에서 attrs에 결과 필드 추가 가능
+        finally:
+            self.add(name, start, **attrs)
+
+    def finish(self, result: str, **attrs):
+        """세션 종료 → 링 버퍼에 기록 (중복 호출 무시)"""
+        if self._finished:
+            return
+        self._finished = True
+        self.attrs.update(attrs)
+        record = {
+            "id": self.session_id,
+            "ts": round(self.wall, 3),
+            "total": round((time.monotonic() - self.t0) * 1000, 1),
+            "result": result,
+            "attrs": self.attrs,
+            "spans": self.spans,
+        }
+        try:
+            _append(record)
+        except Exception as e:
+            print(f"[TRACE] 기록 실패: {e}")
+
+
+class _NullTrace:
+    """트레이스 비활성/미지정 시 사용하는 no-op 객체"""
+    session_id = None
+
+    def add(self, *args, **kwargs):
+        pass
+
+    @contextmanager
+    def span(self, name, **attrs):
+        yield attrs
+
+    def finish(self, *args, **kwargs):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+def start_session(start: float = None, **attrs):
+    if not settings.TRACE_ENABLED:
+        return NULL_TRACE
+    return Trace(start=start, **attrs)
+
+
+def _append(record: dict):
+    """JSONL append, 최대 개수의 1.25배를 넘으면 최근 TRACE_MAX_SESSIONS개만 남기고 압축"""
+    global _line_count
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+    limit = settings.TRACE_MAX_SESSIONS
+    with _file_lock:
+        TRACE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        if _line_count is None:
+            _line_count = _count_lines()
+        with TRACE_PATH.open("a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        _line_count += 1
+        if _line_count > limit + max(1, limit // 4):
+            lines = TRACE_PATH.read_text(encoding="utf-8").splitlines()[-limit:]
+            tmp = TRACE_PATH.with_suffix(".jsonl.tmp")
+            tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+            tmp.replace(TRACE_PATH)
+            _line_count = len(lines)
+
+
+def _count_lines() -> int:
+    if not TRACE_PATH.exists():
+        return 0
+    with TRACE_PATH.open("r", encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def load_recent(n: int, path: Path = None) -> list:
+    """최근 n개 세션 트레이스 (오래된 것 → 최신 순)"""
+    path = path or TRACE_PATH
+    if not path.exists():
+        return []
+    out = []
+    for line in path.read_text(encoding="utf-8").splitlines()[-n:]:
+        try:
+            out.append(json.loads(line))
+        except ValueError:
+            continue
+    return out
+
+
+def stage_totals(trace: dict) -> dict:
+    """세션 1건의 단계별 합계(ms) — 같은 단계가 여러 번이면 합산"""
+    totals = {}
+    for sp in trace.get("spans", []):
+        totals[sp["n"]] = totals.get(sp["n"], 0.0) + sp["d"]
+    return totals
+
+
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    data = sorted(values)
+    idx = min(len(data) - 1, max(0, int(round(q * (len(data) - 1)))))
+    return data[idx]
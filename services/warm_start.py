@@ -0,0 +1,95 @@
+# services/warm_start.py
+"""
+대시보드 웜 스타트 스냅샷 (data/warm_start.json)
+
+- 폴링으로 받은 마지막 정상 데이터(users/slots/schedules/history) + 캐러셀 위치 보관
+- update()는 메모리만 갱신, 디스크 기록은 백그라운드에서 WARM_SNAPSHOT_MIN_SEC 간격으로 합쳐서 1회
+- 부팅 시 load() → 네트워크 호출 전에 첫 화면을 이전 데이터(stale 표시)로 그림
+"""
+import atexit
+import json
+import threading
+import time
+from pathlib import Path
+
+from config import settings
+
+WARM_PATH = Path("data/warm_start.json")
+KINDS = ("users", "slots", "schedules", "history")
+
+_lock = threading.Condition()
+_data = {}            # kind -> list, "carousel_stage" -> int, "saved_at" -> float
+_version = 0
+_written_version = 0
+_started = False
+
+
+def load(path: Path = WARM_PATH) -> dict:
+    """스냅샷 읽기 (없거나 깨졌으면 빈 dict). 읽은 값은 이후 update의 기준이 됨"""
+    global _data
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if not isinstance(data, dict):
+            return {}
+    except (OSError, ValueError):
+        return {}
+    with _lock:
+        if not _data:
+            _data = dict(data)
+    return data
+
+
+def update(kind: str, value):
+    """폴링 스레드 등에서 호출: 최신 값 반영 (디스크 기록은 합쳐서 나중에)"""
+    global _version
+    if not settings.WARM_START_ENABLED:
+        return
+    _ensure_started()
+    with _lock:
+        if _data.get(kind) == value:
+            return
+        _data[kind] = value
+        _data["saved_at"] = time.time()
+        _version += 1
+        _lock.notify_all()
+
+
+def get(kind: str, default=None):
+    with _lock:
+        return _data.get(kind, default)
+
+
+def flush(path: Path = WARM_PATH):
+    global _written_version
+    with _lock:
+        if _version == _written_version:
+            return
+        payload, version = json.dumps(_data, ensure_ascii=False, separators=(",", ":")), _version
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        tmp.replace(path)
+        with _lock:
+            _written_version = max(_written_version, version)
+    except OSError as e:
+        print(f"[WARM_START] snapshot write failed: {e}")
+
+
+def _ensure_started():
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_writer_loop, daemon=True).start()
+    atexit.register(flush)
+
+
+def _writer_loop():
+    while True:
+        with _lock:
+            while _version == _written_version:
+                _lock.wait()
+        flush()
+        time.sleep(settings.WARM_SNAPSHOT_MIN_SEC)
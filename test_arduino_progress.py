@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+펌웨어 진행 줄(PROG) 파싱 / 정지 조기 감지 테스트
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from hwserial import arduino_link, timing_model
+from hwserial.arduino_link import Progress, parse_progress
+
+# 명령 소요 시간 기록이 실제 data/timing_model.json 에 섞이지 않도록
+timing_model.MODEL_PATH = Path(tempfile.mkdtemp()) / "timing_model.json"
+
+class FakeSerial:
+    """(지연초, 줄) 목록을 순서대로 내보내는 가짜 시리얼"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.written = []
+        self._t = None
+
+    @property
+    def in_waiting(self):
+        return 0
+
+    def reset_input_buffer(self):
+        pass
+
+    def write(self, data):
+        self.written.append(data)
+        self._t = time.monotonic()
+
+    def flush(self):
+        pass
+
+    def readline(self):
+        if self.script and time.monotonic() - self._t >= self.script[0][0]:
+            self._t = time.monotonic()
+            return (self.script.pop(0)[1] + "\n").encode()
+        time.sleep(0.005)
+        return b""
+
+def test_parse_progress():
+    """PROG 형식별 파싱, 그 외 줄은 None (OK/ERR/UID 기존 처리 유지)"""
+    print("=" * 60)
+    print("Test 1: 진행 줄 파싱")
+    print("=" * 60)
+
+    assert parse_progress("PROG,DISPENSE,2,1,3") == Progress("DISPENSE", slot=2, done=1, total=3)
+    assert parse_progress("PROG,STEP,START,0") == Progress("STEP", edge="START", stage=0)
+    assert parse_progress("PROG,HOME,END,0") == Progress("HOME", edge="END", stage=0)
+    assert parse_progress("PROG,DISPENSE,x,1,3") == Progress("DISPENSE")   # 깨진 숫자 → 진행 신호만
+    assert parse_progress("PROG,NEWTHING") == Progress("NEWTHING")          # 모르는 형식도 무시 안 함
+    for line in ("OK,1,3", "ERR,DISPENSE,1,3", "6CEFECBF", "READY", "PROGRESS"):
+        assert parse_progress(line) is None
+    print("✅ 통과")
+
+def test_progress_callbacks_and_stall():
+    """진행 콜백 전달, 진행이 멈추면 전체 타임아웃 전에 ERR,STALL (나온 개수 포함)"""
+    print("=" * 60)
+    print("Test 2: 진행 콜백 / 정지 감지")
+    print("=" * 60)
+
+    seen = []
+    ser = FakeSerial([(0.0, "PROG,DISPENSE,1,0,2"), (0.05, "PROG,DISPENSE,1,1,2"),
+                      (0.05, "PROG,DISPENSE,1,2,2"), (0.0, "OK,1,2")])
+    ok, resp = arduino_link._send_cmd_wait(ser, "DISPENSE,1,2", timeout=5.0, stall=0.5, on_progress=seen.append)
+    assert ok and resp == "OK,1,2"
+    assert [p.done for p in seen] == [0, 1, 2]
+
+    # 1개 나온 뒤 완전히 멈춤 → stall(0.2초) 뒤 실패, 진행 간격 2번(0.4초) 조용하면 포기
+    # (전체 타임아웃 5초를 기다리지 않음)
+    ser = FakeSerial([(0.0, "PROG,DISPENSE,3,0,2"), (0.05, "PROG,DISPENSE,3,1,2")])
+    t0 = time.monotonic()
+    ok, resp = arduino_link._send_cmd_wait(ser, "DISPENSE,3,2", timeout=5.0, stall=0.2)
+    assert not ok and resp == "ERR,STALL,3,1,2"
+    assert 0.6 <= time.monotonic() - t0 < 1.2
+    print("✅ 통과")
+
+def test_resync_after_give_up():
+    """NO_ACK/STALL 뒤에도 펌웨어는 계속 동작 → 최종 응답까지 읽어 재시도 중복 배출 방지"""
+    print("=" * 60)
+    print("Test 2-1: 실패 후 재동기화")
+    print("=" * 60)
+
+    arduino_link._progress_seen = True
+    orig_ack = arduino_link.settings.PROG_ACK_SEC
+    arduino_link.settings.PROG_ACK_SEC = 0.2
+    try:
+        # 수신 확인 줄이 PROG_ACK_SEC보다 늦게 옴 → NO_ACK로 끝내지 않고 실제 결과 반환
+        seen = []
+        ser = FakeSerial([(0.3, "PROG,DISPENSE,1,0,2"), (0.05, "PROG,DISPENSE,1,1,2"),
+                          (0.05, "PROG,DISPENSE,1,2,2"), (0.0, "OK,1,2")])
+        ok, resp = arduino_link.dispense(ser, 1, 2, on_progress=seen.append)
+        assert ok and resp == "OK,1,2" and [p.done for p in seen] == [0, 1, 2]
+        assert len(ser.written) == 1
+
+        # 정지로 판단한 뒤에 나온 약도 진행 콜백으로 들어옴 (남은 개수 = 개수 - 마지막 진행)
+        seen = []
+        ser = FakeSerial([(0.0, "PROG,DISPENSE,2,0,3"), (0.3, "PROG,DISPENSE,2,1,3"),
+                          (0.05, "ERR,DISPENSE,2,3")])
+        ok, resp = arduino_link._send_cmd_wait(ser, "DISPENSE,2,3", timeout=1.0, stall=0.2,
+                                               on_progress=seen.append)
+        assert not ok and resp == "ERR,DISPENSE,2,3"
+        assert seen[-1].done == 1
+    finally:
+        arduino_link.settings.PROG_ACK_SEC = orig_ack
+    print("✅ 통과")
+
+def test_old_firmware_compatible():
+    """진행 줄 없는 구 펌웨어: 진행 없이 기존처럼 OK 반환"""
+    print("=" * 60)
+    print("Test 3: 구 펌웨어 호환")
+    print("=" * 60)
+
+    arduino_link._progress_seen = False
+    ser = FakeSerial([(0.1, "OK,2,1")])
+    assert arduino_link._send_cmd_wait(ser, "DISPENSE,2,1", timeout=2.0, stall=0.05) == (True, "OK,2,1")
+    print("✅ 통과")
+
+if __name__ == "__main__":
+    test_parse_progress()
+    test_progress_callbacks_and_stall()
+    test_resync_after_give_up()
+    test_old_firmware_compatible()
+    print("\n🎉 모든 진행 줄 테스트 통과")
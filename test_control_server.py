@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+하드웨어 제어 소켓 / 시리얼 중재 테스트
+"""
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from config import settings
+from hwserial import arduino_link, control_client, control_server, state_bus, timing_model
+from hwserial.control_server import SerialArbiter, SerialBusy
+
+# 명령 소요 시간 기록이 실제 data/timing_model.json 에 섞이지 않도록
+timing_model.MODEL_PATH = Path(tempfile.mkdtemp()) / "timing_model.json"
+
+from test_arduino_progress import FakeSerial
+
+
+class ReadyFakeSerial(FakeSerial):
+    """send_raw는 in_waiting을 보고 읽으므로 남은 줄이 있으면 1"""
+
+    @property
+    def in_waiting(self):
+        return 1 if self.script and self._t is not None else 0
+
+
+def test_arbiter():
+    """세션 중 유지보수는 기다리다 BUSY, 유지보수가 기다리면 세션 경로가 양보"""
+    print("=" * 60)
+    print("Test 1: 시리얼 중재")
+    print("=" * 60)
+
+    arb = SerialArbiter()
+    with arb.session():
+        assert arb.owner == "session"
+        t0 = time.monotonic()
+        try:
+            with arb.maintenance(0.1):
+                raise AssertionError("세션 중에 잡히면 안 됨")
+        except SerialBusy as e:
+            assert e.owner == "session" and time.monotonic() - t0 >= 0.1
+    assert arb.owner is None
+
+    # 유지보수가 잡고 있는 동안 + 기다리는 동안 태그 읽기(session)는 대기
+    order = []
+    release = threading.Event()
+
+    def maint():
+        with arb.maintenance(1.0):
+            order.append("maintenance")
+            release.wait(1.0)
+
+    def read_tag():
+        with arb.session("idle"):
+            order.append("idle")
+
+    th = threading.Thread(target=maint)
+    th.start()
+    time.sleep(0.05)
+    reader = threading.Thread(target=read_tag)
+    reader.start()
+    time.sleep(0.05)
+    assert order == ["maintenance"] and arb.owner == "maintenance"
+    release.set()
+    th.join()
+    reader.join(1.0)
+    assert order == ["maintenance", "idle"] and arb.owner is None
+    print("✅ 통과")
+
+
+def test_handle_whitelist():
+    """진단 명령만 허용 (DISPENSE/모르는 op 거절)"""
+    print("\n" + "=" * 60)
+    print("Test 2: 허용 명령")
+    print("=" * 60)
+
+    ser = ReadyFakeSerial([])
+    assert control_server.handle(ser, {"op": "send", "line": "DISPENSE,1,1"})["resp"] == "ERR,NOT_ALLOWED,DISPENSE"
+    assert control_server.handle(ser, {"op": "format"})["resp"] == "ERR,UNKNOWN_OP,format"
+    assert ser.written == []
+    assert control_server.handle(ser, {"op": "ping"})["ok"]
+    print("✅ 통과")
+
+
+def test_socket_roundtrip():
+    """스크립트 → 소켓 → 키오스크 시리얼 (포트 다시 열지 않음), 소켓 없으면 직접 열기로"""
+    print("\n" + "=" * 60)
+    print("Test 3: 소켓 왕복")
+    print("=" * 60)
+
+    path = str(Path(tempfile.mkdtemp()) / "control.sock")
+    ser = ReadyFakeSerial([(0, "TESTING_LOADING,1"), (0, "OK,TEST_SOLENOID,1,L")])
+    srv = control_server.start(ser, path)
+    try:
+        with control_client.connect(path) as link:
+            ok, resp = control_client.send_raw(link, "test_solenoid,1,L", timeout=2.0)
+            assert ok and resp == "OK,TEST_SOLENOID,1,L"
+            assert ser.written == [b"TEST_SOLENOID,1,L\n"]
+            ok, resp = control_client.send_raw(link, "DISPENSE,1,1")
+            assert not ok and resp.startswith("ERR,NOT_ALLOWED")
+    finally:
+        srv.close()
+
+    assert control_client.connect(str(Path(path).with_name("missing.sock"))) is None
+
+    # 깨진 응답 줄은 예외 대신 ERR,CONTROL
+    for garbage in (b"not json\n", b"\xff\xfe\n", b"[1]\n"):
+        a, b = socket.socketpair()
+        with control_client.ControlClient(a, "pair") as link:
+            b.sendall(garbage)
+            ok, resp = link.request({"op": "ping"}, timeout=1)
+            assert not ok and resp.startswith("ERR,CONTROL,bad reply"), resp
+        b.close()
+    print("✅ 통과")
+
+
+def test_open_link_fallback():
+    """소켓 경로는 프로젝트 루트 기준, 시리얼 직접 열기는 포트를 아무도 안 잡았을 때만"""
+    print("\n" + "=" * 60)
+    print("Test 4: 연결 방식 선택")
+    print("=" * 60)
+
+    root = Path(control_server.__file__).resolve().parents[1]
+    assert control_server.socket_path("data/control.sock") == str(root / "data" / "control.sock")
+    assert control_server.socket_path("/tmp/x.sock") == "/tmp/x.sock"
+    assert control_server.socket_path("") == ""
+    # 상태 버스 소켓도 같은 기준 (GUI/qr_display와 서비스가 같은 경로를 봄)
+    assert settings.project_path("data/state.sock") == str(root / "data" / "state.sock")
+    assert state_bus.bus._socket_path == settings.project_path(settings.STATE_SOCKET_PATH)
+
+    fake_port = Path(tempfile.mkdtemp()) / "ttyACM0"
+    fake_port.write_text("")
+    opened = []
+    orig = (settings.CONTROL_SOCKET_PATH, arduino_link.autodetect_port, arduino_link.open_serial)
+    settings.CONTROL_SOCKET_PATH = str(fake_port.with_name("missing.sock"))
+    arduino_link.autodetect_port = lambda: str(fake_port)
+    arduino_link.open_serial = lambda baud_rate=9600: opened.append(baud_rate) or "serial"
+    try:
+        # 포트를 다른 곳(여기선 이 프로세스)이 열고 있음 → 직접 열지 않음
+        with fake_port.open() as _held:
+            try:
+                control_client.open_link()
+                raise AssertionError("포트 사용 중인데 열면 안 됨")
+            except IOError as e:
+                assert str(fake_port) in str(e)
+        assert opened == []
+        # 아무도 안 잡음 → 서비스 꺼짐으로 보고 직접 열기
+        assert control_client.open_link() == "serial" and opened == [9600]
+    finally:
+        settings.CONTROL_SOCKET_PATH, arduino_link.autodetect_port, arduino_link.open_serial = orig
+    print("✅ 통과")
+
+
+if __name__ == "__main__":
+    test_arbiter()
+    test_handle_whitelist()
+    test_socket_roundtrip()
+    test_open_link_fallback()
+    print("\n🎉 제어 소켓 테스트 모두 통과")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+여러 슬롯 동시 배출 (MULTI) 테스트
+"""
+import tempfile
+from pathlib import Path
+
+from config import settings
+from hwserial import arduino_link, serial_reader, session_journal, timing_model
+from hwserial.arduino_link import parse_multi_reply
+from services import logging_setup
+
+# 명령 소요 시간 기록이 실제 data/timing_model.json 에 섞이지 않도록
+timing_model.MODEL_PATH = Path(tempfile.mkdtemp()) / "timing_model.json"
+session_journal.JOURNAL_PATH = Path(tempfile.mkdtemp()) / "session_journal.jsonl"
+logging_setup.LOG_DIR = tempfile.mkdtemp()
+
+from test_arduino_progress import FakeSerial
+
+
+def test_parse_multi_reply():
+    """OK,MULTI 응답 → 슬롯별 배출 개수 (다른 응답은 빈 dict)"""
+    print("=" * 60)
+    print("Test 1: MULTI 응답 파싱")
+    print("=" * 60)
+
+    assert parse_multi_reply("OK,MULTI,1:2,3:1") == {1: 2, 3: 1}
+    assert parse_multi_reply("OK,MULTI,1:2,x:1") == {1: 2}
+    for resp in ("OK,1,2", "ERR,UNKNOWN,MULTI,2,1:2", "TIMEOUT", ""):
+        assert parse_multi_reply(resp) == {}
+    print("✅ 통과")
+
+
+def test_dispense_multi_wire():
+    """명령 형식 / 진행 줄로 슬롯별 개수 추적 / 구 펌웨어면 미지원 기억"""
+    print("\n" + "=" * 60)
+    print("Test 2: dispense_multi 송수신")
+    print("=" * 60)
+
+    arduino_link._multi_supported = None
+    seen = []
+    ser = FakeSerial([(0, "PROG,DISPENSE,1,0,2"), (0, "PROG,DISPENSE,3,0,1"),
+                      (0.01, "PROG,DISPENSE,1,1,2"), (0.01, "PROG,DISPENSE,3,1,1"),
+                      (0.01, "PROG,DISPENSE,1,2,2"), (0, "OK,MULTI,1:2,3:1")])
+    ok, resp, done = arduino_link.dispense_multi(ser, [(1, 2), (3, 1)], concurrency=2, on_progress=seen.append)
+    assert ser.written[0] == b"MULTI,2,1:2,3:1\n"
+    assert ok and done == {1: 2, 3: 1}
+    assert len(seen) == 5 and arduino_link.multi_supported()
+
+    # 동시 수는 아이템 수를 넘지 않음
+    ser = FakeSerial([(0, "OK,MULTI,1:1,2:1")])
+    arduino_link.dispense_multi(ser, [(1, 1), (2, 1)], concurrency=5)
+    assert ser.written[0] == b"MULTI,2,1:1,2:1\n"
+
+    # 구 펌웨어: DISPENSE로 오인하지 않고 UNKNOWN → 이후 순차
+    ser = FakeSerial([(0, "ERR,UNKNOWN,MULTI,2,1:1,2:1")])
+    ok, resp, done = arduino_link.dispense_multi(ser, [(1, 1), (2, 1)])
+    assert not ok and done == {} and not arduino_link.multi_supported()
+    arduino_link._multi_supported = None
+    print("✅ 통과")
+
+
+def test_batch_allocation():
+    """같은 슬롯 아이템은 합쳐 보내고, 덜 나온 개수는 뒤 아이템부터 부족으로 남김"""
+    print("\n" + "=" * 60)
+    print("Test 3: 시간대 묶음 배출 → 아이템별 배분")
+    print("=" * 60)
+
+    calls = []
+
+    def fake_multi(ser, items, concurrency, on_progress):
+        calls.append(list(items))
+        return False, "ERR,STALL,2,1,3", {1: 1, 2: 1}
+
+    orig = serial_reader.dispense_multi
+    orig_conc = settings.DISPENSE_CONCURRENCY
+    serial_reader.dispense_multi = fake_multi
+    settings.DISPENSE_CONCURRENCY = 2
+    try:
+        items = [{"slot": 1, "count": 1, "user_id": "a"},
+                 {"slot": 2, "count": 1, "user_id": "a"},
+                 {"slot": 2, "count": 2, "user_id": "b"},
+                 {"slot": 3, "count": 1, "short": True}]
+        _, batched = serial_reader._dispense_batch(None, None, None, "morning", items, serial_reader.tracing.NULL_TRACE)
+        assert calls == [[(1, 1), (2, 3)]]            # 재고 부족 아이템은 보내지 않음
+        assert {k: v[0] for k, v in batched.items()} == {0: 1, 1: 1, 2: 0}
+        assert 3 not in batched
+
+        # 슬롯 1개뿐이거나 동시 배출 꺼짐 → 순차 (MULTI 안 보냄)
+        calls.clear()
+        assert serial_reader._dispense_batch(None, None, None, "morning", items[1:3],
+                                             serial_reader.tracing.NULL_TRACE)[1] == {}
+        settings.DISPENSE_CONCURRENCY = 1
+        assert serial_reader._dispense_batch(None, None, None, "morning", items,
+                                             serial_reader.tracing.NULL_TRACE)[1] == {}
+        assert calls == []
+    finally:
+        serial_reader.dispense_multi = orig
+        settings.DISPENSE_CONCURRENCY = orig_conc
+    print("✅ 통과")
+
+
+def test_batch_timeout_resync():
+    """묶음 배출이 마감을 넘겨도 펌웨어가 계속 진행 중이면 끝까지 읽음 → 순차 재시도가 겹치지 않음"""
+    print("\n" + "=" * 60)
+    print("Test 4: 묶음 배출 마감 초과 후 재동기화")
+    print("=" * 60)
+
+    items = [{"slot": 1, "count": 2, "user_id": "a"}, {"slot": 3, "count": 1, "user_id": "a"}]
+    orig_deadline = timing_model.deadline
+    orig_conc = settings.DISPENSE_CONCURRENCY
+    timing_model.deadline = lambda *a, **kw: 0.3        # 마감/정지 한도 0.3초
+    settings.DISPENSE_CONCURRENCY = 2
+    arduino_link._multi_supported = None
+    try:
+        # 정지로 판단한 뒤(0.45초 공백)에도 약이 계속 나오고 최종 OK까지 옴
+        ser = FakeSerial([(0, "PROG,DISPENSE,1,0,2"), (0, "PROG,DISPENSE,3,0,1"),
+                          (0.45, "PROG,DISPENSE,1,1,2"), (0.05, "PROG,DISPENSE,3,1,1"),
+                          (0.05, "PROG,DISPENSE,1,2,2"), (0, "OK,MULTI,1:2,3:1")])
+        _, batched = serial_reader._dispense_batch(ser, None, None, "morning", items,
+                                                   serial_reader.tracing.NULL_TRACE)
+        assert {k: v[0] for k, v in batched.items()} == {0: 2, 1: 1}
+        assert ser.written == [b"MULTI,2,1:2,3:1\n"]            # 뒤이은 DISPENSE 없음
+
+        # 정지 후 1개 더 나오고 펌웨어가 조용해짐 → 마지막 진행 개수 기준 (남은 것만 순차 재시도)
+        ser = FakeSerial([(0, "PROG,DISPENSE,1,0,2"), (0, "PROG,DISPENSE,3,0,1"),
+                          (0.45, "PROG,DISPENSE,3,1,1")])
+        _, batched = serial_reader._dispense_batch(ser, None, None, "morning", items,
+                                                   serial_reader.tracing.NULL_TRACE)
+        assert {k: v[0] for k, v in batched.items()} == {0: 0, 1: 1}
+        assert batched[0][1].startswith("ERR,STALL")
+    finally:
+        timing_model.deadline = orig_deadline
+        settings.DISPENSE_CONCURRENCY = orig_conc
+        arduino_link._multi_supported = None
+    print("✅ 통과")
+
+
+if __name__ == "__main__":
+    test_parse_multi_reply()
+    test_dispense_multi_wire()
+    test_batch_allocation()
+    test_batch_timeout_resync()
+    print("\n🎉 동시 배출 테스트 모두 통과")
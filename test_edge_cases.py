@@ -3,7 +3,13 @@
 엣지 케이스 테스트
 """
 
+import tempfile
+
 from hwserial.serial_reader import filter_phases_by_time
+from services import logging_setup
+
+# 테스트 로그가 실제 logs/serial_reader.log 에 섞이지 않도록
+logging_setup.LOG_DIR = tempfile.mkdtemp()
 
 def test_edge_case_1():
     """엣지 케이스 1: 빈 phases 배열"""
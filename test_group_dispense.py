@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+가족 세션 큐 합치기 테스트 (스테이지당 1회 방문 / 사용자별 보고 정보)
+"""
+
+import tempfile
+
+from hwserial.serial_reader import merge_group_phases, filter_phases_by_time
+from services import logging_setup
+
+# 테스트 로그가 실제 logs/serial_reader.log 에 섞이지 않도록
+logging_setup.LOG_DIR = tempfile.mkdtemp()
+
+def test_merge_by_stage():
+    """구성원 3명 × 시간대 → 시간대별 1개 phase, 아이템마다 user_id"""
+    print("=" * 60)
+    print("Test 1: 시간대별 합치기")
+    print("=" * 60)
+
+    mom = [{"time": "evening", "items": [{"slot": 3, "count": 1, "medi_id": 5}]},
+           {"time": "morning", "items": [{"slot": 1, "count": 1, "medi_id": 7}]}]
+    dad = [{"time": "morning", "items": [{"slot": 2, "count": 2, "medi_id": 9}]},
+           {"time": "afternoon", "items": []}]
+    kid = [{"time": "evening", "items": [{"slot": 1, "count": 1, "medi_id": 7}]}]
+
+    merged = merge_group_phases([("mom", mom), ("dad", dad), ("kid", kid)])
+    print(merged)
+    assert [p["time"] for p in merged] == ["morning", "evening"]   # 빈 점심 제외, 순서 정렬
+    assert [(it["user_id"], it["slot"]) for it in merged[0]["items"]] == [("mom", 1), ("dad", 2)]
+    assert [(it["user_id"], it["slot"]) for it in merged[1]["items"]] == [("mom", 3), ("kid", 1)]
+    assert "user_id" not in mom[1]["items"][0]                        # 원본은 그대로
+    print("✅ 통과")
+
+def test_merge_after_filter():
+    """점심 시간대: 구성원별 필터링 후 합치면 아침 약은 빠짐"""
+    print("=" * 60)
+    print("Test 2: 필터링 후 합치기")
+    print("=" * 60)
+
+    mom = [{"time": "morning", "items": [{"slot": 1, "count": 1, "medi_id": 7}]},
+           {"time": "evening", "items": [{"slot": 3, "count": 1, "medi_id": 5}]}]
+    dad = [{"time": "afternoon", "items": [{"slot": 2, "count": 1, "medi_id": 9}]}]
+
+    merged = merge_group_phases([(u, filter_phases_by_time(p, "afternoon")) for u, p in (("mom", mom), ("dad", dad))])
+    assert [p["time"] for p in merged] == ["afternoon", "evening"]
+    assert merge_group_phases([("mom", []), ("dad", None)]) == []
+    print("✅ 통과")
+
+if __name__ == "__main__":
+    test_merge_by_stage()
+    test_merge_after_filter()
+    print("\n🎉 모든 가족 세션 테스트 통과")
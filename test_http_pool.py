@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+HTTP 연결 재사용 통계 / keep-alive 주기 테스트 (로컬 HTTP 서버)
+"""
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from config import settings
+from hwserial import inventory, serial_reader
+from services import api_client, logging_setup
+
+logging_setup.LOG_DIR = tempfile.mkdtemp()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # 연결 유지
+    post_status = 200               # POST 응답 코드 (보고 실패 흉내)
+
+    def _reply(self, body: bytes, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Keep-Alive", "timeout=5")     # Node.js 기본값
+        self.end_headers()
+        return body
+
+    def do_GET(self):
+        self.wfile.write(self._reply(json.dumps({"data": {"ok": True}}).encode()))
+
+    def do_HEAD(self):
+        self._reply(b"")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.wfile.write(self._reply(json.dumps({"status": "ok"}).encode(), _Handler.post_status))
+
+    def log_message(self, *args):
+        pass
+
+
+def test_pool_counts_and_keepalive():
+    """같은 연결로 보낸 요청은 재사용으로 집계, 서버 Keep-Alive 헤더로 probe 주기 단축"""
+    print("=" * 60)
+    print("Test 1: 연결 재사용 통계 / keep-alive 주기")
+    print("=" * 60)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    orig = (settings.SERVER_BASE_URL, settings.HTTP_KEEPALIVE_SEC, api_client._session)
+    settings.SERVER_BASE_URL = f"http://127.0.0.1:{srv.server_address[1]}"
+    settings.HTTP_KEEPALIVE_SEC = 25
+    api_client._session = None
+    api_client._server_keepalive = None
+    try:
+        assert api_client._keepalive_interval() == 25
+        before = api_client.get_connection_stats()
+
+        # 여러 스레드에서 동시에 보내도 요청 수가 빠지지 않음
+        threads = [threading.Thread(target=lambda: [api_client._get("/ping") for _ in range(5)])
+                   for _ in range(4)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        api_client._probe()
+
+        st = api_client.get_connection_stats()
+        sent = st["requests"] - before["requests"]
+        connects = st["new_connections"] - before["new_connections"]
+        print(f"요청 {sent}건 / 새 연결 {connects}개")
+        assert sent == 21 and st["probes"] - before["probes"] == 1
+        assert 1 <= connects <= settings.HTTP_POOL_MAXSIZE
+        assert api_client._keepalive_interval() == 3.0      # timeout=5 의 60%
+    finally:
+        settings.SERVER_BASE_URL, settings.HTTP_KEEPALIVE_SEC, api_client._session = orig
+        api_client._server_keepalive = None
+        srv.shutdown()
+        srv.server_close()
+    print("✅ 통과")
+
+
+def test_report_failure_raises():
+    """보고가 서버에 반영되지 않으면 예외 → 오프라인 적치분 유지, 재고 ack 안 함"""
+    print("\n" + "=" * 60)
+    print("Test 2: 보고 실패 감지")
+    print("=" * 60)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    acked = []
+    orig = (settings.SERVER_BASE_URL, api_client._session, serial_reader.OFFLINE_PATH, inventory.ack)
+    settings.SERVER_BASE_URL = f"http://127.0.0.1:{srv.server_address[1]}"
+    api_client._session = None
+    serial_reader.OFFLINE_PATH = Path(tempfile.mkdtemp()) / "offline_reports.jsonl"
+    inventory.ack = lambda consumed: acked.append(consumed)
+    try:
+        report = {"machine_id": "M1", "user_id": "a", "time": "morning", "result": "completed",
+                  "items": [{"medi_id": 7, "slot": 1, "count": 1}], "consumed": [[1, 1]]}
+        serial_reader.store_offline(report)
+
+        _Handler.post_status = 400
+        try:
+            api_client.report_dispense("a", "M1", report["items"], time="morning")
+            raise AssertionError("실패한 보고는 예외여야 함")
+        except api_client.requests.exceptions.HTTPError:
+            pass
+        assert serial_reader.flush_offline() == 0 and acked == []
+        assert len(serial_reader.OFFLINE_PATH.read_text().splitlines()) == 1
+
+        _Handler.post_status = 200
+        assert serial_reader.flush_offline() == 1 and acked == [[[1, 1]]]
+        assert serial_reader.OFFLINE_PATH.read_text() == ""
+    finally:
+        settings.SERVER_BASE_URL, api_client._session, serial_reader.OFFLINE_PATH, inventory.ack = orig
+        _Handler.post_status = 200
+        srv.shutdown()
+        srv.server_close()
+    print("✅ 통과")
+
+
+if __name__ == "__main__":
+    test_pool_counts_and_keepalive()
+    test_report_failure_raises()
+    print("\n🎉 HTTP 연결 테스트 모두 통과")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+로컬 재고 추적 / 배출 계획 검증 테스트
+"""
+import time
+
+from hwserial import inventory
+
+SLOTS = [{"slot_number": 1, "name": "A", "remain": 2, "total": 30, "medi_id": 7},
+         {"slot_number": 2, "name": "B", "remain": 0, "total": 30, "medi_id": 9}]
+
+def test_validate_flags_short_items():
+    """빈 슬롯 / 누적 부족 아이템은 short, 알 수 없는 슬롯은 통과"""
+    print("=" * 60)
+    print("Test 1: 계획 검증")
+    print("=" * 60)
+
+    inventory.reconcile(SLOTS)
+    phases = [{"time": "evening", "items": [{"slot": 1, "count": 1}]},
+              {"time": "morning", "items": [{"slot": 1, "count": 2}, {"slot": 2, "count": 1}, {"slot": 3, "count": 1}]}]
+    checked, shortages = inventory.validate(phases)
+    assert [p["time"] for p in checked] == ["morning", "evening"]
+    morning, evening = checked
+    assert [bool(it.get("short")) for it in morning["items"]] == [False, True, False]
+    assert evening["items"][0].get("short")             # 아침에 2개 쓰면 저녁 1개 부족
+    assert [(t, it["slot"]) for t, it in shortages] == [("morning", 2), ("evening", 1)]
+    assert "short" not in phases[1]["items"][1]          # 원본은 그대로
+    print("✅ 통과")
+
+def test_consume_and_reconcile():
+    """로컬 차감 → 서버 보고 전/후 조회와 합쳐도 이중 차감 없음"""
+    print("=" * 60)
+    print("Test 2: 차감 / 서버 조회 반영")
+    print("=" * 60)
+
+    inventory.reconcile([{"slot_number": 1, "name": "A", "remain": 10, "total": 30}])
+    inventory.consume(1, 2)
+    assert inventory.remaining(1) == 8
+
+    # 보고 전에 시작된 조회: 서버 값 10 (아직 미반영) → 로컬 차감 유지
+    before_report = time.monotonic()
+    inventory.ack([(1, 2)])
+    inventory.reconcile([{"slot_number": 1, "name": "A", "remain": 10, "total": 30}], fetched_at=before_report)
+    assert inventory.remaining(1) == 8
+
+    # 보고 후 조회: 서버가 이미 차감한 값 8 → 그대로
+    inventory.reconcile([{"slot_number": 1, "name": "A", "remain": 8, "total": 30}])
+    assert inventory.remaining(1) == 8
+    assert inventory.remaining(5) is None
+    print("✅ 통과")
+
+def test_projection():
+    """오늘 스케줄 하루 사용량 → 남은 일수"""
+    print("=" * 60)
+    print("Test 3: 남은 일수 예측")
+    print("=" * 60)
+
+    inventory.reconcile([{"slot_number": 1, "name": "A", "remain": 9, "total": 30, "medi_id": 7},
+                         {"slot_number": 2, "name": "B", "remain": 5, "total": 30}])
+    inventory.set_schedules([{"medi_id": 7, "medicine_name": "A", "dose": 2},
+                             {"medicine_name": "A", "dose": 1},
+                             {"medicine_name": "C", "dose": 1}])
+    assert inventory.projection() == {1: 3, 2: None}
+    rows = {r["slot_number"]: r for r in inventory.slot_rows()}
+    assert rows[1]["days_left"] == 3 and rows[2]["days_left"] is None
+    print("✅ 통과")
+
+if __name__ == "__main__":
+    test_validate_flags_short_items()
+    test_consume_and_reconcile()
+    test_projection()
+    print("\n🎉 모든 재고 테스트 통과")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+메트릭 수집기 테스트 (히스토그램 분위수 / Prometheus 출력 / 경로 라벨)
+"""
+
+from services import metrics
+from services.api_client import _endpoint_label
+from hwserial.arduino_link import _cmd_name
+
+def test_histogram_quantiles():
+    """히스토그램: 분위수 및 버킷 누적값"""
+    print("=" * 60)
+    print("Test 1: 히스토그램 분위수")
+    print("=" * 60)
+
+    metrics.reset()
+    for ms in range(1, 101):
+        metrics.observe("t_latency_seconds", ms / 1000.0, endpoint="GET /x")
+
+    p50 = metrics.quantile("t_latency_seconds", 0.5, endpoint="GET /x")
+    p99 = metrics.quantile("t_latency_seconds", 0.99, endpoint="GET /x")
+    print(f"p50={p50}, p99={p99}")
+    assert abs(p50 - 0.05) < 0.002
+    assert abs(p99 - 0.099) < 0.002
+    assert metrics.quantile("t_latency_seconds", 0.5, endpoint="GET /none") is None
+
+    text = metrics.render_prometheus()
+    assert 't_latency_seconds_bucket{endpoint="GET /x",le="0.005"} 5' in text
+    assert 't_latency_seconds_bucket{endpoint="GET /x",le="+Inf"} 100' in text
+    assert 't_latency_seconds_count{endpoint="GET /x"} 100' in text
+    print("✅ 통과")
+
+def test_counters_and_callbacks():
+    """카운터 + 콜백 메트릭 출력"""
+    print("=" * 60)
+    print("Test 2: 카운터 / 콜백")
+    print("=" * 60)
+
+    metrics.reset()
+    metrics.inc("t_retries_total", 2, endpoint="POST /rfid/resolve")
+    metrics.inc("t_retries_total", endpoint="POST /rfid/resolve")
+    metrics.register_callback("t_gauge", lambda: 7, "gauge", "test gauge")
+
+    assert metrics.get_counter("t_retries_total", endpoint="POST /rfid/resolve") == 3
+    text = metrics.render_prometheus()
+    print(text)
+    assert '# TYPE t_retries_total counter' in text
+    assert 't_retries_total{endpoint="POST /rfid/resolve"} 3' in text
+    assert '# HELP t_gauge test gauge' in text
+    assert 't_gauge 7' in text
+    print("✅ 통과")
+
+def test_labels():
+    """엔드포인트 / 시리얼 명령 라벨 정규화"""
+    print("=" * 60)
+    print("Test 3: 라벨 정규화")
+    print("=" * 60)
+
+    assert _endpoint_label("get", "/machine/M-1/slots") == "GET /machine/{machine_id}/slots"
+    assert _endpoint_label("get", "/dose-history/machine/M-1") == "GET /dose-history/machine/{machine_id}"
+    assert _endpoint_label("get", "/machine/check") == "GET /machine/check"
+    assert _endpoint_label("post", "/machine/heartbeat") == "POST /machine/heartbeat"
+    assert _cmd_name("DISPENSE,1,2") == "DISPENSE"
+    assert _cmd_name("STEP,NEXT") == "STEP,NEXT"
+    assert _cmd_name("JOG,F,50,500") == "JOG"
+    print("✅ 통과")
+
+if __name__ == "__main__":
+    test_histogram_quantiles()
+    test_counters_and_callbacks()
+    test_labels()
+    print("\n🎉 모든 메트릭 테스트 통과")
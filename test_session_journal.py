@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+세션 저널 (중단된 세션 자동 복구) 테스트
+"""
+import tempfile
+from pathlib import Path
+
+from config import settings
+from hwserial import inventory, session_journal, serial_reader
+from services import logging_setup
+
+# 실제 data/session_journal.jsonl 을 건드리지 않도록
+session_journal.JOURNAL_PATH = Path(tempfile.mkdtemp()) / "session_journal.jsonl"
+logging_setup.LOG_DIR = tempfile.mkdtemp()
+
+PHASES = [
+    {"time": "morning", "items": [{"slot": 1, "count": 2, "medi_id": "m1", "user_id": "a"},
+                                  {"slot": 2, "count": 1, "medi_id": "m2", "user_id": "b"}]},
+    {"time": "afternoon", "items": [{"slot": 3, "count": 1, "medi_id": "m3", "user_id": "a"}]},
+]
+
+
+def test_replay():
+    """계획/이동/배출/보고 기록 재생 → 단계, 나온 개수, 보고 안 된 시간대"""
+    print("=" * 60)
+    print("Test 1: 저널 재생")
+    print("=" * 60)
+
+    session_journal.begin("s1", "M1", "a", PHASES)
+    session_journal.item("morning", 0, 2, True)
+    session_journal.item("morning", 1, 1, True)
+    session_journal.reported("morning", "a", "completed")
+    session_journal.moving(1)
+    session_journal.moved(1)
+    session_journal.pills("afternoon", 0, 1)      # 1개 나오고 최종 응답 전에 죽음
+
+    rec = session_journal.pending()
+    assert rec.session_id == "s1" and rec.stage == 1
+    assert rec.done == {("morning", 0): 2, ("morning", 1): 1, ("afternoon", 0): 1}
+    reports = rec.reports()
+    # 아침 a는 이미 보고됨 → 아침 b + 점심 a만 (실제 나온 개수로)
+    assert [(r["time"], r["user_id"], r["result"]) for r in reports] == [
+        ("morning", "b", "completed"), ("afternoon", "a", "completed")]
+    assert reports[1]["items"] == [{"medi_id": "m3", "slot": 3, "count": 1}]
+    assert reports[1]["consumed"] == [(3, 1)]
+    assert reports[1]["report_id"] == "s1:afternoon:a" and not reports[1]["maybe_sent"]
+
+    session_journal.end()
+    assert session_journal.pending() is None
+    print("✅ 통과")
+
+
+def test_crash_mid_move_and_torn_line():
+    """이동 중 죽으면 목표 단계로 추정, 잘린 마지막 줄은 무시, 안 나온 시간대는 보고 안 함"""
+    print("\n" + "=" * 60)
+    print("Test 2: 이동 중 중단 + 잘린 기록")
+    print("=" * 60)
+
+    session_journal.begin("s2", "M1", "a", PHASES)
+    session_journal.pills("morning", 0, 1)
+    session_journal.moving(2)
+    with session_journal.JOURNAL_PATH.open("a", encoding="utf-8") as f:
+        f.write('{"ev":"moved","sta')               # 쓰다 만 줄 (정전)
+
+    rec = session_journal.pending()
+    assert rec.stage == 2
+    reports = rec.reports()
+    assert [(r["time"], r["user_id"], r["result"]) for r in reports] == [("morning", "a", "partial")]
+    assert reports[0]["items"][0]["count"] == 1
+    session_journal.end()
+    print("✅ 통과")
+
+
+def test_report_in_flight():
+    """보고 전송 중 중단 → 서버 반영 여부 모름(maybe_sent), 결과가 기록된 보고는 다시 안 보냄"""
+    print("\n" + "=" * 60)
+    print("Test 3: 보고 전송 중 중단")
+    print("=" * 60)
+
+    session_journal.begin("s4", "M1", "a", PHASES)
+    session_journal.item("morning", 0, 2, True)
+    session_journal.item("morning", 1, 1, True)
+    session_journal.report_sending("morning", "a")
+    session_journal.reported("morning", "a", "completed")
+    session_journal.report_sending("morning", "b")   # 서버 응답 전에 죽음
+
+    reports = session_journal.pending().reports()
+    assert [(r["time"], r["user_id"], r["maybe_sent"]) for r in reports] == [("morning", "b", True)]
+    assert reports[0]["report_id"] == session_journal.report_id("s4", "morning", "b")
+    session_journal.end()
+    print("✅ 통과")
+
+
+def test_recover_interrupted():
+    """재시작 복구: 알던 단계만큼 되돌리고, 보고 실패분은 오프라인 적치, 저널 삭제"""
+    print("\n" + "=" * 60)
+    print("Test 4: 재시작 시 자동 복구")
+    print("=" * 60)
+
+    calls = {"home": [], "report": [], "offline": [], "consume": [], "ack": []}
+
+    def fake_report(**kw):
+        calls["report"].append(kw)
+        if kw["user_id"] == "b":
+            raise IOError("server down")
+
+    patched = {
+        "return_home_from": lambda ser, stage: (calls["home"].append(stage), (True, "OK,JOG"))[1],
+        "step_home": lambda ser, stage=None: (True, "OK,HOME"),
+        "report_dispense": fake_report,
+        "store_offline": lambda payload: calls["offline"].append(payload),
+        "write_state": lambda *a, **kw: None,
+    }
+    orig = {name: getattr(serial_reader, name) for name in patched}
+    orig_inv = (inventory.consume, inventory.ack)
+    for name, fn in patched.items():
+        setattr(serial_reader, name, fn)
+    inventory.consume = lambda slot, count: calls["consume"].append((slot, count))
+    inventory.ack = lambda consumed: calls["ack"].append(list(consumed))
+    try:
+        assert serial_reader.recover_interrupted(None) is False     # 저널 없으면 아무것도 안 함
+
+        session_journal.begin("s3", "M1", "a", PHASES)
+        session_journal.item("morning", 0, 2, True)
+        session_journal.item("morning", 1, 1, True)
+        session_journal.report_sending("morning", "a")   # a 보고 응답 전에 죽음
+        session_journal.moving(1)
+
+        assert serial_reader.recover_interrupted(None) is True
+        assert calls["home"] == [1]
+        # 서버 중복 제거 미확인(기본) → 전송 중 중단된 a는 다시 보내지 않음
+        assert [r["user_id"] for r in calls["report"]] == ["b"]
+        assert calls["offline"][0]["report_id"] == "s3:morning:b"
+        assert [p["user_id"] for p in calls["offline"]] == ["b"]
+        assert calls["consume"] == [(2, 1)] and calls["ack"] == []   # 재시작 후: 적치분만 다시 차감
+        assert session_journal.pending() is None
+
+        # 서버가 report_id로 중복 제거 → 원래 전송과 같은 멱등 키로 재전송
+        for key in calls:
+            calls[key].clear()
+        settings.REPORT_DEDUP_BY_ID = True
+        session_journal.begin("s3", "M1", "a", PHASES)
+        session_journal.item("morning", 0, 2, True)
+        session_journal.report_sending("morning", "a")
+        assert serial_reader.recover_interrupted(None) is True
+        assert [r["report_id"] for r in calls["report"]] == ["s3:morning:a"]
+        assert session_journal.pending() is None
+        settings.REPORT_DEDUP_BY_ID = False
+
+        # 같은 프로세스 안 복구: process_queue가 이미 차감 → 다시 차감하지 않고 성공분만 ack
+        for key in calls:
+            calls[key].clear()
+        session_journal.begin("s5", "M1", "a", PHASES)
+        session_journal.item("morning", 0, 2, True)
+        session_journal.item("morning", 1, 1, True)
+        assert serial_reader.recover_interrupted(None, after_reset=False) is True
+        assert calls["consume"] == [] and calls["ack"] == [[(1, 2)]]
+        assert session_journal.pending() is None
+
+        # 서버도 오프라인 적치도 실패 → 보고 기록/저널 삭제 안 함 (다음 복구에서 재시도)
+        for key in calls:
+            calls[key].clear()
+        serial_reader.store_offline = lambda payload: (_ for _ in ()).throw(OSError("disk full"))
+        session_journal.begin("s6", "M1", "a", PHASES)
+        session_journal.item("morning", 1, 1, True)
+        assert serial_reader.recover_interrupted(None) is True
+        rec = session_journal.pending()
+        assert rec is not None and [r["user_id"] for r in rec.reports()] == ["b"]
+        session_journal.end()
+    finally:
+        for name, fn in orig.items():
+            setattr(serial_reader, name, fn)
+        inventory.consume, inventory.ack = orig_inv
+        settings.REPORT_DEDUP_BY_ID = False
+    print("✅ 통과")
+
+
+if __name__ == "__main__":
+    test_replay()
+    test_crash_mid_move_and_torn_line()
+    test_report_in_flight()
+    test_recover_interrupted()
+    print("\n🎉 세션 저널 테스트 모두 통과")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+세션 대기열 테스트 (중복/상한 / 미리 준비 / 대기 표시)
+"""
+import threading
+import time
+
+from hwserial.session_queue import TagQueue
+from services import tracing
+
+
+class _Plan:
+    def __init__(self, uid):
+        self.uid = uid
+        self.user_name = f"user-{uid}"
+
+
+def test_offer_dedupe_and_limit():
+    """진행 중/대기 중 UID 중복 거부, 상한 초과 거부, 순서 유지"""
+    print("=" * 60)
+    print("Test 1: 중복 / 상한")
+    print("=" * 60)
+
+    q = TagQueue(lambda uid, trace: _Plan(uid), maxsize=2)
+    assert q.offer("AAAA0001", tracing.NULL_TRACE)
+    assert not q.offer("AAAA0001", tracing.NULL_TRACE)   # 대기 중 중복
+    assert q.offer("AAAA0002", tracing.NULL_TRACE)
+    assert not q.offer("AAAA0003", tracing.NULL_TRACE)   # 가득 참
+
+    entry = q.pop()
+    assert entry.uid == "AAAA0001"
+    assert not q.offer("AAAA0001", tracing.NULL_TRACE)   # 진행 중 중복
+    q.finish()
+    assert q.offer("AAAA0001", tracing.NULL_TRACE)       # 세션 끝나면 다시 가능
+    assert [q.pop().uid, q.pop().uid] == ["AAAA0002", "AAAA0001"]
+    assert q.pop() is None
+    print("✅ 통과")
+
+
+def test_prefetch_and_waiting_names():
+    """offer 즉시 백그라운드 준비, 이름 확인되면 대기 표시 갱신, 오래된 준비는 다시 조회"""
+    print("=" * 60)
+    print("Test 2: 미리 준비 / 대기 표시")
+    print("=" * 60)
+
+    release = threading.Event()
+    calls = []
+
+    def prepare(uid, trace):
+        calls.append(uid)
+        release.wait(2)
+        return _Plan(uid)
+
+    changes = []
+    q = TagQueue(prepare, maxsize=5, max_age=60, on_change=changes.append)
+    q.offer("BBBB0001", tracing.NULL_TRACE)
+    assert q.waiting_names() == ("확인 중",)
+    release.set()
+    for _ in range(100):
+        if changes[-1] == ("user-BBBB0001",):
+            break
+        time.sleep(0.01)
+    assert changes[-1] == ("user-BBBB0001",)
+
+    entry = q.pop()
+    assert entry.plan(prepare, max_age=60).uid == "BBBB0001"
+    assert calls == ["BBBB0001"]                      # 이미 준비됨 → 다시 조회 안 함
+    entry._prepared_at -= 120
+    entry.plan(prepare, max_age=60)
+    assert calls == ["BBBB0001", "BBBB0001"]          # 오래됨 → 다시 조회
+    assert changes[-1] == ()
+    print("✅ 통과")
+
+
+if __name__ == "__main__":
+    test_offer_dedupe_and_limit()
+    test_prefetch_and_waiting_names()
+    print("\n🎉 모든 세션 대기열 테스트 통과")
@@ -4,8 +4,13 @@
 """
 
 import sys
+import tempfile
 from datetime import datetime
 from hwserial.serial_reader import get_current_time_slot, filter_phases_by_time
+from services import logging_setup
+
+# 테스트 로그가 실제 logs/serial_reader.log 에 섞이지 않도록
+logging_setup.LOG_DIR = tempfile.mkdtemp()
 
 def test_time_slot():
     """현재 시간대 확인"""
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+적응형 명령 타임아웃 테스트 (학습 전 기본값 / 학습값 범위 / 타임아웃 후 상한 / 저장·복원)
+"""
+import tempfile
+from pathlib import Path
+
+from config import settings
+from hwserial import timing_model
+
+def _reset(path):
+    timing_model.MODEL_PATH = Path(path)
+    timing_model._stats.clear()
+    timing_model._after_timeout.clear()
+    timing_model._loaded = True   # 테스트에서는 기존 파일 읽지 않음
+
+def test_learned_deadline():
+    """표본이 쌓이면 p99 기반으로 줄어들고, 하한/상한을 벗어나지 않음"""
+    print("=" * 60)
+    print("Test 1: 학습 전/후 타임아웃")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as d:
+        _reset(Path(d) / "timing.json")
+        default = 4.0 + 2 * 1.0
+        assert timing_model.deadline("DISPENSE", default, slot=1, count=2) == default   # 학습 전
+
+        for i in range(settings.TIMING_MIN_SAMPLES):
+            timing_model.observe("DISPENSE", 1.2 + (i % 5) * 0.02, slot=1, count=2)   # 1개당 ~0.6초
+        learned = timing_model.deadline("DISPENSE", default, slot=1, count=2)
+        print(f"학습값: {learned:.2f}s (기존 {default}s)")
+        assert settings.TIMING_FLOOR_SEC <= learned < default
+        assert timing_model.deadline("DISPENSE", default, slot=2, count=2) == default  # 슬롯별
+
+        # 실패(ERR) 응답은 표본에 안 들어감
+        n = timing_model._stats[timing_model._key("DISPENSE", 1)].n
+        timing_model.observe("DISPENSE", 0.01, slot=1, count=2, ok=False)
+        assert timing_model._stats[timing_model._key("DISPENSE", 1)].n == n
+    print("✅ 통과")
+
+def test_timeout_then_ceiling():
+    """타임아웃 직후 1회는 상한값, 성공하면 다시 학습값"""
+    print("=" * 60)
+    print("Test 2: 타임아웃 후 상한")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as d:
+        _reset(Path(d) / "timing.json")
+        for _ in range(settings.TIMING_MIN_SAMPLES):
+            timing_model.observe("STEP,NEXT", 2.0)
+        learned = timing_model.deadline("STEP,NEXT", 4.0)
+        timing_model.observe("STEP,NEXT", learned, ok=False, timed_out=True)
+        assert timing_model.deadline("STEP,NEXT", 4.0) == 4.0 * settings.TIMING_MAX_FACTOR
+        timing_model.observe("STEP,NEXT", 2.1)
+        assert timing_model.deadline("STEP,NEXT", 4.0) < 4.0
+    print("✅ 통과")
+
+def test_persist_roundtrip():
+    """저장 후 다시 읽으면 같은 타임아웃"""
+    print("=" * 60)
+    print("Test 3: 저장 / 복원")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d) / "timing.json"
+        _reset(path)
+        for i in range(settings.TIMING_MIN_SAMPLES):
+            timing_model.observe("HOME", 3.0 + i * 0.01)
+        before = timing_model.deadline("HOME", 6.0)
+        timing_model.flush()
+
+        _reset(path)
+        timing_model._loaded = False
+        assert timing_model.deadline("HOME", 6.0) == before
+    print("✅ 통과")
+
+def test_home_keyed_by_stage():
+    """HOME은 출발 단계별로 학습 (단계 0의 즉시 응답이 단계 2 복귀 타임아웃을 줄이지 않음)"""
+    print("=" * 60)
+    print("Test 4: 출발 단계별 HOME")
+    print("=" * 60)
+
+    from hwserial import arduino_link
+    from test_control_server import ReadyFakeSerial
+
+    class AnswerSerial(ReadyFakeSerial):
+        """명령마다 OK,<명령> 한 줄로 응답"""
+        def write(self, data):
+            super().write(data)
+            self.script.append((0, "OK," + data.decode().strip()))
+
+    with tempfile.TemporaryDirectory() as d:
+        _reset(Path(d) / "timing.json")
+        for i in range(settings.TIMING_MIN_SAMPLES):
+            timing_model.observe("HOME", 0.05, slot=0)
+            timing_model.observe("HOME", 4.5 + i * 0.01, slot=2)
+        home0 = timing_model.deadline("HOME", 6.0, slot=0)
+        home2 = timing_model.deadline("HOME", 6.0, slot=2)
+        print(f"HOME 학습값: 단계0 {home0:.2f}s / 단계2 {home2:.2f}s")
+        assert home0 == settings.TIMING_FLOOR_SEC and home2 > 4.5
+        assert timing_model.deadline("HOME", 6.0) == 6.0            # 단계 모름 → 별도 키 (학습 전)
+
+        # step_home / step_next_n 이 출발 단계를 키로 기록
+        arduino_link.step_home(AnswerSerial([]), stage=1)
+        assert timing_model._stats[timing_model._key("HOME", 1)].n == 1
+        arduino_link.step_next_n(AnswerSerial([]), 2, gap_ms=0, stage=0)
+        assert timing_model._stats[timing_model._key("STEP,NEXT", 0)].n == 1
+        assert timing_model._stats[timing_model._key("STEP,NEXT", 1)].n == 1
+    print("✅ 통과")
+
+if __name__ == "__main__":
+    test_learned_deadline()
+    test_timeout_then_ceiling()
+    test_persist_roundtrip()
+    test_home_keyed_by_stage()
+    print("\n🎉 모든 타이밍 모델 테스트 통과")
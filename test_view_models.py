@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+타일 뷰모델 테스트 (복용 기록 요약 / 재고 단계 / 메모이즈 / 행 변경 감지)
+"""
+
+from gui import view_models, tile_diff
+
+def test_history_summary():
+    """복용 기록: 최신순, (사용자, 날짜) 중복 제거, 잘못된 시간"""
+    print("=" * 60)
+    print("Test 1: 복용 기록 요약")
+    print("=" * 60)
+
+    history = [
+        {"user_name": "엄마", "dispensed_at": "2025-01-01T00:10:00Z"},
+        {"user_name": "엄마", "dispensed_at": "2025-01-01T00:20:00Z"},
+        {"user_name": "아빠", "dispensed_at": "2025-01-02T00:00:00Z"},
+        {"user_name": "아이", "dispensed_at": "bad"},
+    ]
+    text = view_models.history(history).row("text")[1]
+    print(text)
+    lines = text.split("\n")
+    done = [l for l in lines if l.endswith("복용 완료")]
+    assert done[0].startswith("아빠님")  # 최신순
+    assert sum(1 for l in lines if l.startswith("엄마님")) == 1
+    assert "아이 - 시간 정보 오류" in lines
+    assert view_models.history([]).row("text")[1] == "최근 기록 없음"
+    print("✅ 통과")
+
+def test_memoized_by_version():
+    """같은 입력이면 같은 객체 (재가공 없음), 바뀐 슬롯만 diff"""
+    print("=" * 60)
+    print("Test 2: 메모이즈 / 변경 감지")
+    print("=" * 60)
+
+    slots = [{"slot_number": 1, "name": "A", "remain": 10, "total": 10},
+             {"slot_number": 2, "name": "B", "remain": 1, "total": 10}]
+    first = view_models.slots(slots)
+    assert view_models.slots([dict(s) for s in slots]) is first
+    assert first.row(1).level == "ok"
+    assert first.row(2).level == "critical"
+    assert first.row(3).has_medicine is False
+
+    state = tile_diff.TileState()
+    assert state.changed(first)
+    assert not state.changed(view_models.slots(slots))
+
+    slots[1] = dict(slots[1], remain=4)
+    changed = view_models.slots(slots)
+    assert state.changed(changed)
+    # 행 단위: 바뀐 슬롯만 해시가 다름 (VirtualList가 그 행만 다시 그림)
+    assert [a != b for a, b in zip(first.hashes, changed.hashes)] == [False, True, False]
+    assert changed.row(2).level == "low"
+    print("✅ 통과")
+
+if __name__ == "__main__":
+    test_history_summary()
+    test_memoized_by_version()
+    print("\n🎉 모든 뷰모델 테스트 통과")